@@ -5,13 +5,31 @@ from werkzeug.middleware.proxy_fix import ProxyFix
 import datetime
 
 from config import Config
+from app.routing import RoutingSession
 
 from typing import Type
 
-db = SQLAlchemy()
+# Reads of read-only scopes go to the replica bind when one is configured (app.routing)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 
 
+def init_db(app: Flask) -> None:
+    """Create the database engines with the configured engine profile (app.engine)."""
+    from app.engine import engine_options, init_engine
+    from app.metrics import instrument_pool
+    from app.query_stats import instrument_engine
+
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app)
+    db.init_app(app)
+
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            instrument_pool(engine, bind)
+            init_engine(app, engine)
+            instrument_engine(engine)
+
+
 def create_app(config_class: Type[Config] = Config) -> Flask:
     app = Flask(__name__)
     app.config.from_object(config_class)
@@ -25,13 +43,25 @@ def create_app(config_class: Type[Config] = Config) -> Flask:
         x_prefix=1
     )
 
-    db.init_app(app)
+    init_db(app)
 
     from app.routes import bp as main_bp
+    from app.webhook import bp as webhook_bp
 
     app.register_blueprint(main_bp)
+    app.register_blueprint(webhook_bp)
 
     from app import models
+    from app.cli import register_commands
+    from app.routing import init_routing
+    from app.query_stats import init_query_stats
+    from app.metrics import init_metrics
+
+    init_routing(app, db)
+    init_query_stats(app)
+    init_metrics(app)
+
+    register_commands(app)
 
     # Register custom Jinja2 filters
     @app.template_filter('utc_iso')
@@ -47,3 +77,20 @@ def create_app(config_class: Type[Config] = Config) -> Flask:
         return dt.isoformat()
 
     return app
+
+
+def create_worker_app(config_class: Type[Config] = Config) -> Flask:
+    """
+    Application for the bot/scheduler worker (worker.py).
+
+    Only the database and the models are set up: no blueprints, forms or
+    templates are imported, the app exists to provide application contexts.
+    """
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+
+    init_db(app)
+
+    from app import models
+
+    return app
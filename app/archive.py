@@ -0,0 +1,79 @@
+"""
+Cold archive for completed tasks.
+
+DONE tasks older than Config.TASK_ARCHIVE_AFTER_DAYS are moved from `task` to
+`task_archive` in short batches (INSERT ... SELECT + DELETE, one transaction per
+batch), so the hot table only holds active work and recent history and no
+transaction locks it for long. Project counters are not touched: done_count and
+last_activity_at include archived tasks.
+
+Correctness comes from the INSERT and the DELETE both repeating the DONE/cutoff
+filter, so a task un-completed after the batch was selected is neither copied
+nor deleted. The select only picks candidate ids: FOR UPDATE SKIP LOCKED keeps
+concurrent archivers apart on PostgreSQL, while SQLite takes no lock on a SELECT
+(with_for_update is a no-op there). On SQLite the INSERT takes the write lock,
+which is held until the commit, so no write can land between the two statements.
+"""
+import datetime
+import logging
+
+from sqlalchemy import insert, select
+
+from app import db
+from app.models import Task, TaskArchive, TaskStatus
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def archive_completed_tasks(older_than_days: int = Config.TASK_ARCHIVE_AFTER_DAYS,
+                            batch_size: int = Config.TASK_ARCHIVE_BATCH_SIZE,
+                            max_batches: int | None = None) -> int:
+    """
+    Move old completed tasks to the archive table.
+
+    Args:
+        older_than_days: Archive tasks completed more than this many days ago
+        batch_size: Number of tasks moved per transaction
+        max_batches: Stop after this many batches (None - until nothing is left)
+
+    Returns:
+        Number of archived tasks
+    """
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=older_than_days)
+    archived = 0
+    batches = 0
+
+    archivable = (Task.status == TaskStatus.DONE, Task.completed_at < cutoff)
+
+    while max_batches is None or batches < max_batches:
+        try:
+            task_ids = [
+                task_id for (task_id,) in db.session.query(Task.id).filter(*archivable)
+                .order_by(Task.id).limit(batch_size).with_for_update(skip_locked=True)
+            ]
+            if not task_ids:
+                db.session.rollback()
+                break
+
+            now = datetime.datetime.now(datetime.timezone.utc)
+            db.session.execute(
+                insert(TaskArchive).from_select(
+                    ["id", "title", "project_id", "created_at", "completed_at", "archived_at"],
+                    select(Task.id, Task.title, Task.project_id, Task.created_at, Task.completed_at,
+                           db.literal(now, db.DateTime)).where(Task.id.in_(task_ids), *archivable)
+                )
+            )
+            moved = db.session.query(Task).filter(Task.id.in_(task_ids), *archivable)\
+                .delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to archive tasks batch: {e}")
+            raise
+
+        archived += moved
+        batches += 1
+        logger.info(f"Archived {moved} tasks (total {archived})")
+
+    return archived
@@ -1,14 +1,39 @@
 """Telegram Mini App authentication utilities."""
+import functools
 import hashlib
 import hmac
 import json
+import logging
+import time
 from urllib.parse import parse_qsl
 from typing import Optional
 
+from app.cache import TTLCache
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# telegram_id -> user.id; users are never deleted, so entries only expire to bound memory
+_user_id_cache = TTLCache(maxsize=Config.USER_ID_CACHE_SIZE, ttl=Config.USER_ID_CACHE_TTL)
+
+# (bot token, initData) -> user data of initData that already passed verification;
+# an entry never outlives the auth_date window of its initData
+_verified_init_data = TTLCache(maxsize=Config.INIT_DATA_CACHE_SIZE, ttl=Config.INIT_DATA_CACHE_TTL)
+
+
+@functools.lru_cache(maxsize=8)
+def _web_app_secret_key(bot_token: str) -> bytes:
+    """HMAC key for initData signatures, derived once per bot token."""
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
 
 def verify_telegram_web_app_data(init_data: str, bot_token: str) -> dict | None:
     """
     Verify that the init data received from Telegram Mini App is valid.
+
+    initData older than `Config.INIT_DATA_MAX_AGE` seconds (by its auth_date) is
+    rejected. initData that was already verified is answered from a cache without
+    parsing it or computing an HMAC again.
     
     Args:
         init_data: Init data string from Telegram.WebApp.initData
@@ -17,6 +42,11 @@ def verify_telegram_web_app_data(init_data: str, bot_token: str) -> dict | None:
     Returns:
         Parsed user data if valid, None otherwise
     """
+    cache_key = (bot_token, init_data)
+    user_data = _verified_init_data.get(cache_key)
+    if user_data is not None:
+        return dict(user_data)
+
     try:
         # Parse the init data
         parsed_data = dict(parse_qsl(init_data))
@@ -31,43 +61,57 @@ def verify_telegram_web_app_data(init_data: str, bot_token: str) -> dict | None:
             # In dev mode, accept mock data
             if 'user' in parsed_data:
                 user_data = json.loads(parsed_data['user'])
-                print(f"[DEV] Mock authentication for user: {user_data.get('id')}")
+                logger.debug(f"[DEV] Mock authentication for user: {user_data.get('id')}")
                 return user_data
             return None
+
+        # Reject stale initData before spending an HMAC on it
+        max_age = Config.INIT_DATA_MAX_AGE
+        expires_in = None
+        if max_age:
+            auth_date = int(parsed_data.get('auth_date', 0))
+            expires_in = auth_date + max_age - time.time()
+            if expires_in <= 0:
+                return None
         
         # Create data check string
         data_check_arr = [f"{k}={v}" for k, v in sorted(parsed_data.items())]
         data_check_string = '\n'.join(data_check_arr)
         
-        # Calculate secret key
-        secret_key = hmac.new(
-            b"WebAppData",
-            bot_token.encode(),
-            hashlib.sha256
-        ).digest()
-        
         # Calculate hash
         calculated_hash = hmac.new(
-            secret_key,
+            _web_app_secret_key(bot_token),
             data_check_string.encode(),
             hashlib.sha256
         ).hexdigest()
         
-        if calculated_hash != received_hash:
+        if not hmac.compare_digest(calculated_hash, received_hash):
             return None
         
         # Parse user data
         if 'user' in parsed_data:
             user_data = json.loads(parsed_data['user'])
+            ttl = Config.INIT_DATA_CACHE_TTL if expires_in is None else min(expires_in, Config.INIT_DATA_CACHE_TTL)
+            _verified_init_data.set(cache_key, dict(user_data), ttl=ttl)
             return user_data
         
         return None
         
     except Exception as e:
-        print(f"Error verifying Telegram data: {e}")
+        logger.warning(f"Error verifying Telegram data: {e}")
         return None
 
 
+def init_data_cache_stats() -> dict:
+    """Hit/miss counters of the verified initData cache."""
+    return _verified_init_data.stats()
+
+
+def user_id_cache_stats() -> dict:
+    """Hit/miss counters of the telegram_id -> user.id cache."""
+    return _user_id_cache.stats()
+
+
 def get_or_create_user(telegram_id: int):
     """
     Get existing user by telegram_id or create a new one.
@@ -80,6 +124,7 @@ def get_or_create_user(telegram_id: int):
     """
     from app.models import User
     from app import db
+    from app.crud import get_or_create_user_settings
     
     user = User.query.filter_by(telegram_id=telegram_id).first()
     
@@ -88,5 +133,47 @@ def get_or_create_user(telegram_id: int):
         user.telegram_id = telegram_id
         db.session.add(user)
         db.session.commit()
+
+        # Put the new user into the reminder index right away
+        get_or_create_user_settings(user.id)
     
     return user
+
+
+def get_cached_user_id(telegram_id: int) -> Optional[int]:
+    """
+    Get user.id for a telegram_id from the in-process cache only.
+    
+    Args:
+        telegram_id: Telegram user ID
+    
+    Returns:
+        Cached user ID or None on a cache miss
+    """
+    return _user_id_cache.get(telegram_id)
+
+
+def remember_user_id(telegram_id: int, user_id: int) -> None:
+    """Store a resolved telegram_id -> user.id mapping in the cache."""
+    _user_id_cache.set(telegram_id, user_id)
+
+
+def get_user_id(telegram_id: int) -> Optional[int]:
+    """
+    Resolve user.id by telegram_id, querying the database only on a cache miss.
+    
+    Args:
+        telegram_id: Telegram user ID
+    
+    Returns:
+        User ID or None if the user does not exist
+    """
+    from app.models import User
+    from app import db
+
+    user_id = get_cached_user_id(telegram_id)
+    if user_id is None:
+        user_id = db.session.query(User.id).filter_by(telegram_id=telegram_id).scalar()
+        if user_id is not None:
+            remember_user_id(telegram_id, user_id)
+    return user_id
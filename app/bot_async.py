@@ -0,0 +1,260 @@
+"""
+Asyncio runtime for the Telegram bot (BOT_MODE=async).
+
+Handlers run as coroutines on one event loop and share telebot's keep-alive
+aiohttp connection pool, so an in-flight request costs a coroutine instead of a
+thread. Database work is blocking (SQLAlchemy), so it runs on a bounded thread
+pool inside its own application context. Command replies come from
+app.bot_commands and match the threaded runtime in app.bot.
+
+telebot runs all updates of a getUpdates batch concurrently, so handlers take a
+per-chat lock first: a chat's commands run one after another in the order they
+arrived, different chats still run in parallel.
+
+Requires aiohttp (in requirements.txt), which telebot's asyncio client uses.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import telebot
+
+try:
+    from telebot import asyncio_helper
+    from telebot.async_telebot import AsyncTeleBot
+except ImportError as e:  # pragma: no cover - depends on the environment
+    raise ImportError("The asyncio bot runtime requires aiohttp: pip install -r requirements.txt") from e
+
+from app.bot import use_api_url
+from app.bot_commands import (
+    HELP_TEXT, NO_APP_URL_TEXT, app_markup, register_user, start_reply, summary_reply,
+    settings_reply, remind_reply, reminder_send_kwargs
+)
+from app.bot_service import sync_reminder_index
+from app.delivery import MessageDelivery
+from app.lease import Lease
+from app.outbox import format_timings, next_tick_at, run_reminder_tick
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCheckBot:
+    """
+    Telegram Bot for the Check project management system on asyncio.
+    """
+
+    def __init__(self, token: str, app, db, reminders_enabled: bool = True,
+                 db_workers: int = Config.ASYNC_BOT_DB_WORKERS,
+                 http_pool_size: int = Config.ASYNC_BOT_HTTP_POOL_SIZE):
+        """
+        Initialize the bot.
+
+        Args:
+            token: Telegram Bot API token
+            app: Flask application instance
+            db: SQLAlchemy database instance
+            reminders_enabled: Whether to enable daily reminders
+            db_workers: Threads available for database work
+            http_pool_size: Maximum open connections to the Bot API
+        """
+        # The session is created lazily by telebot from this limit and reused by every request
+        asyncio_helper.REQUEST_LIMIT = http_pool_size
+        api_url = app.config.get('TELEGRAM_API_URL')
+        use_api_url(api_url)
+        if api_url:
+            asyncio_helper.API_URL = telebot.apihelper.API_URL
+
+        self.bot = AsyncTeleBot(token, parse_mode='html')
+        self.app = app
+        self.db = db
+        self.reminders_enabled = reminders_enabled
+        self.executor = ThreadPoolExecutor(max_workers=db_workers, thread_name_prefix="bot-db")
+        self.mini_app_url = self.app.config.get('MINI_APP_URL')
+
+        # Bulk reminder sends keep using the rate-limited thread pool of MessageDelivery
+        self.delivery = MessageDelivery(telebot.TeleBot(token, parse_mode='html', threaded=False))
+        self.reminder_task: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.main_task: Optional[asyncio.Task] = None
+        self.reminder_lease = Lease("reminders")
+        # chat id -> [lock, number of handlers holding or waiting for it]
+        self._chat_locks: Dict[int, list] = {}
+
+        self._register_handlers()
+
+    async def _db(self, func: Callable[..., Any], *args) -> Any:
+        """Run blocking database work on the executor inside an application context."""
+        def call():
+            with self.app.app_context():
+                return func(*args)
+
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    def _in_chat_order(self, handler: Callable[[Any], Awaitable[None]]) -> Callable[[Any], Awaitable[None]]:
+        """Run a handler only after the earlier updates of the same chat were handled."""
+        @wraps(handler)
+        async def wrapper(message):
+            # Taken before the first await, so the FIFO lock queues handlers in update order
+            entry = self._chat_locks.setdefault(message.chat.id, [asyncio.Lock(), 0])
+            entry[1] += 1
+            try:
+                async with entry[0]:
+                    await handler(message)
+            finally:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._chat_locks[message.chat.id]
+        return wrapper
+
+    def _register_handlers(self):
+        """Register bot command handlers."""
+
+        @self.bot.message_handler(commands=['start'])
+        @self._in_chat_order
+        async def handle_start(message):
+            """Handle /start command."""
+            await self._db(register_user, message.from_user.id)
+            text, kwargs = start_reply(self.mini_app_url)
+            await self.bot.send_message(message.chat.id, text, **kwargs)
+
+        @self.bot.message_handler(commands=['help'])
+        @self._in_chat_order
+        async def handle_help(message):
+            """Handle /help command."""
+            await self.bot.send_message(message.chat.id, HELP_TEXT)
+
+        @self.bot.message_handler(commands=['app'])
+        @self._in_chat_order
+        async def handle_app(message):
+            """Handle /app command."""
+            if not self.mini_app_url:
+                await self.bot.send_message(message.chat.id, NO_APP_URL_TEXT)
+                return
+
+            markup = app_markup(self.mini_app_url, "Открыть приложение")
+            if markup is None:
+                await self.bot.send_message(message.chat.id, f"Ссылка на приложение: {self.mini_app_url}")
+                return
+
+            await self.bot.send_message(
+                message.chat.id,
+                "Нажмите кнопку ниже, чтобы открыть приложение:",
+                reply_markup=markup
+            )
+
+        @self.bot.message_handler(commands=['summary'])
+        @self._in_chat_order
+        async def handle_summary(message):
+            """Handle /summary command - show daily summary."""
+            text, kwargs = await self._db(summary_reply, message.from_user.id)
+            await self.bot.send_message(message.chat.id, text, **kwargs)
+
+        @self.bot.message_handler(commands=['settings'])
+        @self._in_chat_order
+        async def handle_settings(message):
+            """Handle /settings command - show reminder settings."""
+            text, kwargs = await self._db(settings_reply, message.from_user.id)
+            await self.bot.send_message(message.chat.id, text, **kwargs)
+
+        @self.bot.message_handler(commands=['remind'])
+        @self._in_chat_order
+        async def handle_remind(message):
+            """Handle /remind command - manage reminder settings."""
+            text, kwargs = await self._db(remind_reply, message.from_user.id, message.text)
+            await self.bot.send_message(message.chat.id, text, **kwargs)
+
+    def _reminder_tick(self, scheduled_at: float):
+        """Enqueue (as the lease holder) and deliver due reminders, blocking."""
+        with self.app.app_context():
+            return run_reminder_tick(self.reminder_lease, self.delivery, reminder_send_kwargs(self.mini_app_url),
+                                     scheduled_at=scheduled_at)
+
+    async def _reminder_scheduler(self):
+        """Send due reminders once per REMINDER_CHECK_INTERVAL."""
+        logger.info("Reminder scheduler started")
+
+        try:
+            scheduled = await self._db(sync_reminder_index)
+            logger.info(f"Reminder index synced ({scheduled} settings scheduled)")
+        except Exception as e:
+            logger.error(f"Failed to sync reminder index: {e}")
+
+        loop = asyncio.get_running_loop()
+        scheduled_at = time.time()
+        while True:
+            try:
+                # Delivery blocks on rate limits: keep it off the event loop and the DB pool
+                report = await loop.run_in_executor(None, self._reminder_tick, scheduled_at)
+                if report["total"]:
+                    logger.info(
+                        f"Reminder batch drained in {report['duration']:.1f}s: "
+                        f"{report['sent']} sent, {report['failed']} failed, "
+                        f"{report['retries']} retries, {report['rate_limited']} rate-limited "
+                        f"({format_timings(report['timings'])})")
+            except Exception as e:
+                logger.error(f"Error in reminder scheduler: {e}")
+
+            # Wake up at the start of the next interval so each tick covers one minute
+            scheduled_at = next_tick_at()
+            await asyncio.sleep(scheduled_at - time.time())
+
+    async def run(self):
+        """Poll for updates until cancelled, with the reminder scheduler alongside."""
+        self.loop = asyncio.get_running_loop()
+        self.main_task = asyncio.current_task()
+
+        if not self.mini_app_url:
+            try:
+                bot_username = (await self.bot.get_me()).username
+                if bot_username:
+                    self.mini_app_url = f"https://t.me/{bot_username}/app"
+            except Exception as e:
+                logger.warning(f"Failed to get bot username: {e}")
+
+        if self.reminders_enabled:
+            self.reminder_task = asyncio.create_task(self._reminder_scheduler())
+
+        logger.info("Starting async bot polling...")
+        try:
+            await self.bot.remove_webhook()
+            await self.bot.infinity_polling(timeout=10, request_timeout=20)
+        finally:
+            if self.reminder_task:
+                self.reminder_task.cancel()
+                await self._db(self.reminder_lease.release)
+            await self.bot.close_session()
+            self.executor.shutdown(wait=False)
+            logger.info("Async bot stopped")
+
+    def start(self):
+        """Run the bot on a new event loop (blocks, run it in a separate thread)."""
+        try:
+            asyncio.run(self.run())
+        except asyncio.CancelledError:
+            pass
+
+    def stop(self):
+        """Stop polling and the reminder scheduler (callable from any thread, returns immediately)."""
+        logger.info("Stopping async bot...")
+        if self.loop and self.main_task:
+            self.loop.call_soon_threadsafe(self.main_task.cancel)
+
+
+def create_async_bot(token: str, app, db, reminders_enabled: bool = True) -> AsyncCheckBot:
+    """
+    Create and configure an asyncio bot instance.
+
+    Args:
+        token: Telegram Bot API token
+        app: Flask application instance
+        db: SQLAlchemy database instance
+        reminders_enabled: Whether to enable daily reminders
+
+    Returns:
+        Configured AsyncCheckBot instance
+    """
+    return AsyncCheckBot(token, app, db, reminders_enabled)
@@ -0,0 +1,251 @@
+"""
+Runtime-independent logic of the bot commands.
+
+Both the threaded runtime (app.bot) and the asyncio runtime (app.bot_async)
+build their replies here, so texts and database behaviour stay identical.
+Functions that touch the database must be called inside an application context.
+"""
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+import pytz
+from telebot import types
+
+from app import db
+from app.bot_service import get_daily_summary, format_summary_message
+from app.crud import get_or_create_user_settings, update_user_settings
+from app.models import User
+from app.query_stats import track_handler
+from app.routing import note_write, read_only
+from app.user_cache import get_user_snapshot
+
+logger = logging.getLogger(__name__)
+
+# (text, extra send_message keyword arguments)
+Reply = Tuple[str, Dict[str, Any]]
+
+WELCOME_TEXT = (
+    "<b>Привет, это check </b>— сервис для управления проектами и задачами. "
+    "Давай начнем, открывай мини апп"
+)
+
+HELP_TEXT = (
+    "<b>Команды</b>\n"
+    "/start — начать работу\n"
+    "/app — открыть мини апп\n"
+    "/summary — получить итоги дня\n"
+    "/settings — посмотреть настройки уведомлений\n"
+    "/remind — управление уведомлениями\n"
+    "/help — показать эту справку\n\n"
+    "<b>Управление уведомлениями:</b>\n"
+    "- <code>/remind on</code> — включить уведомления\n"
+    "- <code>/remind off</code> — отключить уведомления\n"
+    "- <code>/remind time HH:MM</code> — установить время\n"
+    "- <code>/remind tz TIMEZONE</code> — установить часовой пояс\n\n"
+)
+
+NOT_REGISTERED_TEXT = "❌ Вы не зарегистрированы. Используйте /start для начала работы."
+
+NO_APP_URL_TEXT = "❌ Mini App URL не настроен. Обратитесь к администратору."
+
+REMIND_USAGE_TEXT = (
+    "Используйте:\n"
+    "• `/remind on` - Включить\n"
+    "• `/remind off` - Отключить\n"
+    "• `/remind time HH:MM` - Установить время\n"
+    "• `/remind tz TIMEZONE` - Установить часовой пояс"
+)
+
+MARKDOWN = {'parse_mode': 'Markdown'}
+
+
+def app_markup(mini_app_url: Optional[str], text: str) -> Optional[types.InlineKeyboardMarkup]:
+    """
+    Build an inline keyboard with a single Mini App button.
+
+    Args:
+        mini_app_url: Mini App URL, no keyboard is built without it
+        text: Button caption
+
+    Returns:
+        Keyboard or None if it cannot be built
+    """
+    if not mini_app_url:
+        return None
+
+    try:
+        markup = types.InlineKeyboardMarkup()
+        markup.add(types.InlineKeyboardButton(text=text, web_app=types.WebAppInfo(url=mini_app_url)))
+        return markup
+    except Exception as e:
+        logger.warning(f"Failed to create WebApp button: {e}")
+        return None
+
+
+@track_handler("/start")
+def register_user(telegram_id: int) -> int:
+    """
+    Get or create the user for /start.
+
+    New users get default settings right away so they enter the reminder index.
+
+    Returns:
+        User ID
+    """
+    snapshot = get_user_snapshot(telegram_id)
+    if snapshot is not None:
+        return snapshot["user_id"]
+
+    user = User()
+    user.telegram_id = telegram_id
+    db.session.add(user)
+    db.session.commit()
+    note_write(telegram_id)
+
+    # Put the new user into the reminder index right away
+    get_or_create_user_settings(user.id)
+    return user.id
+
+
+def start_reply(mini_app_url: Optional[str]) -> Reply:
+    """Welcome message with the Mini App button, or with the keyboard removed."""
+    markup = app_markup(mini_app_url, "Открыть")
+    return WELCOME_TEXT, {'reply_markup': markup or types.ReplyKeyboardRemove()}
+
+
+@track_handler("/summary")
+def summary_reply(telegram_id: int) -> Reply:
+    """Daily summary of the user."""
+    snapshot = get_user_snapshot(telegram_id)
+    if snapshot is None:
+        return NOT_REGISTERED_TEXT, {}
+
+    with read_only(telegram_id):
+        summary = get_daily_summary(snapshot["user_id"])
+    return format_summary_message(summary), {}
+
+
+@track_handler("/settings")
+def settings_reply(telegram_id: int) -> Reply:
+    """Current reminder settings of the user."""
+    snapshot = get_user_snapshot(telegram_id)
+    if snapshot is None:
+        return NOT_REGISTERED_TEXT, {}
+
+    if snapshot["reminders_enabled"] is None:
+        # No settings row yet: create the defaults (this invalidates the snapshot)
+        settings = get_or_create_user_settings(snapshot["user_id"])
+        snapshot.update(
+            reminders_enabled=settings.reminders_enabled,
+            reminder_time=settings.reminder_time,
+            timezone=settings.timezone,
+        )
+
+    # Format settings message
+    status = "✅ Включены" if snapshot["reminders_enabled"] else "❌ Отключены"
+    time_str = snapshot["reminder_time"] if snapshot["reminder_time"] else "20:00 (по умолчанию)"
+    tz_str = snapshot["timezone"] if snapshot["timezone"] else "UTC (по умолчанию)"
+
+    settings_text = (
+        "<b>Настройки уведомлений</b>\n"
+        "Каждый день в указанное время вы будете получать уведомление с итогами дня\n\n"
+        f"<b>Статус:</b> {status}\n"
+        f"<b>Время:</b> {time_str}\n"
+        f"<b>Часовой пояс:</b> {tz_str}\n\n"
+        "<b>Команды для управления:</b>\n"
+        "- <code>/remind on</code> — включить уведомления\n"
+        "- <code>/remind off</code> — отключить уведомления\n"
+        "- <code>/remind time HH:MM</code> — установить время (например: <code>/remind time 21:30</code>)\n"
+        "- <code>/remind tz TIMEZONE</code> — установить часовой пояс (например: <code>/remind tz Europe/Moscow</code>)\n\n"
+        "Примеры часовых поясов:\n"
+        "- <code>Europe/Moscow</code> - МСК\n"
+        "- <code>Asia/Almaty</code> - Алматы\n"
+        "- <code>UTC</code> - UTC"
+    )
+    return settings_text, {}
+
+
+@track_handler("/remind")
+def remind_reply(telegram_id: int, text: str) -> Reply:
+    """Apply a /remind command and describe the result."""
+    snapshot = get_user_snapshot(telegram_id)
+    if snapshot is None:
+        return NOT_REGISTERED_TEXT, {}
+    user_id = snapshot["user_id"]
+
+    # Parse command arguments
+    args = text.split()
+
+    if len(args) < 2:
+        return "❌ Неверный формат команды.\n\n" + REMIND_USAGE_TEXT, MARKDOWN
+
+    action = args[1].lower()
+    if action in ('on', 'off', 'time', 'tz'):
+        note_write(telegram_id)
+
+    if action == 'on':
+        update_user_settings(user_id, reminders_enabled=True)
+        return "✅ Уведомления включены", {}
+
+    if action == 'off':
+        update_user_settings(user_id, reminders_enabled=False)
+        return "❌ Уведомления отключены", {}
+
+    if action == 'time':
+        if len(args) < 3:
+            return "❌ Укажите время в формате HH:MM\nНапример: `/remind time 21:30`", MARKDOWN
+
+        time_str = args[2]
+
+        # Validate time format
+        try:
+            time_parts = time_str.split(':')
+            if len(time_parts) != 2:
+                raise ValueError("Invalid format")
+
+            hour = int(time_parts[0])
+            minute = int(time_parts[1])
+
+            if hour < 0 or hour > 23 or minute < 0 or minute > 59:
+                raise ValueError("Invalid time values")
+        except (ValueError, IndexError):
+            return "❌ Неверный формат времени. Используйте HH:MM (например: 21:30)", MARKDOWN
+
+        update_user_settings(user_id, reminder_time=time_str)
+        return f"✅ Время уведомлений установлено: *{time_str}*", MARKDOWN
+
+    if action == 'tz':
+        if len(args) < 3:
+            return (
+                "❌ Укажите часовой пояс\n"
+                "Например: `/remind tz Europe/Moscow`\n\n"
+                "Список поясов: https://en.wikipedia.org/wiki/List_of_tz_database_time_zones",
+                MARKDOWN
+            )
+
+        timezone_str = args[2]
+
+        # Validate timezone
+        try:
+            pytz.timezone(timezone_str)
+        except pytz.exceptions.UnknownTimeZoneError:
+            return (
+                f"❌ Неизвестный часовой пояс: `{timezone_str}`\n\n"
+                "Примеры:\n"
+                "• Europe/Moscow\n"
+                "• Europe/Kiev\n"
+                "• Asia/Almaty\n"
+                "• UTC\n\n"
+                "Полный список: https://en.wikipedia.org/wiki/List_of_tz_database_time_zones",
+                MARKDOWN
+            )
+
+        update_user_settings(user_id, timezone=timezone_str)
+        return f"✅ Часовой пояс установлен: *{timezone_str}*", MARKDOWN
+
+    return "❌ Неизвестная команда. " + REMIND_USAGE_TEXT, MARKDOWN
+
+
+def reminder_send_kwargs(mini_app_url: Optional[str]) -> Dict[str, Any]:
+    """send_message keyword arguments of reminder messages (Markdown with the Mini App button)."""
+    return {'parse_mode': 'Markdown', 'reply_markup': app_markup(mini_app_url, "Открыть приложение")}
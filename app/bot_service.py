@@ -6,92 +6,134 @@ from typing import List, Dict, Any
 from app.models import User, Project, Task, TaskStatus, UserSettings
 from app import db
 from config import Config
-from app.crud import get_or_create_user_settings
 
 
 def get_daily_summary(user_id: int) -> Dict[str, Any]:
     """
     Generate daily summary for a user.
 
+    Counts are aggregated in SQL and only the task titles shown in the message
+    are fetched, so the cost does not grow with the user's task history.
+
     Args:
         user_id: User ID in the database
 
     Returns:
         Dictionary with summary data
     """
-    from sqlalchemy.orm import joinedload
-
-    user = User.query.get(user_id)
-    if not user:
+    summary = _build_summaries([user_id]).get(user_id)
+    if summary is None:
         return {"error": "User not found"}
+    return summary
 
-    # Get today's start (UTC timezone)
-    today_start = datetime.datetime.now(datetime.timezone.utc).replace(
-        hour=0, minute=0, second=0, microsecond=0
-    )
 
-    # Single query to get all projects with their tasks (eager loading)
-    projects = Project.query.filter_by(creator_id=user_id)\
-        .options(joinedload(Project.tasks))\
-        .all()
+def get_daily_summaries(user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Generate daily summaries for many users at once.
+
+    Uses a fixed number of set-based queries per chunk of
+    `Config.SUMMARY_BATCH_SIZE` users instead of separate queries per user.
+
+    Args:
+        user_ids: User IDs in the database
+
+    Returns:
+        Dictionary mapping user ID to summary data (same shape as get_daily_summary())
+    """
+    summaries: Dict[int, Dict[str, Any]] = {}
+    unique_ids = list(dict.fromkeys(user_ids))
+
+    for offset in range(0, len(unique_ids), Config.SUMMARY_BATCH_SIZE):
+        chunk = unique_ids[offset:offset + Config.SUMMARY_BATCH_SIZE]
+        summaries.update(_build_summaries(chunk))
+
+    return summaries
+
 
-    if not projects:
-        return {
+def _build_summaries(user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Build summaries for one chunk of users with three queries: users, projects
+    (carrying denormalized pending counts and last activity) and the capped list
+    of titles completed today together with per-project totals.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+
+    users = User.query.filter(User.id.in_(user_ids)).all()
+    projects = Project.query.filter(Project.creator_id.in_(user_ids))\
+        .order_by(Project.id)\
+        .all()
+    project_ids = [p.id for p in projects]
+
+    completed_by_project: Dict[int, List[Any]] = {}
+    completed_counts: Dict[int, int] = {}
+
+    if project_ids:
+        # Only the first SUMMARY_TASKS_SHOWN titles per project are displayed
+        ranked = db.session.query(
+            Task.project_id,
+            Task.title,
+            db.func.row_number().over(partition_by=Task.project_id, order_by=Task.id).label("position"),
+            db.func.count(Task.id).over(partition_by=Task.project_id).label("total"),
+        ).filter(
+            Task.project_id.in_(project_ids),
+            Task.status == TaskStatus.DONE,
+            Task.completed_at >= today_start,
+        ).subquery()
+        shown = db.session.query(ranked.c.project_id, ranked.c.title, ranked.c.total)\
+            .filter(ranked.c.position <= Config.SUMMARY_TASKS_SHOWN)\
+            .order_by(ranked.c.project_id, ranked.c.position)\
+            .all()
+        for row in shown:
+            completed_by_project.setdefault(row.project_id, []).append(row)
+            completed_counts[row.project_id] = row.total
+
+    summaries: Dict[int, Dict[str, Any]] = {}
+    for user in users:
+        summaries[user.id] = {
             "user": user,
             "total_projects": 0,
             "completed_today": [],
             "projects_with_pending": [],
             "stale_projects": [],
-            "summary_date": datetime.datetime.now(datetime.timezone.utc)
+            "summary_date": now
         }
 
-    completed_today = []
-    projects_with_pending = []
-    stale_projects = []
-
     for project in projects:
-        # Separate tasks by status (tasks already loaded via joinedload)
-        completed_today_tasks = [
-            t for t in project.tasks
-            if t.status == TaskStatus.DONE and t.completed_at and \
-            ((t.completed_at if t.completed_at.tzinfo is not None else t.completed_at.replace(tzinfo=datetime.timezone.utc)) >= today_start)
-        ]
-        pending_tasks_count = sum(
-            1 for t in project.tasks if t.status != TaskStatus.DONE)
-
-        # Add to completed list if has completed tasks today
-        if completed_today_tasks:
-            completed_today.append({
+        summary = summaries.get(project.creator_id)
+        if summary is None:
+            continue
+        summary["total_projects"] += 1
+
+        completed_count = completed_counts.get(project.id, 0)
+        if completed_count:
+            summary["completed_today"].append({
                 "project": project,
-                "tasks": completed_today_tasks
+                "tasks": completed_by_project.get(project.id, []),
+                "completed_count": completed_count
             })
 
-        # Add to pending list if has pending tasks
+        pending_tasks_count = project.pending_count
         if pending_tasks_count > 0:
-            projects_with_pending.append({
+            summary["projects_with_pending"].append({
                 "project": project,
                 "pending_count": pending_tasks_count
             })
 
-        # Check staleness
-        staleness = project.get_staleness_ratio()
+        last_activity = project.get_last_activity_date()
+        staleness = project.get_staleness_ratio(last_activity)
         if staleness >= 0.8:
-            stale_projects.append({
+            summary["stale_projects"].append({
                 "project": project,
-                "staleness_ratio": staleness
+                "staleness_ratio": staleness,
+                "last_activity": last_activity
             })
 
-    # Sort stale projects by staleness (most stale first)
-    stale_projects.sort(key=lambda x: x["staleness_ratio"], reverse=True)
+    for summary in summaries.values():
+        # Sort stale projects by staleness (most stale first)
+        summary["stale_projects"].sort(key=lambda x: x["staleness_ratio"], reverse=True)
 
-    return {
-        "user": user,
-        "total_projects": len(projects),
-        "completed_today": completed_today,
-        "projects_with_pending": projects_with_pending,
-        "stale_projects": stale_projects,
-        "summary_date": datetime.datetime.now(datetime.timezone.utc)
-    }
+    return summaries
 
 
 def format_summary_message(summary: Dict[str, Any]) -> str:
@@ -117,11 +159,12 @@ def format_summary_message(summary: Dict[str, Any]) -> str:
         for item in completed_today:
             project = item["project"]
             tasks = item["tasks"]
-            lines.append(f"\n*{project.short_name}* ({len(tasks)} задач)")
-            for task in tasks[:5]:  # Show max 5 tasks per project
+            count = item.get("completed_count", len(tasks))
+            lines.append(f"\n*{project.short_name}* ({count} задач)")
+            for task in tasks[:Config.SUMMARY_TASKS_SHOWN]:  # Show at most SUMMARY_TASKS_SHOWN tasks per project
                 lines.append(f"  • {task.title}")
-            if len(tasks) > 5:
-                lines.append(f"  • ... и ещё {len(tasks) - 5}")
+            if count > Config.SUMMARY_TASKS_SHOWN:
+                lines.append(f"  • ... и ещё {count - Config.SUMMARY_TASKS_SHOWN}")
         lines.append("")
     else:
         lines.append("Сегодня задачи не выполнялись\n")
@@ -154,7 +197,7 @@ def format_summary_message(summary: Dict[str, Any]) -> str:
             else:
                 emoji = "🟢"
 
-            last_activity = project.get_last_activity_date()
+            last_activity = item.get("last_activity") or project.get_last_activity_date()
             days_ago = (datetime.datetime.now(datetime.timezone.utc) -
                         last_activity.replace(tzinfo=datetime.timezone.utc)).days
 
@@ -163,7 +206,7 @@ def format_summary_message(summary: Dict[str, Any]) -> str:
         lines.append("")
 
     # Summary stats
-    total_completed = sum(len(item["tasks"]) for item in completed_today)
+    total_completed = sum(item.get("completed_count", len(item["tasks"])) for item in completed_today)
     total_pending = sum(item["pending_count"]
                         for item in projects_with_pending)
 
@@ -185,8 +228,36 @@ def get_reminder_message(user_id: int) -> str:
     Returns:
         Formatted reminder message
     """
-    summary = get_daily_summary(user_id)
+    return format_reminder_message(get_daily_summary(user_id))
+
+
+def get_reminder_messages(user_ids: List[int]) -> Dict[int, str]:
+    """
+    Generate reminder messages for all users of a reminder slot in one pass.
 
+    Args:
+        user_ids: User IDs in the database
+
+    Returns:
+        Dictionary mapping user ID to formatted reminder message
+    """
+    summaries = get_daily_summaries(user_ids)
+    return {
+        user_id: format_reminder_message(summaries.get(user_id, {"error": "User not found"}))
+        for user_id in user_ids
+    }
+
+
+def format_reminder_message(summary: Dict[str, Any]) -> str:
+    """
+    Format summary data into a short reminder message.
+
+    Args:
+        summary: Summary data from get_daily_summary() or get_daily_summaries()
+
+    Returns:
+        Formatted reminder message
+    """
     if "error" in summary:
         return "❌ Не удалось получить данные"
 
@@ -201,7 +272,7 @@ def get_reminder_message(user_id: int) -> str:
     lines = []
     lines.append("👋 *Время подвести итоги дня!*\n")
 
-    total_completed = sum(len(item["tasks"]) for item in completed_today)
+    total_completed = sum(item.get("completed_count", len(item["tasks"])) for item in completed_today)
     if total_completed > 0:
         lines.append(f"Сегодня вы выполнили *{total_completed}* задач!")
 
@@ -219,57 +290,50 @@ def get_reminder_message(user_id: int) -> str:
     return "\n".join(lines)
 
 
-def get_users_for_reminder() -> List[Dict[str, Any]]:
+def sync_reminder_index(now: datetime.datetime | None = None) -> int:
     """
-    Get list of users who should receive reminders at the current time.
+    Make sure every user is present in the reminder index.
+
+    Creates default settings for users that have none and schedules enabled
+    settings without a fire time. Fire times are computed once per
+    (timezone, reminder_time) slot, not once per user.
 
     Args:
-        current_hour: Current hour in UTC (0-23)
-        current_minute: Current minute (0-59)
+        now: Reference time (naive UTC), defaults to current time
 
     Returns:
-        List of dictionaries with user and settings
+        Number of settings rows that were scheduled
     """
-    import pytz
+    from sqlalchemy import insert
+
+    now = now or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
 
-    # Single query with eager loading of settings
-    users_with_settings = db.session.query(User, UserSettings)\
+    missing_user_ids = db.session.query(User.id)\
         .outerjoin(UserSettings, User.id == UserSettings.user_id)\
+        .filter(UserSettings.id.is_(None))\
+        .all()
+    if missing_user_ids:
+        db.session.execute(insert(UserSettings), [
+            {"user_id": user_id, "reminders_enabled": True,
+             "reminder_time": Config.DEFAULT_BOT_REMINDER_TIME, "timezone": Config.BOT_TIMEZONE}
+            for (user_id,) in missing_user_ids
+        ])
+
+    slots = db.session.query(UserSettings.timezone, UserSettings.reminder_time)\
+        .filter(UserSettings.reminders_enabled.is_(True),
+                UserSettings.next_reminder_at.is_(None))\
+        .distinct()\
         .all()
 
-    users_to_notify = []
-    utc_now = datetime.datetime.now(pytz.UTC)
-
-    for user, settings in users_with_settings:
-        # Create default settings if not exist
-        if not settings:
-            settings = get_or_create_user_settings(user.id)
-
-        # Skip if reminders are disabled
-        if not settings.reminders_enabled:
-            continue
-
-        # Parse reminder time with default fallback
-        try:
-            reminder_hour, reminder_minute = map(
-                int, (settings.reminder_time or Config.DEFAULT_BOT_REMINDER_TIME).split(':'))
-        except (ValueError, AttributeError):
-            reminder_hour, reminder_minute = 20, 0
-
-        # Get user's timezone with fallback to UTC
-        try:
-            user_tz = pytz.timezone(settings.timezone or "UTC")
-        except pytz.exceptions.UnknownTimeZoneError:
-            user_tz = pytz.UTC
-
-        # Convert current UTC time to user's timezone
-        user_now = utc_now.astimezone(user_tz)
-
-        # Check if it's time to send reminder
-        if user_now.hour == reminder_hour and user_now.minute == reminder_minute:
-            users_to_notify.append({
-                'user': user,
-                'settings': settings
-            })
-
-    return users_to_notify
+    scheduled = 0
+    for timezone, reminder_time in slots:
+        next_at = UserSettings.compute_next_reminder_at(reminder_time, timezone, now)
+        scheduled += db.session.query(UserSettings).filter(
+            UserSettings.reminders_enabled.is_(True),
+            UserSettings.next_reminder_at.is_(None),
+            UserSettings.timezone == timezone,
+            UserSettings.reminder_time == reminder_time,
+        ).update({UserSettings.next_reminder_at: next_at}, synchronize_session=False)
+
+    db.session.commit()
+    return scheduled
@@ -0,0 +1,80 @@
+"""
+Maintenance commands for the flask CLI (flask --app run.py <command>).
+"""
+import click
+from flask import Flask
+
+
+def register_commands(app: Flask) -> None:
+    """Register maintenance commands on the application."""
+
+    @app.cli.command("verify-aggregates")
+    @click.option("--repair", is_flag=True, help="Fix drifted project counters.")
+    def verify_aggregates_command(repair: bool):
+        """Check denormalized project counters against the task table."""
+        from app.crud import verify_project_aggregates
+
+        drifts = verify_project_aggregates(repair=repair)
+        for drift in drifts:
+            click.echo(
+                f"project {drift['project_id']}: stored {drift['stored']}, actual {drift['actual']}")
+
+        if not drifts:
+            click.echo("All project aggregates are consistent")
+        elif repair:
+            click.echo(f"Repaired {len(drifts)} projects")
+        else:
+            click.echo(f"Found {len(drifts)} inconsistent projects, run with --repair to fix")
+
+    @app.cli.command("set-webhook")
+    def set_webhook_command():
+        """Point Telegram at TELEGRAM_WEBHOOK_URL (BOT_MODE=webhook)."""
+        import telebot
+
+        from app.bot import use_api_url
+        from app.webhook import WEBHOOK_MAX_CONNECTIONS
+
+        url = app.config.get("TELEGRAM_WEBHOOK_URL")
+        secret = app.config.get("TELEGRAM_WEBHOOK_SECRET")
+        if not app.config.get("TELEGRAM_BOT_TOKEN") or not url or not secret:
+            raise click.ClickException(
+                "TELEGRAM_BOT_TOKEN, TELEGRAM_WEBHOOK_URL and TELEGRAM_WEBHOOK_SECRET are required")
+
+        use_api_url(app.config.get("TELEGRAM_API_URL"))
+        telebot.TeleBot(app.config["TELEGRAM_BOT_TOKEN"]).set_webhook(
+            url=url, secret_token=secret, max_connections=WEBHOOK_MAX_CONNECTIONS)
+        click.echo(f"Webhook set to {url}")
+
+    @app.cli.command("archive-tasks")
+    @click.option("--older-than-days", type=int, default=None,
+                  help="Archive tasks completed more than this many days ago.")
+    @click.option("--batch-size", type=int, default=None, help="Tasks moved per transaction.")
+    def archive_tasks_command(older_than_days: int | None, batch_size: int | None):
+        """Move old completed tasks to the task_archive table."""
+        from app.archive import archive_completed_tasks
+        from config import Config
+
+        archived = archive_completed_tasks(
+            older_than_days=older_than_days if older_than_days is not None else Config.TASK_ARCHIVE_AFTER_DAYS,
+            batch_size=batch_size or Config.TASK_ARCHIVE_BATCH_SIZE,
+        )
+        click.echo(f"Archived {archived} tasks")
+
+    @app.cli.command("generate-data")
+    @click.option("--users", type=int, default=1000, show_default=True, help="Number of users.")
+    @click.option("--projects", type=int, default=10, show_default=True, help="Projects per user.")
+    @click.option("--tasks", type=int, default=100, show_default=True, help="Tasks per project.")
+    @click.option("--seed", type=int, default=42, show_default=True, help="Random seed.")
+    @click.option("--years", type=float, default=3, show_default=True, help="How far back task history goes.")
+    @click.option("--batch-size", type=int, default=50000, show_default=True, help="Rows per INSERT batch.")
+    def generate_data_command(users: int, projects: int, tasks: int, seed: int, years: float, batch_size: int):
+        """Fill the database with synthetic users, projects and tasks for scale testing (run it on an idle database)."""
+        import time
+
+        from app.generate import generate_data
+
+        started_at = time.monotonic()
+        created = generate_data(users, projects, tasks, seed=seed, years=years, batch_size=batch_size)
+        click.echo(
+            f"Created {created['users']} users, {created['projects']} projects and {created['tasks']} tasks "
+            f"in {time.monotonic() - started_at:.1f}s")
@@ -1,10 +1,14 @@
 from app import db
-from app.models import Project, Task, ProjectPeriodicity, UserSettings
+from app.models import Project, Task, TaskArchive, TaskStatus, ProjectPeriodicity, UserSettings
+from app.user_cache import invalidate_user
+import base64
 import datetime
-from typing import Optional
+import json
+from typing import Optional, Any
 import logging
 
 from flask_sqlalchemy.query import Query
+from config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -68,12 +72,363 @@ def create_project(
         raise
 
 
-def update_task(task_id: int, title: str) -> Task | None:
+def _update_project_aggregates(
+    project_id: int,
+    pending_delta: int = 0,
+    done_delta: int = 0,
+    last_activity: datetime.datetime | None = None,
+    recompute_last_activity: bool = False,
+) -> None:
+    """
+    Обновляет денормализованные счётчики проекта одним UPDATE без коммита
+
+    :param project_id: ID проекта
+    :param pending_delta: Изменение числа незавершённых задач
+    :param done_delta: Изменение числа выполненных задач
+    :param last_activity: Новое время последней активности
+    :param recompute_last_activity: Пересчитать последнюю активность по задачам
+    """
+    values: dict[Any, Any] = {}
+    if pending_delta:
+        values[Project.pending_count] = Project.pending_count + pending_delta
+    if done_delta:
+        values[Project.done_count] = Project.done_count + done_delta
+    if last_activity is not None:
+        values[Project.last_activity_at] = last_activity
+    elif recompute_last_activity:
+        db.session.flush()
+        # Archived tasks count as activity too
+        completed_at = db.union_all(
+            db.select(Task.completed_at).where(Task.project_id == project_id),
+            db.select(TaskArchive.completed_at).where(TaskArchive.project_id == project_id),
+        ).subquery()
+        values[Project.last_activity_at] = db.select(db.func.max(completed_at.c.completed_at))\
+            .scalar_subquery()
+
+    if values:
+        db.session.query(Project).filter(Project.id == project_id)\
+            .update(values, synchronize_session=False)
+
+
+def add_task(project_id: int, title: str, commit: bool = True) -> Task:
+    """
+    Создает новую задачу в конце списка незавершённых задач проекта
+
+    :param project_id: ID проекта
+    :param title: Название задачи
+    :param commit: Зафиксировать транзакцию
+    :return: Созданная задача
+    """
+    try:
+        # Highest order in the project, served by idx_task_project_order.
+        # Completed tasks keep their old order, so this always appends.
+        max_order = db.session.query(db.func.max(Task.order)).filter(
+            Task.project_id == project_id
+        ).scalar() or 0
+
+        task = Task()
+        task.title = title
+        task.status = TaskStatus.TODO
+        task.project_id = project_id
+        task.order = max_order + Config.TASK_ORDER_GAP  # Add at the end
+
+        db.session.add(task)
+        _update_project_aggregates(project_id, pending_delta=1)
+
+        if commit:
+            db.session.commit()
+        return task
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to create task in project {project_id}: {e}")
+        raise
+
+
+def toggle_task(task: Task, commit: bool = True) -> Task:
+    """
+    Переключает статус задачи между TODO и DONE
+
+    :param task: Задача
+    :param commit: Зафиксировать транзакцию
+    :return: Обновленная задача
+    """
+    try:
+        # Toggle status: TODO <-> DONE (skip IN_PROGRESS for simple toggle)
+        if task.status == TaskStatus.DONE:
+            task.status = TaskStatus.TODO
+            task.completed_at = None  # Clear completion time when unmarking as done
+            _update_project_aggregates(task.project_id, pending_delta=1, done_delta=-1,
+                                       recompute_last_activity=True)
+        else:
+            task.status = TaskStatus.DONE
+            task.completed_at = datetime.datetime.now(
+                datetime.timezone.utc)  # Set completion time in UTC
+            _update_project_aggregates(task.project_id, pending_delta=-1, done_delta=1,
+                                       last_activity=task.completed_at)
+
+        if commit:
+            db.session.commit()
+        return task
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to toggle task {task.id}: {e}")
+        raise
+
+
+def rebalance_task_order(project_id: int, commit: bool = True) -> None:
+    """
+    Равномерно перераспределяет порядок незавершённых задач проекта
+    (шаг Config.TASK_ORDER_GAP) одним UPDATE
+
+    :param project_id: ID проекта
+    :param commit: Зафиксировать транзакцию
+    """
+    try:
+        db.session.flush()
+        task_ids = [
+            task_id for (task_id,) in db.session.query(Task.id).filter(
+                Task.project_id == project_id,
+                Task.status != TaskStatus.DONE
+            ).order_by(Task.order, Task.id)
+        ]
+        if task_ids:
+            db.session.query(Task).filter(Task.id.in_(task_ids)).update(
+                {Task.order: db.case(
+                    {task_id: (index + 1) * Config.TASK_ORDER_GAP for index, task_id in enumerate(task_ids)},
+                    value=Task.id
+                )},
+                synchronize_session="fetch"
+            )
+
+        if commit:
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to rebalance task order in project {project_id}: {e}")
+        raise
+
+
+def move_task(task: Task, after_id: int | None = None, before_id: int | None = None,
+              commit: bool = True) -> Task:
+    """
+    Перемещает незавершённую задачу сразу после `after_id` или перед `before_id`.
+    Обычно обновляется одна строка; если между соседями не осталось места,
+    порядок проекта перераспределяется
+
+    :param task: Перемещаемая задача
+    :param after_id: ID задачи, после которой встанет перемещаемая
+    :param before_id: ID задачи, перед которой встанет перемещаемая
+    :param commit: Зафиксировать транзакцию
+    :return: Перемещённая задача
+    :raises ValueError: Если опорная задача не найдена или указана неверно
+    """
+    if (after_id is None) == (before_id is None):
+        raise ValueError("Exactly one of after_id and before_id is required")
+    anchor_id = after_id if after_id is not None else before_id
+    if anchor_id == task.id or task.status == TaskStatus.DONE:
+        raise ValueError("Invalid move")
+
+    try:
+        incomplete = db.session.query(Task.order).filter(
+            Task.project_id == task.project_id,
+            Task.status != TaskStatus.DONE,
+            Task.id != task.id
+        )
+
+        for attempt in range(2):
+            anchor_order = incomplete.filter(Task.id == anchor_id).scalar()
+            if anchor_order is None:
+                raise ValueError("Anchor task not found")
+
+            if after_id is not None:
+                lower = anchor_order
+                upper = incomplete.filter(Task.order > anchor_order)\
+                    .order_by(Task.order).limit(1).scalar()
+                if upper is None:
+                    upper = lower + 2 * Config.TASK_ORDER_GAP
+            else:
+                upper = anchor_order
+                lower = incomplete.filter(Task.order < anchor_order)\
+                    .order_by(Task.order.desc()).limit(1).scalar()
+                if lower is None:
+                    lower = upper - 2 * Config.TASK_ORDER_GAP
+
+            if upper - lower > 1:
+                task.order = (lower + upper) // 2
+                break
+
+            # No room left between the neighbours: spread the project's tasks out and retry
+            rebalance_task_order(task.project_id, commit=False)
+        else:
+            raise RuntimeError(f"Failed to find a free position in project {task.project_id}")
+
+        if commit:
+            db.session.commit()
+        return task
+    except ValueError:
+        raise
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to move task {task.id}: {e}")
+        raise
+
+
+def encode_task_cursor(task: Task | TaskArchive) -> str:
+    """
+    Кодирует позицию задачи в ленте проекта в непрозрачный курсор.
+    Завершённые задачи идут по (completed_at, id), незавершённые — по (order, id)
+
+    :param task: Задача
+    :return: Курсор
+    """
+    if task.status == TaskStatus.DONE:
+        payload = ["d", task.completed_at.isoformat(), task.id]
+    else:
+        payload = ["o", task.order, task.id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_task_cursor(cursor: str) -> tuple[str, Any, int]:
+    """
+    Разбирает курсор, созданный encode_task_cursor
+
+    :param cursor: Курсор
+    :return: Кортеж (сегмент, ключ сортировки, id задачи)
+    :raises ValueError: Если курсор повреждён
+    """
+    try:
+        segment, key, task_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if segment == "d":
+            # Completed tasks always have completed_at (ck_task_done_completed_at)
+            key = datetime.datetime.fromisoformat(key)
+        elif segment != "o" or not isinstance(key, int):
+            raise ValueError
+        return segment, key, int(task_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _keyset_after(key_column, key, task_id: int, backward: bool):
+    """Условие «строго после (key, id)» в порядке обхода (или до него при backward)"""
+    if backward:
+        return (key_column < key) | ((key_column == key) & (Task.id < task_id))
+    return (key_column > key) | ((key_column == key) & (Task.id > task_id))
+
+
+def _task_segment_query(project_id: int, segment: str, position: tuple[Any, int] | None,
+                        backward: bool, limit: int) -> list[Task]:
+    """Одна страница сегмента ленты (индексы по (project_id, completed_at, id) и (project_id, order))"""
+    if segment == "d":
+        key_column = Task.completed_at
+        query = Task.query.filter(Task.project_id == project_id, Task.status == TaskStatus.DONE)
+    else:
+        key_column = Task.order
+        query = Task.query.filter(Task.project_id == project_id, Task.status != TaskStatus.DONE)
+
+    if position is not None:
+        query = query.filter(_keyset_after(key_column, position[0], position[1], backward))
+
+    if backward:
+        query = query.order_by(key_column.desc(), Task.id.desc())
+    else:
+        query = query.order_by(key_column, Task.id)
+    return query.limit(limit).all()
+
+
+def get_task_page(project_id: int, after: str | None = None, before: str | None = None,
+                  limit: int = Config.TASK_PAGE_SIZE) -> tuple[list[Task], str | None]:
+    """
+    Возвращает страницу ленты задач проекта с keyset-пагинацией.
+    Порядок как на странице проекта: завершённые по completed_at, затем незавершённые по order.
+    Без курсоров возвращается начало ленты; `before` листает назад (к старой истории)
+
+    :param project_id: ID проекта
+    :param after: Курсор, после которого начинается страница
+    :param before: Курсор, перед которым заканчивается страница
+    :param limit: Размер страницы
+    :return: Задачи в порядке ленты и курсор следующей страницы в том же направлении (None, если это конец)
+    :raises ValueError: Если курсор повреждён или указаны оба курсора
+    """
+    if after is not None and before is not None:
+        raise ValueError("Use either after or before, not both")
+
+    backward = before is not None
+    segment, key, task_id = decode_task_cursor(before or after) if (before or after) else ("d", None, None)
+    position = (key, task_id) if task_id is not None else None
+
+    # Walk the cursor's segment first, then continue into the neighbouring one
+    segments = ["o", "d"] if backward else ["d", "o"]
+    segments = segments[segments.index(segment):]
+
+    tasks: list[Task] = []
+    for current in segments:
+        tasks += _task_segment_query(project_id, current, position if current == segment else None,
+                                     backward, limit + 1 - len(tasks))
+        if len(tasks) > limit:
+            break
+
+    has_more = len(tasks) > limit
+    tasks = tasks[:limit]
+    next_cursor = encode_task_cursor(tasks[-1]) if has_more and tasks else None
+    if backward:
+        tasks.reverse()
+    return tasks, next_cursor
+
+
+def get_project_page_tasks(project_id: int, history_limit: int = Config.TASK_HISTORY_INITIAL) -> tuple[list[Task], str | None]:
+    """
+    Задачи для первой отрисовки страницы проекта: последние завершённые и все незавершённые.
+    Объём не зависит от длины истории проекта
+
+    :param project_id: ID проекта
+    :param history_limit: Сколько последних завершённых задач показать
+    :return: Задачи в порядке ленты и курсор для подгрузки более старых (None, если их нет)
+    """
+    completed = _task_segment_query(project_id, "d", None, backward=True, limit=history_limit + 1)
+    has_more = len(completed) > history_limit
+    completed = completed[:history_limit]
+    history_cursor = encode_task_cursor(completed[-1]) if has_more else None
+    completed.reverse()
+
+    incomplete = _task_segment_query(project_id, "o", None, backward=False, limit=None)
+    return completed + incomplete, history_cursor
+
+
+def get_archived_tasks_page(project_id: int, before: str | None = None,
+                            limit: int = Config.TASK_PAGE_SIZE) -> tuple[list[TaskArchive], str | None]:
+    """
+    Возвращает страницу архивных задач проекта, от новых к старым по курсору
+
+    :param project_id: ID проекта
+    :param before: Курсор, перед которым заканчивается страница
+    :param limit: Размер страницы
+    :return: Задачи по возрастанию completed_at и курсор более старой страницы (None, если это конец)
+    :raises ValueError: Если курсор повреждён
+    """
+    query = TaskArchive.query.filter(TaskArchive.project_id == project_id)
+    if before is not None:
+        segment, completed_at, task_id = decode_task_cursor(before)
+        if segment != "d":
+            raise ValueError("Invalid cursor")
+        query = query.filter(
+            (TaskArchive.completed_at < completed_at)
+            | ((TaskArchive.completed_at == completed_at) & (TaskArchive.id < task_id))
+        )
+
+    tasks = query.order_by(TaskArchive.completed_at.desc(), TaskArchive.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_task_cursor(tasks[limit - 1]) if len(tasks) > limit else None
+    tasks = tasks[:limit]
+    tasks.reverse()
+    return tasks, next_cursor
+
+
+def update_task(task_id: int, title: str, commit: bool = True) -> Task | None:
     """
     Обновляет название задачи
 
     :param task_id: ID задачи
     :param title: Новое название задачи
+    :param commit: Зафиксировать транзакцию
     :return: Обновленная задача или None, если задача не найдена
     """
     try:
@@ -82,7 +437,8 @@ def update_task(task_id: int, title: str) -> Task | None:
             return None
         
         task.title = title
-        db.session.commit()
+        if commit:
+            db.session.commit()
         return task
     except Exception as e:
         db.session.rollback()
@@ -90,11 +446,12 @@ def update_task(task_id: int, title: str) -> Task | None:
         raise
 
 
-def delete_task(task_id: int) -> bool:
+def delete_task(task_id: int, commit: bool = True) -> bool:
     """
     Удаляет задачу из базы данных
 
     :param task_id: ID задачи
+    :param commit: Зафиксировать транзакцию
     :return: True, если задача была удалена, False, если задача не найдена
     """
     try:
@@ -103,7 +460,12 @@ def delete_task(task_id: int) -> bool:
             return False
         
         db.session.delete(task)
-        db.session.commit()
+        if task.status == TaskStatus.DONE:
+            _update_project_aggregates(task.project_id, done_delta=-1, recompute_last_activity=True)
+        else:
+            _update_project_aggregates(task.project_id, pending_delta=-1)
+        if commit:
+            db.session.commit()
         return True
     except Exception as e:
         db.session.rollback()
@@ -160,6 +522,7 @@ def update_project(
 def delete_project(project_id: int) -> bool:
     """
     Удаляет проект из базы данных вместе со всеми его задачами
+    (счётчики задач удаляются вместе со строкой проекта)
 
     :param project_id: ID проекта
     :return: True, если проект был удален, False, если проект не найден
@@ -178,6 +541,65 @@ def delete_project(project_id: int) -> bool:
         raise
 
 
+def verify_project_aggregates(repair: bool = False) -> list[dict[str, Any]]:
+    """
+    Сверяет денормализованные счётчики проектов с таблицами задач и архива
+
+    :param repair: Исправить найденные расхождения
+    :return: Список расхождений (project_id, stored, actual)
+    """
+    is_done = Task.status == TaskStatus.DONE
+    actual_rows = db.session.query(
+        Task.project_id,
+        db.func.sum(db.case((is_done, 0), else_=1)),
+        db.func.sum(db.case((is_done, 1), else_=0)),
+        db.func.max(Task.completed_at),
+    ).group_by(Task.project_id).all()
+    actual = {row[0]: tuple(row[1:]) for row in actual_rows}
+
+    # Archived tasks are completed tasks too
+    archive_rows = db.session.query(
+        TaskArchive.project_id,
+        db.func.count(TaskArchive.id),
+        db.func.max(TaskArchive.completed_at),
+    ).group_by(TaskArchive.project_id).all()
+    for project_id, archived_count, archived_last in archive_rows:
+        pending_count, done_count, last_activity_at = actual.get(project_id, (0, 0, None))
+        if last_activity_at is None or archived_last > last_activity_at:
+            last_activity_at = archived_last
+        actual[project_id] = (pending_count, done_count + archived_count, last_activity_at)
+
+    drifts = []
+    stored_rows = db.session.query(
+        Project.id, Project.pending_count, Project.done_count, Project.last_activity_at
+    ).all()
+    for project_id, pending_count, done_count, last_activity_at in stored_rows:
+        expected = actual.get(project_id, (0, 0, None))
+        if (pending_count, done_count, last_activity_at) != expected:
+            drifts.append({
+                "project_id": project_id,
+                "stored": (pending_count, done_count, last_activity_at),
+                "actual": expected,
+            })
+
+    if repair and drifts:
+        try:
+            for drift in drifts:
+                pending_count, done_count, last_activity_at = drift["actual"]
+                db.session.query(Project).filter(Project.id == drift["project_id"]).update({
+                    Project.pending_count: pending_count,
+                    Project.done_count: done_count,
+                    Project.last_activity_at: last_activity_at,
+                }, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to repair project aggregates: {e}")
+            raise
+
+    return drifts
+
+
 # ===== UserSettings CRUD =====
 
 def get_user_settings(user_id: int) -> UserSettings | None:
@@ -190,8 +612,8 @@ def get_user_settings(user_id: int) -> UserSettings | None:
     return UserSettings.query.filter_by(user_id=user_id).first()
 
 
-def get_or_create_user_settings(user_id: int, default_time: str = "20:00", 
-                                default_timezone: str = "UTC") -> UserSettings:
+def get_or_create_user_settings(user_id: int, default_time: str = Config.DEFAULT_BOT_REMINDER_TIME,
+                                default_timezone: str = Config.BOT_TIMEZONE) -> UserSettings:
     """
     Получает или создаёт настройки пользователя
     
@@ -209,8 +631,10 @@ def get_or_create_user_settings(user_id: int, default_time: str = "20:00",
             settings.reminders_enabled = True
             settings.reminder_time = default_time
             settings.timezone = default_timezone
+            settings.schedule_next_reminder()
             db.session.add(settings)
             db.session.commit()
+            invalidate_user(user_id)
         
         return settings
     except Exception as e:
@@ -249,8 +673,11 @@ def update_user_settings(user_id: int,
         
         if timezone is not None:
             settings.timezone = timezone
+
+        settings.schedule_next_reminder()
         
         db.session.commit()
+        invalidate_user(user_id)
         return settings
     except ValueError:
         # Re-raise validation errors without rollback
@@ -275,6 +702,7 @@ def delete_user_settings(user_id: int) -> bool:
         
         db.session.delete(settings)
         db.session.commit()
+        invalidate_user(user_id)
         return True
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,236 @@
+"""
+Rate-limit-aware message delivery for the Telegram bot.
+
+Bulk sends (daily reminders) go through a bounded pool of worker threads that
+share a global token bucket sized to Telegram's broadcast limit and respect a
+minimal interval between messages to the same chat. Send latency, outcomes
+and errors by class are recorded in app.metrics.
+"""
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import requests
+from telebot.apihelper import ApiTelegramException
+
+from app.metrics import registry
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# (chat_id, text, extra send_message keyword arguments)
+OutgoingMessage = Tuple[int, str, Dict[str, Any]]
+
+send_duration = registry.histogram(
+    "telegram_send_duration_seconds", "Duration of one sendMessage call of a batch send (each attempt)")
+messages_total = registry.counter(
+    "telegram_messages_total", "Batch messages by final result (sent or failed)", ("result",))
+# Flood control (429) answers are counted as error_class="flood_control"
+send_errors = registry.counter(
+    "telegram_send_errors_total", "Failed sendMessage attempts by error class", ("error_class",))
+
+
+def error_class(error: Exception) -> str:
+    """Low-cardinality name of a send error: Bot API error code or exception type."""
+    if isinstance(error, ApiTelegramException):
+        if error.error_code == 429:
+            return "flood_control"
+        if error.error_code >= 500:
+            return "server_error"
+        return f"api_{error.error_code}"
+    return type(error).__name__
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Tokens refill continuously at `rate` per second up to `capacity`. A pause
+    (e.g. after a 429 response) blocks every consumer until it expires.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until one token is available and take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                    self._updated_at = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for the given number of seconds."""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0
+            self._updated_at = self._paused_until
+
+
+class MessageDelivery:
+    """
+    Sends batches of messages with a bounded worker pool.
+
+    Every send takes a token from the global bucket and waits for the per-chat
+    interval. Flood-control errors (429) pause the whole pipeline for the
+    `retry_after` reported by Telegram; server and network errors are retried
+    with exponential backoff.
+    """
+
+    def __init__(self, bot, workers: int = Config.REMINDER_DELIVERY_WORKERS,
+                 global_rate: float = Config.TELEGRAM_GLOBAL_RATE_LIMIT,
+                 per_chat_interval: float = Config.TELEGRAM_PER_CHAT_INTERVAL,
+                 max_retries: int = Config.REMINDER_DELIVERY_MAX_RETRIES):
+        """
+        Args:
+            bot: telebot.TeleBot instance used to send messages
+            workers: Number of concurrent sender threads
+            global_rate: Maximum messages per second across all chats
+            per_chat_interval: Minimal delay between two messages to one chat (seconds)
+            max_retries: Retries per message after the first attempt
+        """
+        self.bot = bot
+        self.workers = max(1, workers)
+        self.bucket = TokenBucket(global_rate)
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self._chat_next_at: Dict[int, float] = {}
+        self._chat_lock = threading.Lock()
+
+    def send_batch(self, messages: Iterable[OutgoingMessage],
+                   on_result: Optional[Callable[[OutgoingMessage, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Send all messages and wait until the batch is drained.
+
+        Args:
+            messages: Iterable of (chat_id, text, send_message kwargs)
+            on_result: Called from a worker thread with each message and its outcome
+                (sent, retries, rate_limited, error, permanent)
+
+        Returns:
+            Dictionary with total, sent, failed, retries, rate_limited counters
+            and the drain duration in seconds
+        """
+        report = {"total": 0, "sent": 0, "failed": 0, "retries": 0, "rate_limited": 0, "duration": 0.0}
+        report_lock = threading.Lock()
+        source: Iterator[OutgoingMessage] = iter(messages)
+        source_lock = threading.Lock()
+        started_at = time.monotonic()
+
+        def worker():
+            while True:
+                with source_lock:
+                    message = next(source, None)
+                if message is None:
+                    return
+
+                stats = self._send_with_retry(*message)
+                messages_total.inc(result="sent" if stats["sent"] else "failed")
+                if on_result is not None:
+                    try:
+                        on_result(message, stats)
+                    except Exception as e:
+                        logger.error(f"Delivery result callback failed: {e}")
+                with report_lock:
+                    report["total"] += 1
+                    report["sent" if stats["sent"] else "failed"] += 1
+                    report["retries"] += stats["retries"]
+                    report["rate_limited"] += stats["rate_limited"]
+
+        threads = [
+            threading.Thread(target=worker, name=f"delivery-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        with self._chat_lock:
+            self._chat_next_at.clear()
+
+        report["duration"] = time.monotonic() - started_at
+        return report
+
+    def _wait_for_chat(self, chat_id: int) -> None:
+        """Reserve the next send slot for a chat and sleep until it comes."""
+        with self._chat_lock:
+            now = time.monotonic()
+            send_at = max(now, self._chat_next_at.get(chat_id, 0.0))
+            self._chat_next_at[chat_id] = send_at + self.per_chat_interval
+        if send_at > now:
+            time.sleep(send_at - now)
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with jitter, capped at 30 seconds."""
+        return min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.8, 1.2)
+
+    def _record_error(self, error: Exception, started_at: float) -> None:
+        send_duration.observe(time.perf_counter() - started_at)
+        send_errors.inc(error_class=error_class(error))
+
+    def _send_with_retry(self, chat_id: int, text: str, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one message, retrying on flood control and transient errors."""
+        # permanent: retrying later will not help either (blocked bot, deleted chat, bad request)
+        stats = {"sent": False, "retries": 0, "rate_limited": 0, "error": None, "permanent": False}
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                stats["retries"] += 1
+
+            self.bucket.acquire()
+            self._wait_for_chat(chat_id)
+
+            started_at = time.perf_counter()
+            try:
+                self.bot.send_message(chat_id, text, **kwargs)
+                send_duration.observe(time.perf_counter() - started_at)
+                stats["sent"] = True
+                return stats
+            except ApiTelegramException as e:
+                self._record_error(e, started_at)
+                stats["error"] = f"{e.error_code}: {e.description}"
+                if e.error_code == 429:
+                    retry_after = (e.result_json.get("parameters") or {}).get("retry_after", 1)
+                    stats["rate_limited"] += 1
+                    logger.warning(f"Flood control hit for chat {chat_id}, pausing for {retry_after}s")
+                    self.bucket.pause(retry_after)
+                    continue
+                if e.error_code >= 500:
+                    logger.warning(f"Telegram error {e.error_code} for chat {chat_id}, retrying")
+                    time.sleep(self._backoff(attempt))
+                    continue
+                # Blocked bot, deleted chat, bad request: retrying will not help
+                logger.error(f"Failed to send message to chat {chat_id}: {e}")
+                stats["permanent"] = True
+                return stats
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record_error(e, started_at)
+                stats["error"] = f"{type(e).__name__}: {e}"
+                logger.warning(f"Network error for chat {chat_id}: {e}, retrying")
+                time.sleep(self._backoff(attempt))
+            except Exception as e:
+                self._record_error(e, started_at)
+                stats["error"] = f"{type(e).__name__}: {e}"
+                logger.error(f"Failed to send message to chat {chat_id}: {e}")
+                return stats
+
+        logger.error(f"Giving up on chat {chat_id} after {self.max_retries} retries")
+        return stats
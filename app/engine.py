@@ -0,0 +1,99 @@
+"""
+Database engine profiles.
+
+A profile (Config.ENGINE_PROFILES) holds the SQLAlchemy engine options of one
+database backend and, for SQLite, the PRAGMAs executed on every new connection.
+`engine_options` is used before the engine is created, `init_engine` after it,
+so the PRAGMAs are in place before the first connection is checked out.
+"""
+import copy
+import logging
+from typing import Any, Dict
+
+from flask import Flask
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, make_url
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_profile_name(app: Flask) -> str:
+    """Configured profile name, or the one matching the database URL's backend."""
+    name = app.config.get("DB_ENGINE_PROFILE")
+    if name:
+        return name
+
+    backend = make_url(app.config["SQLALCHEMY_DATABASE_URI"]).get_backend_name()
+    return backend if backend in app.config.get("ENGINE_PROFILES", {}) else "default"
+
+
+def get_profile(app: Flask) -> Dict[str, Any]:
+    """The engine profile the application runs with."""
+    name = resolve_profile_name(app)
+    profiles = app.config.get("ENGINE_PROFILES", {})
+    if name not in profiles:
+        raise ValueError(f"Unknown DB_ENGINE_PROFILE {name!r}, expected one of {sorted(profiles)}")
+    return profiles[name]
+
+
+def engine_options(app: Flask) -> Dict[str, Any]:
+    """
+    SQLAlchemy engine options of the application's profile.
+
+    Options already present in SQLALCHEMY_ENGINE_OPTIONS take precedence.
+    """
+    options = copy.deepcopy(get_profile(app).get("engine_options", {}))
+    options.update(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    return options
+
+
+def _apply_pragmas(engine: Engine, pragmas: Dict[str, Any]) -> None:
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        finally:
+            cursor.close()
+
+
+def init_engine(app: Flask, engine: Engine) -> None:
+    """
+    Finish setting up an engine created with `engine_options` and log the settings in effect.
+
+    Must be called before the engine opens its first connection.
+    """
+    pragmas = get_profile(app).get("pragmas")
+    if pragmas and engine.dialect.name == "sqlite":
+        _apply_pragmas(engine, pragmas)
+
+    logger.info(f"Database engine {engine.url.render_as_string(hide_password=True)} "
+                f"(profile {resolve_profile_name(app)}): {engine_report(engine, engine_options(app))}")
+
+
+def engine_report(engine: Engine, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Settings actually in effect, read back from the database and the pool.
+
+    Args:
+        engine: Engine to report on
+        options: Engine options it was created with (`engine_options`)
+
+    Returns:
+        Dictionary of setting name -> value (with an "error" key if the database is unreachable)
+    """
+    report: Dict[str, Any] = {"pool": engine.pool.status()}
+
+    try:
+        with engine.connect() as connection:
+            if engine.dialect.name == "sqlite":
+                for pragma in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size"):
+                    report[pragma] = connection.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+            elif engine.dialect.name == "postgresql":
+                report["statement_timeout"] = connection.execute(text("SHOW statement_timeout")).scalar()
+                report["pool_pre_ping"] = options.get("pool_pre_ping", False)
+    except Exception as e:
+        report["error"] = str(e)
+
+    return report
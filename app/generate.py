@@ -0,0 +1,263 @@
+"""
+Synthetic data generator for scale testing (flask generate-data).
+
+Creates users x projects x tasks with realistic distributions and writes them
+with Core bulk inserts in large batches, so millions of rows take seconds
+instead of the hours an ORM flush per object would. Ids are assigned up front
+(continuing after the existing rows), and derived columns are computed while
+generating: project counters and last_activity_at, user settings with
+next_reminder_at. The same seed produces the same dataset (timestamps are
+relative to the time of the run).
+
+Because ids are taken from max(id) before the run, the generator must run on an
+idle database: rows inserted concurrently by the web app or the worker would
+collide with the pre-assigned ids. On PostgreSQL the id sequences are moved past
+the generated rows afterwards, since explicit ids do not advance them.
+"""
+import datetime
+import logging
+import random
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import func, insert, text
+
+from app import db
+from app.models import Project, Task, TaskArchive, TaskStatus, User, UserSettings
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# (timezone, weight) of the user base
+TIMEZONES = [
+    ("Europe/Moscow", 45), ("Asia/Almaty", 10), ("Europe/Kiev", 8), ("Asia/Yekaterinburg", 8),
+    ("Europe/Berlin", 6), ("Asia/Novosibirsk", 5), ("Europe/London", 5), ("UTC", 5),
+    ("America/New_York", 4), ("Asia/Tbilisi", 4),
+]
+
+# (hour, weight) of reminder times, most users want an evening summary
+REMINDER_HOURS = [(hour, 1) for hour in range(6, 17)] + [
+    (17, 3), (18, 6), (19, 10), (20, 25), (21, 15), (22, 8), (23, 3),
+]
+
+PROJECT_NAMES = [
+    "Работа", "Учёба", "Спорт", "Дом", "Книги", "Английский", "Пет-проект", "Финансы",
+    "Здоровье", "Путешествия", "Ремонт", "Блог", "Курсы", "Музыка", "Сад",
+]
+
+TASK_WORDS = [
+    "Сделать", "Прочитать", "Написать", "Проверить", "Купить", "Позвонить", "Разобрать",
+    "Обновить", "Подготовить", "Настроить", "Отправить", "Изучить",
+]
+
+TASK_OBJECTS = [
+    "отчёт", "главу", "письмо", "план", "заметки", "тренировку", "презентацию",
+    "документы", "бюджет", "конспект", "задачи на неделю", "черновик",
+]
+
+PERIODICITY_DAYS = [(1, 20), (2, 10), (3, 10), (7, 40), (14, 12), (30, 8)]
+
+
+def _weighted(rng: random.Random, choices: List[tuple]) -> Any:
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _next_id(column) -> int:
+    """Next free id after the existing rows; only safe while nobody else inserts."""
+    return (db.session.query(func.max(column)).scalar() or 0) + 1
+
+
+def _advance_sequences() -> None:
+    """
+    Move the PostgreSQL id sequences past the explicitly inserted ids.
+
+    SQLite needs nothing: rowids and sqlite_sequence follow the largest id.
+    """
+    if db.session.get_bind().dialect.name != "postgresql":
+        return
+    for model in (User, UserSettings, Project, Task):
+        next_id = _next_id(model.id)
+        if model is Task:
+            # Task ids also live on in task_archive and must not be handed out again
+            next_id = max(next_id, _next_id(TaskArchive.id))
+        # is_called=false: the next nextval() returns next_id itself
+        db.session.execute(
+            text("SELECT setval(pg_get_serial_sequence(:table, 'id'), :value, false)"),
+            {"table": f'"{model.__tablename__}"', "value": next_id},
+        )
+
+
+# Columns of the task rows, which are written as plain tuples
+TASK_COLUMNS = ["id", "title", "status", "order", "project_id", "created_at", "updated_at", "completed_at"]
+
+
+def _insert_tuples(table, columns: List[str], rows: List[tuple]) -> None:
+    """
+    executemany straight through the DB-API cursor.
+
+    Values must already be in the driver's format (see _datetime_value): skipping
+    SQLAlchemy's per-value bind processing is what makes millions of rows cheap.
+    """
+    connection = db.session.connection()
+    dialect = connection.dialect
+    placeholder = {"qmark": "?", "format": "%s", "pyformat": "%s"}.get(dialect.paramstyle)
+    if placeholder is None:
+        db.session.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+        return
+
+    preparer = dialect.identifier_preparer
+    statement = (
+        f"INSERT INTO {preparer.format_table(table)} ({', '.join(preparer.quote(c) for c in columns)}) "
+        f"VALUES ({', '.join([placeholder] * len(columns))})"
+    )
+    connection.exec_driver_sql(statement, rows)
+
+
+def _datetime_value(dialect_name: str):
+    """Converter of naive datetimes to what the driver stores for a DateTime column."""
+    if dialect_name == "sqlite":
+        # The format SQLAlchemy's SQLite DateTime type writes and reads back
+        return lambda value: value.isoformat(" ", "microseconds") if value is not None else None
+    return lambda value: value
+
+
+def generate_data(users: int, projects: int, tasks: int, seed: int = 42, years: float = 3,
+                  batch_size: int = 50000) -> Dict[str, int]:
+    """
+    Generate users, their settings, projects and tasks.
+
+    Per project the share of completed tasks varies, completed_at is spread over
+    `years` with more activity in the recent past, and incomplete tasks get
+    gapped order values (Config.TASK_ORDER_GAP).
+
+    Args:
+        users: Number of users
+        projects: Projects per user
+        tasks: Tasks per project
+        seed: Random seed, the same seed produces the same data
+        years: How far back task history goes
+        batch_size: Rows per INSERT batch
+
+    Returns:
+        Dictionary with the numbers of created users, projects and tasks
+    """
+    rng = random.Random(seed)
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    history = datetime.timedelta(days=365 * years).total_seconds()
+
+    user_id = _next_id(User.id)
+    project_id = _next_id(Project.id)
+    # Archived tasks keep their ids, new ones must not reuse them
+    task_id = max(_next_id(Task.id), _next_id(TaskArchive.id))
+    telegram_id = max(_next_id(User.telegram_id), 100_000_000)
+
+    created = {"users": 0, "projects": 0, "tasks": 0}
+    next_reminder_cache: Dict[tuple, datetime.datetime] = {}
+    user_rows: List[Dict[str, Any]] = []
+    settings_rows: List[Dict[str, Any]] = []
+    project_rows: List[Dict[str, Any]] = []
+    task_rows: List[tuple] = []
+    started_at = time.monotonic()
+
+    to_db = _datetime_value(db.session.get_bind().dialect.name)
+    # Enums are stored by name
+    done, in_progress, todo = TaskStatus.DONE.name, TaskStatus.IN_PROGRESS.name, TaskStatus.TODO.name
+    titles = [f"{word} {obj}" for word in TASK_WORDS for obj in TASK_OBJECTS]
+
+    def flush() -> None:
+        # Parents go first so foreign keys hold on databases that enforce them
+        for model, rows in ((User, user_rows), (UserSettings, settings_rows), (Project, project_rows)):
+            if rows:
+                db.session.execute(insert(model.__table__), rows)
+                rows.clear()
+        if task_rows:
+            _insert_tuples(Task.__table__, TASK_COLUMNS, task_rows)
+            task_rows.clear()
+
+    try:
+        for _ in range(users):
+            timezone = _weighted(rng, TIMEZONES)
+            reminder_time = f"{_weighted(rng, REMINDER_HOURS):02d}:{rng.choice([0, 0, 0, 15, 30, 30, 45]):02d}"
+            reminders_enabled = rng.random() < 0.85
+
+            slot = (timezone, reminder_time)
+            if slot not in next_reminder_cache:
+                next_reminder_cache[slot] = UserSettings.compute_next_reminder_at(reminder_time, timezone, now)
+
+            user_rows.append({"id": user_id, "telegram_id": telegram_id})
+            settings_rows.append({
+                "user_id": user_id,
+                "reminders_enabled": reminders_enabled,
+                "reminder_time": reminder_time,
+                "timezone": timezone,
+                "next_reminder_at": next_reminder_cache[slot] if reminders_enabled else None,
+                "created_at": now,
+                "updated_at": now,
+            })
+
+            for _ in range(projects):
+                # Older projects have more history and a larger completed share
+                project_age = history * rng.uniform(0.05, 1)
+                done_share = rng.betavariate(4, 2)
+                pending_count = done_count = 0
+                last_activity_at = None
+                order = 0
+
+                for _ in range(tasks):
+                    created_at = now - datetime.timedelta(seconds=project_age * rng.random())
+                    if rng.random() < done_share:
+                        # Squared uniform: most completions are recent
+                        age = (now - created_at).total_seconds() * rng.random() ** 2
+                        completed_at = now - datetime.timedelta(seconds=age)
+                        status = done
+                        task_order = 0
+                        done_count += 1
+                        if last_activity_at is None or completed_at > last_activity_at:
+                            last_activity_at = completed_at
+                    else:
+                        completed_at = None
+                        status = in_progress if rng.random() < 0.15 else todo
+                        order += Config.TASK_ORDER_GAP
+                        task_order = order
+                        pending_count += 1
+
+                    task_rows.append((
+                        task_id, rng.choice(titles), status, task_order, project_id,
+                        to_db(created_at), to_db(completed_at or created_at), to_db(completed_at),
+                    ))
+                    task_id += 1
+
+                project_rows.append({
+                    "id": project_id,
+                    "name": rng.choice(PROJECT_NAMES),
+                    "short_name": f"P{project_id}"[:16],
+                    "periodicity_days": _weighted(rng, PERIODICITY_DAYS),
+                    "creator_id": user_id,
+                    "pending_count": pending_count,
+                    "done_count": done_count,
+                    "last_activity_at": last_activity_at,
+                    "created_at": now - datetime.timedelta(seconds=project_age),
+                    "updated_at": now,
+                })
+                project_id += 1
+                created["projects"] += 1
+                created["tasks"] += tasks
+
+                if len(task_rows) >= batch_size or len(project_rows) >= batch_size:
+                    flush()
+
+            user_id += 1
+            telegram_id += 1
+            created["users"] += 1
+
+        flush()
+        _advance_sequences()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to generate data: {e}")
+        raise
+
+    logger.info(f"Generated {created} in {time.monotonic() - started_at:.1f}s")
+    return created
@@ -0,0 +1,109 @@
+"""
+Database leases for leader election.
+
+Several processes may run the reminder scheduler and background jobs (web
+workers with an embedded bot, one or more worker.py instances). Each job is
+guarded by a named lease row: only the holder of an unexpired lease runs it, and
+the holder renews the lease on every tick. When the holder dies its lease
+expires after `ttl` seconds and another instance takes over.
+
+Acquiring is a single conditional UPDATE (or an INSERT for a new lease), so two
+instances can never both succeed.
+"""
+import datetime
+import logging
+import os
+import socket
+import uuid
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import SchedulerLease
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def default_holder() -> str:
+    """Identity of this process: host, pid and a random suffix."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Lease:
+    """
+    A named lease held by this process.
+
+    Call `acquire` on every tick of the guarded job and run the job only when it
+    returns True. Must be used inside an application context.
+    """
+
+    def __init__(self, name: str, ttl: float = Config.SCHEDULER_LEASE_TTL, holder: str | None = None):
+        """
+        Args:
+            name: Lease name, one per guarded job
+            ttl: Seconds the lease stays valid without renewal
+            holder: Identity of this process (defaults to host:pid:random)
+        """
+        self.name = name
+        self.ttl = ttl
+        self.holder = holder or default_holder()
+        self.held = False
+
+    def acquire(self) -> bool:
+        """
+        Take or renew the lease.
+
+        Returns:
+            True if this process holds the lease until now + ttl
+        """
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        expires_at = now + datetime.timedelta(seconds=self.ttl)
+
+        try:
+            updated = db.session.query(SchedulerLease).filter(
+                SchedulerLease.name == self.name,
+                (SchedulerLease.holder == self.holder) | (SchedulerLease.expires_at < now)
+            ).update({
+                SchedulerLease.holder: self.holder,
+                SchedulerLease.expires_at: expires_at,
+            }, synchronize_session=False)
+
+            if not updated:
+                # Either the lease does not exist yet or someone else holds it
+                db.session.execute(
+                    insert(SchedulerLease).values(name=self.name, holder=self.holder, expires_at=expires_at)
+                )
+            db.session.commit()
+            held = True
+        except IntegrityError:
+            db.session.rollback()
+            held = False
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to acquire lease {self.name}: {e}")
+            held = False
+
+        if held != self.held:
+            logger.info(f"{'Acquired' if held else 'Lost'} lease {self.name} as {self.holder}")
+        self.held = held
+        return held
+
+    def release(self) -> None:
+        """Give the lease up so another instance can take over right away."""
+        if not self.held:
+            return
+
+        try:
+            db.session.query(SchedulerLease).filter(
+                SchedulerLease.name == self.name,
+                SchedulerLease.holder == self.holder
+            ).update({
+                SchedulerLease.expires_at: datetime.datetime(1970, 1, 1),
+            }, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Failed to release lease {self.name}: {e}")
+        self.held = False
@@ -0,0 +1,439 @@
+"""
+In-process metrics in the Prometheus text format.
+
+A small registry of counters, gauges and histograms (no client library and no
+external service): the web app serves it at /metrics, where a Prometheus
+server or a plain curl can read it. Requests are measured by the blueprint's
+app-wide hooks: latency per endpoint, status codes, requests in flight and SQL
+statements per request (app.query_stats). Values that already live elsewhere
+(connection pools, caches) are read when the endpoint is scraped. The reminder
+scheduler, message delivery and bot commands add their own metrics to the same
+registry; worker.py serves it with `start_metrics_server`.
+
+Every process keeps its own registry; with several web workers each one
+reports its own numbers, so scrape them individually (or sum them).
+"""
+import hmac
+import logging
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from flask import Blueprint, Response, current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint("metrics", __name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; request latencies are mostly milliseconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds; scheduler ticks and reminder lateness, up to several check intervals
+LONG_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+# SQL statements per request or bot command
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    """Base of the metric types: name, help text and label names."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> Iterable[Tuple[str, str, float]]:
+        """(name suffix, formatted labels, value) of every sample."""
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(f"{self.name}{suffix}{labels} {_format_value(value)}" for suffix, labels, value in self.samples())
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing value."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield "", _format_labels(self.labels, key), value
+
+
+class Gauge(Metric):
+    """Value that goes up and down."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield "", _format_labels(self.labels, key), value
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets, with their count and sum."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield "_bucket", _format_labels(self.labels, key, f'le="{_format_value(bound)}"'), cumulative
+            yield "_count", _format_labels(self.labels, key), cumulative
+            yield "_sum", _format_labels(self.labels, key), total
+
+
+class CallbackMetric(Metric):
+    """Metric whose samples are read from a function when the registry is rendered."""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str],
+                 read: Callable[[], Dict[LabelValues, float]], type: str = "gauge"):
+        super().__init__(name, documentation, labels)
+        self.type = type
+        self.read = read
+
+    def samples(self):
+        try:
+            values = self.read()
+        except Exception as e:
+            logger.warning(f"Failed to read metric {self.name}: {e}")
+            return
+        for key, value in values.items():
+            yield "", _format_labels(self.labels, key), value
+
+
+class Registry:
+    """Named metrics of one process; metrics are created on first use and shared afterwards."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as {metric.type}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labels)
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labels)
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labels, buckets)
+
+    def register_callback(self, name: str, documentation: str, labels: Sequence[str],
+                          read: Callable[[], Dict[LabelValues, float]], type: str = "gauge") -> None:
+        """Register (or replace) a metric read from `read` at render time."""
+        with self._lock:
+            self._metrics[name] = CallbackMetric(name, documentation, labels, read, type)
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by endpoint, method and status code", ("endpoint", "method", "status"))
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by endpoint", ("endpoint", "method"))
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests being handled right now")
+http_request_queries = registry.histogram(
+    "http_request_sql_statements", "SQL statements per HTTP request by endpoint", ("endpoint", "method"),
+    buckets=COUNT_BUCKETS)
+
+db_pool_checkouts = registry.counter(
+    "db_pool_checkouts_total", "Connections checked out of the SQLAlchemy pool", ("bind",))
+db_pool_connects = registry.counter(
+    "db_pool_connections_created_total", "New database connections opened by the pool", ("bind",))
+
+# bind name -> engine, read by the pool gauges at render time
+_engines: Dict[str, Engine] = {}
+
+
+def _pool_values(method: str) -> Dict[LabelValues, float]:
+    values = {}
+    for bind, engine in list(_engines.items()):
+        read = getattr(engine.pool, method, None)
+        if read is not None:
+            # QueuePool counts overflow from -pool_size until the pool is full
+            values[(bind,)] = max(0, read()) if method == "overflow" else read()
+    return values
+
+
+registry.register_callback("db_pool_size", "Configured size of the connection pool", ("bind",),
+                           lambda: _pool_values("size"))
+registry.register_callback("db_pool_checked_out", "Connections currently checked out", ("bind",),
+                           lambda: _pool_values("checkedout"))
+registry.register_callback("db_pool_checked_in", "Idle connections in the pool", ("bind",),
+                           lambda: _pool_values("checkedin"))
+registry.register_callback("db_pool_overflow", "Connections open beyond the pool size", ("bind",),
+                           lambda: _pool_values("overflow"))
+
+
+def instrument_pool(engine: Engine, bind: Optional[str] = None) -> None:
+    """Count checkouts and new connections of an engine's pool and report its size."""
+    name = bind or "default"
+    _engines[name] = engine
+
+    @event.listens_for(engine, "checkout")
+    def count_checkout(dbapi_connection, connection_record, connection_proxy):
+        db_pool_checkouts.inc(bind=name)
+
+    @event.listens_for(engine, "connect")
+    def count_connect(dbapi_connection, connection_record):
+        db_pool_connects.inc(bind=name)
+
+
+# cache name -> function returning TTLCache.stats()
+_caches: Dict[str, Callable[[], Dict]] = {}
+
+
+def register_cache(name: str, stats: Callable[[], Dict]) -> None:
+    """Report the hit/miss counters of an app.cache.TTLCache under `name`."""
+    _caches[name] = stats
+
+
+def _cache_values(field: str) -> Dict[LabelValues, float]:
+    values = {}
+    for name, stats in list(_caches.items()):
+        values[(name,)] = stats()[field]
+    return values
+
+
+for _field, _type, _documentation in (
+    ("hits", "counter", "Cache lookups answered from the cache"),
+    ("misses", "counter", "Cache lookups that missed"),
+    ("evictions", "counter", "Entries evicted because the cache was full"),
+    ("size", "gauge", "Entries in the cache"),
+    ("hit_rate", "gauge", "Share of lookups answered from the cache since start"),
+):
+    registry.register_callback(
+        f"cache_{_field}_total" if _type == "counter" else f"cache_{_field}",
+        _documentation, ("cache",), lambda field=_field: _cache_values(field), _type)
+
+
+def _endpoint_label() -> str:
+    # The view name, not the path: one series per route whatever the ids in the URL
+    return request.endpoint or "unmatched"
+
+
+@bp.before_app_request
+def start_request_timer():
+    g.metrics_started_at = time.perf_counter()
+    http_requests_in_flight.inc()
+
+
+@bp.after_app_request
+def record_request(response):
+    started_at = g.pop("metrics_started_at", None)
+    if started_at is not None:
+        endpoint, method = _endpoint_label(), request.method
+        http_request_duration.observe(time.perf_counter() - started_at, endpoint=endpoint, method=method)
+        http_requests.inc(endpoint=endpoint, method=method, status=str(response.status_code))
+        stats = g.get("query_stats")
+        if stats is not None:
+            http_request_queries.observe(stats["count"], endpoint=endpoint, method=method)
+        http_requests_in_flight.dec()
+    return response
+
+
+@bp.teardown_app_request
+def record_failed_request(exc):
+    # after_request does not run when the view raised
+    started_at = g.pop("metrics_started_at", None)
+    if started_at is not None:
+        endpoint, method = _endpoint_label(), request.method
+        http_request_duration.observe(time.perf_counter() - started_at, endpoint=endpoint, method=method)
+        http_requests.inc(endpoint=endpoint, method=method, status="500")
+        http_requests_in_flight.dec()
+
+
+def _authorized(authorization: str, token: str) -> bool:
+    return not token or hmac.compare_digest(authorization or "", f"Bearer {token}")
+
+
+@bp.route("/metrics")
+def metrics():
+    if not _authorized(request.headers.get("Authorization", ""), current_app.config.get("METRICS_TOKEN")):
+        return Response("Unauthorized\n", status=401, content_type=CONTENT_TYPE)
+    return Response(registry.render(), content_type=CONTENT_TYPE)
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0", token: str = "") -> ThreadingHTTPServer:
+    """
+    Serve /metrics from a background thread, for processes without the web app (worker.py).
+
+    Args:
+        port: Port to listen on
+        host: Interface to bind
+        token: Bearer token required from the scraper (empty: no authentication)
+
+    Returns:
+        The running server (call shutdown() to stop it)
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                status, body = 404, "Not found\n"
+            elif not _authorized(self.headers.get("Authorization", ""), token):
+                status, body = 401, "Unauthorized\n"
+            else:
+                status, body = 200, registry.render()
+            payload = body.encode()
+            self.send_response(status)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            logger.debug(f"Metrics request: {format % args}")
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def init_metrics(app) -> None:
+    """Measure the requests of the app and serve /metrics (only with METRICS_ENABLED on)."""
+    if not app.config.get("METRICS_ENABLED", False):
+        return
+
+    if not app.config.get("METRICS_TOKEN") and not app.debug:
+        logger.warning("/metrics is served without METRICS_TOKEN, anyone who can reach the app can read it")
+
+    from app.auth import init_data_cache_stats, user_id_cache_stats
+    from app.routes import dashboard_cache
+    from app.user_cache import user_cache_stats
+
+    register_cache("dashboard", dashboard_cache.stats)
+    register_cache("user_id", user_id_cache_stats)
+    register_cache("init_data", init_data_cache_stats)
+    register_cache("user_snapshot", user_cache_stats)
+
+    app.register_blueprint(bp)
@@ -6,6 +6,9 @@ from enum import Enum
 from typing import Optional
 
 import datetime
+import pytz
+
+from config import Config
 
 
 class TaskStatus(Enum):
@@ -14,6 +17,13 @@ class TaskStatus(Enum):
     DONE = "done"
 
 
+class OutboxStatus(Enum):
+    PENDING = "pending"
+    CLAIMED = "claimed"
+    SENT = "sent"
+    FAILED = "failed"
+
+
 class ProjectPeriodicity(Enum):
     """Периодичность проекта в днях"""
     DAILY = 1
@@ -37,6 +47,9 @@ class User(db.Model):
 
 class UserSettings(db.Model):
     __tablename__ = "user_settings"
+    __table_args__ = (
+        db.Index('idx_user_settings_next_reminder_at', 'next_reminder_at'),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id"), nullable=False, unique=True)
@@ -45,6 +58,9 @@ class UserSettings(db.Model):
     reminders_enabled: Mapped[bool] = mapped_column(db.Boolean, nullable=False, default=True)
     reminder_time: Mapped[str] = mapped_column(String(5), nullable=False, default="20:00")  # Format: "HH:MM"
     timezone: Mapped[str] = mapped_column(String(50), nullable=False, default="UTC")
+
+    # Next reminder fire time in naive UTC; NULL when reminders are disabled
+    next_reminder_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="settings")
@@ -57,6 +73,64 @@ class UserSettings(db.Model):
         onupdate=lambda: datetime.datetime.now(datetime.timezone.utc),
     )
 
+    @staticmethod
+    def compute_next_reminder_at(reminder_time: Optional[str], timezone: Optional[str],
+                                 after: Optional[datetime.datetime] = None) -> datetime.datetime:
+        """
+        Calculate the first moment strictly after `after` when a reminder set to
+        local `reminder_time` in `timezone` fires.
+
+        DST is resolved explicitly: a local time skipped by a spring-forward gap fires
+        right after the gap, an ambiguous fall-back time fires once (first occurrence).
+
+        Args:
+            reminder_time: Local time in HH:MM format
+            timezone: tz database name, unknown names fall back to UTC
+            after: Reference moment (naive values are treated as UTC), defaults to now
+
+        Returns:
+            Naive UTC datetime of the next reminder
+        """
+        try:
+            hour, minute = map(int, (reminder_time or Config.DEFAULT_BOT_REMINDER_TIME).split(':'))
+        except (ValueError, AttributeError):
+            hour, minute = 20, 0
+
+        try:
+            tz = pytz.timezone(timezone or "UTC")
+        except pytz.exceptions.UnknownTimeZoneError:
+            tz = pytz.UTC
+
+        if after is None:
+            after = datetime.datetime.now(datetime.timezone.utc)
+        elif after.tzinfo is None:
+            after = after.replace(tzinfo=datetime.timezone.utc)
+
+        local_date = after.astimezone(tz).date()
+        for day_offset in range(3):
+            naive = datetime.datetime.combine(
+                local_date + datetime.timedelta(days=day_offset), datetime.time(hour, minute))
+            try:
+                local = tz.localize(naive, is_dst=None)
+            except pytz.exceptions.AmbiguousTimeError:
+                local = tz.localize(naive, is_dst=True)
+            except pytz.exceptions.NonExistentTimeError:
+                local = tz.normalize(tz.localize(naive, is_dst=False))
+
+            fire_at = local.astimezone(datetime.timezone.utc)
+            if fire_at > after:
+                return fire_at.replace(tzinfo=None)
+
+        # Unreachable for real timezones: some candidate within three days is always ahead
+        raise ValueError(f"Cannot schedule reminder {reminder_time} in {timezone}")
+
+    def schedule_next_reminder(self, after: Optional[datetime.datetime] = None) -> None:
+        """Refresh `next_reminder_at` from the current reminder settings."""
+        if self.reminders_enabled:
+            self.next_reminder_at = self.compute_next_reminder_at(self.reminder_time, self.timezone, after)
+        else:
+            self.next_reminder_at = None
+
 
 class Project(db.Model):
     __tablename__ = "project"
@@ -68,11 +142,17 @@ class Project(db.Model):
     goals: Mapped[Optional[str]] = mapped_column(String(4096), nullable=True)
     periodicity_days: Mapped[int] = mapped_column(Integer, nullable=False, default=7)
 
+    # Denormalized task aggregates, maintained by app.crud in the same transaction as task writes
+    last_activity_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
+    pending_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    done_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
     creator_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id"), nullable=False)
 
     # Relationships
     creator = relationship("User", back_populates="projects")
     tasks = relationship("Task", back_populates="project", lazy=True, cascade="all, delete-orphan")
+    archived_tasks = relationship("TaskArchive", lazy=True, cascade="all, delete-orphan")
     notes = relationship("Note", back_populates="project", lazy=True, cascade="all, delete-orphan")
 
     created_at = mapped_column(DateTime, nullable=False, default=lambda: datetime.datetime.now(datetime.timezone.utc))
@@ -85,17 +165,8 @@ class Project(db.Model):
 
     def get_last_activity_date(self) -> datetime.datetime:
         """Get the date of last activity on this project (last task completion)."""
-        # Get the most recent task completion using SQL
-        last_completed = db.session.query(db.func.max(Task.completed_at)).filter(
-            Task.project_id == self.id,
-            Task.completed_at.isnot(None)
-        ).scalar()
-
-        print('last_completed:', last_completed)  # Debug print
-        
         # If no tasks have been completed, return project creation date
-        if last_completed is None:
-            return self.created_at
+        last_completed = self.last_activity_at or self.created_at
         
         # Normalize tzinfo for consistency: treat naive datetimes as UTC
         if last_completed.tzinfo is None:
@@ -109,7 +180,7 @@ class Project(db.Model):
         Returns a ratio: 0 = completely fresh, 1.0 = at the periodicity threshold, >1.0 = overdue
         
         Args:
-            last_activity: Optional pre-calculated last activity date to avoid N+1 queries
+            last_activity: Optional last activity date, defaults to the denormalized last_activity_at
         """
         if last_activity is None:
             last_activity = self.get_last_activity_date()
@@ -118,7 +189,6 @@ class Project(db.Model):
             last_activity = last_activity.replace(tzinfo=datetime.timezone.utc)
         days_since_activity = (now - last_activity).days
         threshold = self.periodicity_days
-        print(days_since_activity, threshold)
         if threshold == 0:
             return float('inf')  # Avoid division by zero
         return days_since_activity / threshold
@@ -130,6 +200,12 @@ class Task(db.Model):
         db.Index('idx_task_project_id', 'project_id'),
         db.Index('idx_task_project_status', 'project_id', 'status'),
         db.Index('idx_task_completed_at', 'completed_at'),
+        db.Index('idx_task_project_order', 'project_id', 'order'),
+        db.Index('idx_task_project_completed', 'project_id', 'completed_at', 'id'),
+        # The task feed pages and the archive copy completed tasks by completed_at
+        db.CheckConstraint("status != 'DONE' OR completed_at IS NOT NULL", name='ck_task_done_completed_at'),
+        # Archived tasks keep their id in task_archive: SQLite must never hand it out again
+        {'sqlite_autoincrement': True},
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -151,6 +227,30 @@ class Task(db.Model):
     completed_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
 
 
+class TaskArchive(db.Model):
+    """
+    Completed tasks moved out of the hot `task` table by app.archive.
+    Rows keep the id of the original task and are read-only.
+    """
+    __tablename__ = "task_archive"
+    __table_args__ = (
+        db.Index('idx_task_archive_project_completed', 'project_id', 'completed_at', 'id'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    title: Mapped[str] = mapped_column(String(128), nullable=False)
+    project_id: Mapped[int] = mapped_column(Integer, ForeignKey("project.id"), nullable=False)
+
+    created_at = mapped_column(DateTime, nullable=False)
+    completed_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False)
+    archived_at = mapped_column(DateTime, nullable=False, default=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+    @property
+    def status(self) -> TaskStatus:
+        """Only completed tasks are archived."""
+        return TaskStatus.DONE
+
+
 class Note(db.Model):
     __tablename__ = "note"
 
@@ -160,3 +260,44 @@ class Note(db.Model):
 
     # Relationships
     project = relationship("Project", back_populates="notes")
+
+
+class SchedulerLease(db.Model):
+    """
+    Named lease for leader election between worker instances (see app.lease).
+    Whoever holds an unexpired lease runs the job it names.
+    """
+    __tablename__ = "scheduler_lease"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    holder: Mapped[str] = mapped_column(String(128), nullable=False)
+    # Naive UTC, like UserSettings.next_reminder_at
+    expires_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False)
+
+
+class ReminderOutbox(db.Model):
+    """
+    Reminders that are due, written by the scheduler and delivered by app.outbox.
+    One row per (user, fire time); all timestamps are naive UTC.
+    """
+    __tablename__ = "reminder_outbox"
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'fire_at', name='uq_reminder_outbox_user_fire'),
+        db.Index('idx_reminder_outbox_status_available', 'status', 'available_at'),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("user.id"), nullable=False)
+    telegram_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    fire_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False)
+
+    status: Mapped[OutboxStatus] = mapped_column(SAEnum(OutboxStatus), nullable=False, default=OutboxStatus.PENDING)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Not claimable before this time (retry backoff)
+    available_at: Mapped[datetime.datetime] = mapped_column(DateTime, nullable=False)
+    claimed_by: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    claimed_until: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
+    sent_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime, nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(String(256), nullable=True)
+
+    created_at = mapped_column(DateTime, nullable=False, default=lambda: datetime.datetime.now(datetime.timezone.utc))
@@ -0,0 +1,477 @@
+"""
+Durable reminder outbox.
+
+The scheduler that holds the reminder lease moves due users from the reminder
+index (UserSettings.next_reminder_at) into `reminder_outbox`. It inserts the
+outbox rows and advances the index in the same transaction, so a crash between
+the two cannot lose a reminder. Any number of instances then claim pending rows
+in batches and deliver them:
+
+* Postgres: the claim selects rows with FOR UPDATE SKIP LOCKED, so concurrent
+  instances take disjoint batches without waiting on each other;
+* SQLite: the claim is a single UPDATE ... WHERE id IN (SELECT ... LIMIT n),
+  which SQLite runs atomically.
+
+A claim expires after REMINDER_OUTBOX_CLAIM_TIMEOUT, so rows of a crashed
+instance are picked up again (delivery is at-least-once). Failed sends are
+retried with backoff up to REMINDER_OUTBOX_MAX_ATTEMPTS; a row whose last
+attempt was claimed by an instance that crashed is marked failed ("claim
+expired") instead. Reminders missed while
+no scheduler was running are still sent if they are at most
+REMINDER_CATCHUP_WINDOW seconds late.
+
+Every tick records its duration and the duration of each stage (scan, enqueue,
+claim, build, send, complete) in app.metrics, together with how late reminders
+are enqueued and delivered relative to their fire time. A tick that runs longer
+than REMINDER_CHECK_INTERVAL is logged as a warning with its stage breakdown.
+"""
+import datetime
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import insert, select
+
+from app import db
+from app.bot_service import get_reminder_messages
+from app.delivery import MessageDelivery, OutgoingMessage
+from app.lease import Lease
+from app.metrics import LONG_BUCKETS, registry
+from app.models import OutboxStatus, ReminderOutbox, User, UserSettings
+from app.routing import read_only
+from app.user_cache import prime_user_snapshots
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+tick_duration = registry.histogram(
+    "reminder_tick_duration_seconds", "Duration of a reminder scheduler tick", buckets=LONG_BUCKETS)
+stage_duration = registry.histogram(
+    "reminder_stage_duration_seconds", "Duration of the reminder pipeline stages, per call", ("stage",),
+    buckets=LONG_BUCKETS)
+slow_ticks = registry.counter(
+    "reminder_slow_ticks_total", "Scheduler ticks that ran longer than REMINDER_CHECK_INTERVAL")
+tick_lag = registry.gauge(
+    "reminder_tick_lag_seconds", "Delay between the scheduled start of the last tick and its actual start")
+last_tick = registry.gauge(
+    "reminder_last_tick_timestamp_seconds", "Unix time the last scheduler tick finished")
+enqueued_total = registry.counter(
+    "reminders_enqueued_total", "Reminders written to the outbox")
+skipped_total = registry.counter(
+    "reminders_skipped_total", "Due reminders skipped as older than REMINDER_CATCHUP_WINDOW")
+dropped_total = registry.counter(
+    "reminders_dropped_total", "Claimed reminders not sent because the user turned reminders off")
+enqueue_lag = registry.histogram(
+    "reminder_enqueue_lag_seconds", "Time from a reminder's fire time until it was enqueued", buckets=LONG_BUCKETS)
+abandoned_total = registry.counter(
+    "reminders_abandoned_total", "Reminders failed because their last attempt's claim expired")
+delivery_lag = registry.histogram(
+    "reminder_delivery_lag_seconds", "Time from a reminder's fire time until it was sent", buckets=LONG_BUCKETS)
+
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+
+@contextmanager
+def _timed(stage: str, timings: Optional[Dict[str, float]]) -> Iterator[None]:
+    """Record the duration of a pipeline stage, also summed into `timings` when given."""
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started_at
+        stage_duration.observe(elapsed, stage=stage)
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def _insert_ignoring_duplicates():
+    """INSERT that skips rows violating the (user_id, fire_at) unique constraint."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(ReminderOutbox.__table__).prefix_with("IGNORE")
+    return dialect_insert(ReminderOutbox.__table__).on_conflict_do_nothing(index_elements=["user_id", "fire_at"])
+
+
+def enqueue_due_reminders(now: datetime.datetime | None = None,
+                          timings: Optional[Dict[str, float]] = None) -> int:
+    """
+    Write reminders whose time has come to the outbox and advance the reminder index.
+
+    Only rows whose precomputed `next_reminder_at` has passed are read (one indexed
+    query). Next fire times are computed once per (timezone, reminder_time) slot.
+    Reminders late by more than `Config.REMINDER_CATCHUP_WINDOW` seconds are
+    rescheduled without being enqueued. Must be called by one instance at a time
+    (the holder of the reminder lease).
+
+    Args:
+        now: Reference time (naive UTC), defaults to current time
+        timings: Dictionary to add the scan and enqueue durations to (seconds)
+
+    Returns:
+        Number of enqueued reminders
+    """
+    now = now or _utcnow()
+    catchup_limit = now - datetime.timedelta(seconds=Config.REMINDER_CATCHUP_WINDOW)
+
+    with _timed("scan", timings):
+        due_rows = db.session.query(
+            User.id, User.telegram_id, UserSettings.reminder_time, UserSettings.timezone, UserSettings.next_reminder_at
+        ).join(UserSettings, User.id == UserSettings.user_id)\
+            .filter(UserSettings.next_reminder_at <= now,
+                    UserSettings.reminders_enabled.is_(True))\
+            .all()
+
+    if not due_rows:
+        return 0
+
+    outbox_rows = []
+    slots = set()
+
+    for user_id, telegram_id, reminder_time, timezone, fire_at in due_rows:
+        slots.add((timezone, reminder_time))
+
+        if fire_at >= catchup_limit:
+            outbox_rows.append({
+                "user_id": user_id,
+                "telegram_id": telegram_id,
+                "fire_at": fire_at,
+                "status": OutboxStatus.PENDING,
+                "attempts": 0,
+                "available_at": now,
+                "created_at": now,
+            })
+        else:
+            skipped_total.inc()
+            logger.warning(f"Skipping reminder for user {user_id} due at {fire_at}: outside the catch-up window")
+
+    enqueued = 0
+    try:
+        with _timed("enqueue", timings):
+            if outbox_rows:
+                result = db.session.execute(_insert_ignoring_duplicates(), outbox_rows)
+                # Rows already enqueued by an earlier tick are skipped by the unique constraint
+                enqueued = result.rowcount if result.rowcount >= 0 else len(outbox_rows)
+
+            for timezone, reminder_time in slots:
+                next_at = UserSettings.compute_next_reminder_at(reminder_time, timezone, now)
+                db.session.query(UserSettings).filter(
+                    UserSettings.next_reminder_at <= now,
+                    UserSettings.timezone == timezone,
+                    UserSettings.reminder_time == reminder_time,
+                ).update({UserSettings.next_reminder_at: next_at}, synchronize_session=False)
+
+            db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to enqueue reminders: {e}")
+        raise
+
+    enqueued_total.inc(enqueued)
+    for row in outbox_rows:
+        enqueue_lag.observe((now - row["fire_at"]).total_seconds())
+
+    return enqueued
+
+
+def claim_reminders(worker_id: str, limit: int = Config.REMINDER_OUTBOX_BATCH_SIZE,
+                    now: datetime.datetime | None = None) -> List[Dict[str, Any]]:
+    """
+    Claim a batch of deliverable outbox rows for this instance.
+
+    Pending rows whose backoff has passed and rows whose claim expired are claimable.
+
+    Args:
+        worker_id: Identity of the claiming instance
+        limit: Maximum number of rows to claim
+        now: Reference time (naive UTC), defaults to current time
+
+    Returns:
+        List of dictionaries with id, user_id, telegram_id, fire_at, attempts, reminders_enabled,
+        reminder_time and timezone (settings fields are None if the user deleted the settings)
+    """
+    now = now or _utcnow()
+    claim_token = f"{worker_id}:{uuid.uuid4().hex[:8]}"
+
+    claimable = select(ReminderOutbox.id).where(
+        ReminderOutbox.attempts < Config.REMINDER_OUTBOX_MAX_ATTEMPTS,
+        ((ReminderOutbox.status == OutboxStatus.PENDING) & (ReminderOutbox.available_at <= now))
+        | ((ReminderOutbox.status == OutboxStatus.CLAIMED) & (ReminderOutbox.claimed_until < now))
+    ).order_by(ReminderOutbox.id).limit(limit).with_for_update(skip_locked=True)
+
+    try:
+        claimed = db.session.query(ReminderOutbox).filter(ReminderOutbox.id.in_(claimable)).update({
+            ReminderOutbox.status: OutboxStatus.CLAIMED,
+            ReminderOutbox.claimed_by: claim_token,
+            ReminderOutbox.claimed_until: now + datetime.timedelta(seconds=Config.REMINDER_OUTBOX_CLAIM_TIMEOUT),
+            ReminderOutbox.attempts: ReminderOutbox.attempts + 1,
+        }, synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to claim reminders: {e}")
+        raise
+
+    if not claimed:
+        return []
+
+    rows = db.session.query(
+        ReminderOutbox.id, ReminderOutbox.user_id, ReminderOutbox.telegram_id, ReminderOutbox.fire_at,
+        ReminderOutbox.attempts, UserSettings.reminders_enabled, UserSettings.reminder_time, UserSettings.timezone
+    ).outerjoin(UserSettings, UserSettings.user_id == ReminderOutbox.user_id)\
+        .filter(ReminderOutbox.claimed_by == claim_token)\
+        .all()
+
+    return [
+        {
+            "id": outbox_id,
+            "user_id": user_id,
+            "telegram_id": telegram_id,
+            "fire_at": fire_at,
+            "attempts": attempts,
+            "reminders_enabled": reminders_enabled,
+            "reminder_time": reminder_time,
+            "timezone": timezone,
+        }
+        for outbox_id, user_id, telegram_id, fire_at, attempts, reminders_enabled, reminder_time, timezone in rows
+    ]
+
+
+def fail_abandoned_reminders(now: datetime.datetime | None = None) -> int:
+    """
+    Mark rows failed whose claim expired after their last allowed attempt.
+
+    The instance that claimed them crashed mid-delivery and claim_reminders no
+    longer picks them up, so without this they would stay claimed until pruned.
+
+    Args:
+        now: Reference time (naive UTC), defaults to current time
+
+    Returns:
+        Number of rows marked failed
+    """
+    now = now or _utcnow()
+
+    try:
+        abandoned = db.session.query(ReminderOutbox).filter(
+            ReminderOutbox.status == OutboxStatus.CLAIMED,
+            ReminderOutbox.claimed_until < now,
+            ReminderOutbox.attempts >= Config.REMINDER_OUTBOX_MAX_ATTEMPTS,
+        ).update({
+            ReminderOutbox.status: OutboxStatus.FAILED,
+            ReminderOutbox.claimed_until: None,
+            ReminderOutbox.last_error: "claim expired",
+        }, synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to fail abandoned reminders: {e}")
+        raise
+
+    if abandoned:
+        abandoned_total.inc(abandoned)
+        logger.warning(f"Marked {abandoned} reminders failed: their last attempt's claim expired")
+    return abandoned
+
+
+def _retry_delay(attempts: int) -> datetime.timedelta:
+    """Backoff before the next delivery attempt: one check interval, doubled per attempt."""
+    return datetime.timedelta(seconds=Config.REMINDER_CHECK_INTERVAL * 2 ** max(0, attempts - 1))
+
+
+def complete_reminders(sent_ids: List[int], failures: List[Dict[str, Any]],
+                       now: datetime.datetime | None = None) -> None:
+    """
+    Record delivery outcomes of claimed rows.
+
+    Args:
+        sent_ids: Outbox ids delivered successfully
+        failures: Dictionaries with id, attempts, error and permanent of failed rows
+        now: Reference time (naive UTC), defaults to current time
+    """
+    now = now or _utcnow()
+
+    try:
+        if sent_ids:
+            db.session.query(ReminderOutbox).filter(ReminderOutbox.id.in_(sent_ids)).update({
+                ReminderOutbox.status: OutboxStatus.SENT,
+                ReminderOutbox.sent_at: now,
+                ReminderOutbox.claimed_until: None,
+                ReminderOutbox.last_error: None,
+            }, synchronize_session=False)
+
+        for failure in failures:
+            give_up = failure["permanent"] or failure["attempts"] >= Config.REMINDER_OUTBOX_MAX_ATTEMPTS
+            db.session.query(ReminderOutbox).filter(ReminderOutbox.id == failure["id"]).update({
+                ReminderOutbox.status: OutboxStatus.FAILED if give_up else OutboxStatus.PENDING,
+                ReminderOutbox.available_at: now + _retry_delay(failure["attempts"]),
+                ReminderOutbox.claimed_until: None,
+                ReminderOutbox.last_error: (failure["error"] or "unknown error")[:256],
+            }, synchronize_session=False)
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to record reminder delivery results: {e}")
+        raise
+
+
+def deliver_due_reminders(delivery: MessageDelivery, worker_id: str, send_kwargs: Dict[str, Any],
+                          timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    Claim and deliver outbox batches until nothing deliverable is left.
+
+    Rows of users who turned reminders off after the row was enqueued are
+    completed as failed ("reminders disabled") without sending, rows out of
+    attempts whose claim expired as failed ("claim expired").
+
+    Args:
+        delivery: Rate-limited sender
+        worker_id: Identity of this instance
+        send_kwargs: Extra send_message keyword arguments (parse mode, keyboard)
+        timings: Dictionary to add the claim, build, send and complete durations to (seconds)
+
+    Returns:
+        Summed MessageDelivery report of all batches
+    """
+    report = {"total": 0, "sent": 0, "failed": 0, "retries": 0, "rate_limited": 0, "duration": 0.0}
+
+    with _timed("claim", timings):
+        fail_abandoned_reminders()
+
+    while True:
+        with _timed("claim", timings):
+            batch = claim_reminders(worker_id)
+        if not batch:
+            return report
+
+        # Recipients often answer with a command: have their snapshots ready
+        prime_user_snapshots(row for row in batch if row["timezone"] is not None)
+
+        disabled = [row for row in batch if not row["reminders_enabled"]]
+        if disabled:
+            dropped_total.inc(len(disabled))
+            logger.info(f"Dropping {len(disabled)} reminders of users who turned them off")
+            with _timed("complete", timings):
+                complete_reminders([], [{"id": row["id"], "attempts": row["attempts"],
+                                         "error": "reminders disabled", "permanent": True} for row in disabled])
+            batch = [row for row in batch if row["reminders_enabled"]]
+            if not batch:
+                continue
+
+        # Build the whole batch's messages with a fixed number of queries
+        with _timed("build", timings), read_only():
+            texts = get_reminder_messages([row["user_id"] for row in batch])
+
+        rows_by_message: Dict[int, Dict[str, Any]] = {}
+        messages: List[OutgoingMessage] = []
+        for row in batch:
+            message = (row["telegram_id"], texts[row["user_id"]], send_kwargs)
+            rows_by_message[id(message)] = row
+            messages.append(message)
+
+        sent_ids: List[int] = []
+        failures: List[Dict[str, Any]] = []
+        results_lock = threading.Lock()
+
+        def on_result(message: OutgoingMessage, stats: Dict[str, Any]) -> None:
+            row = rows_by_message[id(message)]
+            with results_lock:
+                if stats["sent"]:
+                    sent_ids.append(row["id"])
+                    delivery_lag.observe((_utcnow() - row["fire_at"]).total_seconds())
+                else:
+                    failures.append({"id": row["id"], "attempts": row["attempts"],
+                                     "error": stats["error"], "permanent": stats["permanent"]})
+
+        with _timed("send", timings):
+            batch_report = delivery.send_batch(messages, on_result=on_result)
+        with _timed("complete", timings):
+            complete_reminders(sent_ids, failures)
+
+        for key in report:
+            report[key] += batch_report[key]
+
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """Stage durations of a tick for log lines, e.g. "scan 0.0s, send 1.2s"."""
+    return ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in timings.items())
+
+
+def next_tick_at(interval: float = Config.REMINDER_CHECK_INTERVAL) -> float:
+    """Unix time of the next interval boundary, when the scheduler's next tick is due."""
+    return (time.time() // interval + 1) * interval
+
+
+def run_reminder_tick(lease: Lease, delivery: MessageDelivery, send_kwargs: Dict[str, Any],
+                      scheduled_at: Optional[float] = None) -> Dict[str, Any]:
+    """
+    One scheduler tick: the lease holder enqueues due reminders, then every instance delivers.
+
+    Must be called inside an application context. Logs a warning when the tick
+    takes longer than `Config.REMINDER_CHECK_INTERVAL`, so the next one starts late.
+
+    Args:
+        lease: Reminder lease, its holder enqueues due reminders
+        delivery: Rate-limited sender
+        send_kwargs: Extra send_message keyword arguments (parse mode, keyboard)
+        scheduled_at: Unix time the tick was due (see next_tick_at), recorded as tick lag
+
+    Returns:
+        Summed MessageDelivery report of the delivered batches, with the
+        durations of the pipeline stages under "timings"
+    """
+    interval = Config.REMINDER_CHECK_INTERVAL
+    if scheduled_at is not None:
+        tick_lag.set(max(0.0, time.time() - scheduled_at))
+    started_at = time.perf_counter()
+    timings: Dict[str, float] = {}
+
+    try:
+        if lease.acquire():
+            enqueued = enqueue_due_reminders(timings=timings)
+            if enqueued:
+                logger.info(f"Enqueued {enqueued} reminders")
+
+        report = deliver_due_reminders(delivery, lease.holder, send_kwargs, timings)
+    finally:
+        elapsed = time.perf_counter() - started_at
+        tick_duration.observe(elapsed)
+        last_tick.set(time.time())
+        if elapsed > interval:
+            slow_ticks.inc()
+            logger.warning(f"Slow reminder tick: {elapsed:.1f}s, longer than the {interval}s interval "
+                           f"({format_timings(timings)})")
+
+    report["timings"] = timings
+    return report
+
+
+def prune_reminder_outbox(older_than_days: int = Config.REMINDER_OUTBOX_RETENTION_DAYS) -> int:
+    """
+    Delete finished outbox rows (sent, failed or abandoned) older than the retention period.
+
+    Returns:
+        Number of deleted rows
+    """
+    cutoff = _utcnow() - datetime.timedelta(days=older_than_days)
+    try:
+        deleted = db.session.query(ReminderOutbox).filter(
+            ReminderOutbox.fire_at < cutoff,
+            (ReminderOutbox.status != OutboxStatus.PENDING)
+            | (ReminderOutbox.attempts >= Config.REMINDER_OUTBOX_MAX_ATTEMPTS)
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to prune reminder outbox: {e}")
+        raise
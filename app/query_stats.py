@@ -0,0 +1,150 @@
+"""
+SQL statement counting per request and per bot handler.
+
+Engine events add every executed statement and its duration to the collector
+of the current context (`track_queries`). create_app opens a collector for each
+request; with DEBUG or QUERY_STATS_HEADERS on the totals are returned in the
+X-Query-Count and X-Query-Time (milliseconds) response headers. Bot command
+functions are wrapped with `track_handler`, which logs their totals and records
+their latency in app.metrics.
+
+`query_budget` fails when a block runs more statements than allowed;
+benchmarks/query_budgets.py uses it to catch N+1 regressions (one query per
+row) before they reach production.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Dict, Iterator, List, Optional
+
+from flask import Flask, g
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.metrics import COUNT_BUCKETS, registry
+
+logger = logging.getLogger(__name__)
+
+command_duration = registry.histogram(
+    "bot_command_duration_seconds", "Time to build the reply of a bot command", ("command",))
+command_queries = registry.histogram(
+    "bot_command_sql_statements", "SQL statements per bot command", ("command",),
+    buckets=COUNT_BUCKETS)
+commands_total = registry.counter(
+    "bot_commands_total", "Handled bot commands by result (ok or error)", ("command", "result"))
+
+_collector: ContextVar[Optional[Dict[str, Any]]] = ContextVar("query_stats", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A block ran more SQL statements than its budget allows."""
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count statements of an engine into the current collector."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = _collector.get()
+        if stats is not None:
+            stats["count"] += 1
+            stats["time"] += elapsed
+            if stats["statements"] is not None:
+                stats["statements"].append(statement)
+
+
+@contextmanager
+def track_queries(keep_statements: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Collect the statements executed by the current thread/task inside the block.
+
+    Nested blocks also add their statements to the enclosing collector.
+
+    Args:
+        keep_statements: Also keep the SQL text of every statement
+
+    Yields:
+        Dictionary with count, time (seconds) and statements (list or None)
+    """
+    outer = _collector.get()
+    stats: Dict[str, Any] = {"count": 0, "time": 0.0, "statements": [] if keep_statements else None}
+    token = _collector.set(stats)
+    try:
+        yield stats
+    finally:
+        _collector.reset(token)
+        if outer is not None:
+            outer["count"] += stats["count"]
+            outer["time"] += stats["time"]
+            if outer["statements"] is not None and stats["statements"] is not None:
+                outer["statements"].extend(stats["statements"])
+
+
+@contextmanager
+def query_budget(max_queries: int, label: str = "block") -> Iterator[Dict[str, Any]]:
+    """
+    Fail if the block runs more than `max_queries` statements.
+
+    Raises:
+        QueryBudgetExceeded: With the executed statements in the message
+    """
+    with track_queries(keep_statements=True) as stats:
+        yield stats
+
+    if stats["count"] > max_queries:
+        statements: List[str] = stats["statements"]
+        listing = "\n".join(f"  {index + 1}. {' '.join(sql.split())[:200]}" for index, sql in enumerate(statements))
+        raise QueryBudgetExceeded(
+            f"{label} ran {stats['count']} SQL statements, budget is {max_queries}:\n{listing}")
+
+
+def track_handler(name: str):
+    """Log the statements and database time of a bot command function and record its latency."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started_at = time.perf_counter()
+            try:
+                with track_queries() as stats:
+                    result = func(*args, **kwargs)
+            except Exception:
+                commands_total.inc(command=name, result="error")
+                raise
+            finally:
+                command_duration.observe(time.perf_counter() - started_at, command=name)
+            commands_total.inc(command=name, result="ok")
+            command_queries.observe(stats["count"], command=name)
+            logger.debug(f"Bot handler {name}: {stats['count']} queries, {stats['time'] * 1000:.1f} ms in database")
+            return result
+        return wrapper
+    return decorator
+
+
+def init_query_stats(app: Flask) -> None:
+    """Count the statements of every request, exposed as headers in debug mode."""
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats_context = track_queries()
+        g.query_stats = g.query_stats_context.__enter__()
+
+    @app.after_request
+    def add_query_headers(response):
+        stats = g.get("query_stats")
+        if stats is not None and (app.debug or app.config.get("QUERY_STATS_HEADERS")):
+            response.headers["X-Query-Count"] = str(stats["count"])
+            response.headers["X-Query-Time"] = f"{stats['time'] * 1000:.2f}"
+        return response
+
+    @app.teardown_request
+    def stop_query_stats(exc):
+        context = g.pop("query_stats_context", None)
+        if context is not None:
+            context.__exit__(None, None, None)
@@ -1,5 +1,6 @@
 from typing import Any
 import datetime
+import time
 from flask import (
     Blueprint,
     render_template,
@@ -10,13 +11,23 @@ from flask import (
     session,
     jsonify,
     current_app,
+    g,
 )
 
-from app.crud import get_user_projects, create_project, update_project, update_task, delete_task, delete_project
+from app.crud import (
+    get_user_projects, create_project, update_project, add_task, update_task, toggle_task, delete_task, delete_project,
+    move_task, get_task_page, get_project_page_tasks, get_archived_tasks_page
+)
 from app.models import Project, User, Task, TaskStatus
 from app.forms import ProjectForm, EditProjectForm, TaskForm
-from app.auth import verify_telegram_web_app_data, get_or_create_user
+from app.auth import (
+    verify_telegram_web_app_data, get_or_create_user, get_cached_user_id, get_user_id, remember_user_id
+)
+from app.cache import TTLCache
+from app.routing import SESSION_WRITE_KEY, read_only, read_only_view
 from app import db
+from werkzeug.datastructures import MultiDict
+from config import Config
 from functools import wraps
 import logging
 
@@ -27,6 +38,23 @@ logger = logging.getLogger(__name__)
 # Cache for mock user to avoid repeated database queries in development
 _mock_user_cache = None
 
+# Rendered dashboard per telegram_id as (render start time, page). Entries expire
+# because staleness grows as days pass, and are dropped after any successful
+# mutation by the same user. Each web process has its own copy, so a page is
+# also ignored when the session's last write (db_write_at, app.routing), which
+# may have been handled by another process, is newer than the page.
+dashboard_cache = TTLCache(maxsize=Config.DASHBOARD_CACHE_SIZE, ttl=Config.DASHBOARD_CACHE_TTL)
+
+
+@bp.after_request
+def invalidate_dashboard_cache(response):
+    """Drop the cached dashboard of the current user after a successful write."""
+    if request.method != "GET" and response.status_code < 400:
+        telegram_id = session.get("telegram_id")
+        if telegram_id:
+            dashboard_cache.pop(telegram_id)
+    return response
+
 
 def get_first_form_error(form) -> str:
     """
@@ -43,6 +71,33 @@ def get_first_form_error(form) -> str:
     return "Validation error"
 
 
+def serialize_task(task: Task) -> dict[str, Any]:
+    """
+    Convert a task to the JSON shape used by the task API.
+
+    :param task: Task instance
+    :return: Dictionary with id, title, status and completed_at (UTC ISO or None)
+    """
+    # Format completed_at with explicit UTC timezone for JavaScript
+    completed_at_iso: str | None = None
+    if task.completed_at is not None:
+        # Ensure timezone-aware datetime and format with Z suffix
+        dt = task.completed_at
+        if dt.tzinfo is None:  # type: ignore[union-attr]
+            # If stored datetime is naive, treat it as UTC
+            completed_at_iso = dt.replace(  # type: ignore[union-attr]
+                tzinfo=datetime.timezone.utc).isoformat()
+        else:
+            completed_at_iso = dt.isoformat()  # type: ignore[union-attr]
+
+    return {
+        "id": task.id,
+        "title": task.title,
+        "status": task.status.value,
+        "completed_at": completed_at_iso
+    }
+
+
 def get_current_user() -> User | None:
     """Get current user from session."""
     global _mock_user_cache
@@ -63,6 +118,83 @@ def get_current_user() -> User | None:
     return User.query.filter_by(telegram_id=telegram_id).first()
 
 
+def project_access(api: bool = True):
+    """
+    Resolve the current user, the project and, for routes with task_id, the task
+    with one joined query and check ownership before calling the view.
+
+    The user lookup is served from the telegram_id cache when possible and is
+    folded into the same query otherwise. Resolved objects are stored in
+    g.user_id, g.project and g.task.
+
+    :param api: Return JSON errors (API routes) instead of plain text (pages)
+    """
+    def error(message: str, status: int):
+        if api:
+            return jsonify({"error": message}), status
+        return message, status
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(project_id: int, **kwargs):
+            task_id: int | None = kwargs.get("task_id")
+            telegram_id: Any | None = session.get("telegram_id")
+            user_id: int | None = None
+
+            if not telegram_id:
+                # Mock mode authenticates through get_current_user()
+                user = get_current_user()
+                if user is None:
+                    return error("Unauthorized", 401)
+                user_id = user.id
+            else:
+                user_id = get_cached_user_id(telegram_id)
+
+            entities: list[Any] = [Project]
+            if task_id is not None:
+                entities.append(Task)
+            if user_id is None:
+                entities.append(User.id)
+
+            query = db.session.query(*entities).select_from(Project)
+            if task_id is not None:
+                query = query.outerjoin(Task, Task.id == task_id)
+            if user_id is None:
+                query = query.outerjoin(User, User.telegram_id == telegram_id)
+            row = query.filter(Project.id == project_id).first()
+
+            if row is None:
+                if user_id is None and get_user_id(telegram_id) is None:
+                    return error("Unauthorized", 401)
+                return error("Project not found", 404)
+
+            values = list(row) if len(entities) > 1 else [row]
+            project: Project = values.pop(0)
+            task: Task | None = values.pop(0) if task_id is not None else None
+            if user_id is None:
+                user_id = values.pop(0)
+                if user_id is None:
+                    return error("Unauthorized", 401)
+                remember_user_id(telegram_id, user_id)
+
+            # Check if user owns this project
+            if project.creator_id != user_id:
+                return error("Access denied", 403)
+
+            if task_id is not None:
+                if task is None:
+                    return error("Task not found", 404)
+                if task.project_id != project_id:
+                    return error("Task does not belong to this project", 403)
+
+            g.user_id = user_id
+            g.project = project
+            g.task = task
+            return view(project_id=project_id, **kwargs)
+        return wrapper
+    return decorator
+
+
 @bp.route("/api/init", methods=["POST"])
 def init_webapp():
     """Initialize Telegram Mini App and authenticate user."""
@@ -104,72 +236,54 @@ def init_webapp():
 
 @bp.route("/")
 def index():
+    # Repeat opens are served from the cache without touching the database
+    telegram_id = session.get("telegram_id")
+    if telegram_id:
+        cached = dashboard_cache.get(telegram_id)
+        if cached is not None:
+            rendered_at, cached_page = cached
+            if rendered_at >= session.get(SESSION_WRITE_KEY, 0):
+                return cached_page
+
+    # Taken before the queries, so a write committed meanwhile makes the page stale
+    rendered_at = time.time()
+    # Resolved on the primary: in mock mode this may create the user
     user: User | None = get_current_user()
-    if not user:
-        # For Mini App, user will be authenticated via JavaScript
-        projects = []
-    else:
-        projects = get_user_projects(user.id)
-    
-    # Calculate staleness for each project with pre-calculated last activity dates
-    # to avoid N+1 query problem
-    if projects:
-        # Batch query: get max completed_at for all projects at once
-        project_ids = [p.id for p in projects]
-        last_activities = db.session.query(
-            Task.project_id,
-            db.func.max(Task.completed_at).label('last_completed')
-        ).filter(
-            Task.project_id.in_(project_ids),
-            Task.completed_at.isnot(None)
-        ).group_by(Task.project_id).all()
-        
-        # Create lookup dict
-        last_activity_map = {proj_id: last_comp for proj_id, last_comp in last_activities}
-        
-        projects_with_staleness = []
-        for project in projects:            
-            last_activity = last_activity_map.get(project.id)
-            staleness = project.get_staleness_ratio(last_activity)
-            projects_with_staleness.append({
+
+    with read_only():
+        if not user:
+            # For Mini App, user will be authenticated via JavaScript
+            projects = []
+        else:
+            projects = get_user_projects(user.id)
+
+        # Staleness comes from the denormalized last_activity_at, no extra queries
+        projects_with_staleness = [
+            {
                 'project': project,
-                'staleness_ratio': staleness
-            })
-    else:
-        projects_with_staleness = []
+                'staleness_ratio': project.get_staleness_ratio()
+            }
+            for project in projects
+        ]
 
-    return render_template("index.html", projects=projects_with_staleness)
+        page = render_template("index.html", projects=projects_with_staleness)
+    if user:
+        dashboard_cache.set(user.telegram_id, (rendered_at, page))
+    return page
 
 
 @bp.route("/project/<int:project_id>")
+@read_only_view
+@project_access(api=False)
 def project_detail(project_id: int):
-    user: User | None = get_current_user()
-    if not user:
-        return "Unauthorized", 401
-
-    project: Project | None = Project.query.get(project_id)
-    if project is None:
-        return "Project not found", 404
+    project: Project = g.project
 
-    # Check if user owns this project
-    if project.creator_id != user.id:
-        return "Access denied", 403
-
-    # Sort tasks efficiently in SQL: completed tasks first (by completed_at asc - oldest first),
-    # then incomplete tasks (by order)
-    from sqlalchemy import case
-    
-    sorted_tasks = Task.query.filter_by(project_id=project_id).order_by(
-        # First: sort by completion status (DONE=0, others=1, so DONE comes first)
-        case((Task.status == TaskStatus.DONE, 0), else_=1),
-        # Second: for completed tasks, sort by completed_at (oldest first)
-        # Use a large value for NULL to push them to the end within their group
-        case((Task.completed_at.isnot(None), Task.completed_at), else_=datetime.datetime.max.replace(tzinfo=datetime.timezone.utc)),
-        # Third: for incomplete tasks, sort by order
-        Task.order
-    ).all()
+    # Completed tasks first (oldest first), then incomplete tasks by order.
+    # Only the most recent history is rendered, older tasks are loaded on scroll
+    sorted_tasks, history_cursor = get_project_page_tasks(project_id)
 
-    return render_template("project_page.html", project=project, sorted_tasks=sorted_tasks)
+    return render_template("project_page.html", project=project, sorted_tasks=sorted_tasks,
+                           history_cursor=history_cursor)
 
 
 @bp.route("/project/new", methods=["GET", "POST"])
@@ -194,19 +308,10 @@ def new_project():
 
 
 @bp.route("/project/<int:project_id>/edit", methods=["GET", "POST"])
+@project_access(api=False)
 def edit_project(project_id: int):
     """Edit an existing project."""
-    user: User | None = get_current_user()
-    if not user:
-        return "Unauthorized", 401
-
-    project: Project | None = Project.query.get(project_id)
-    if project is None:
-        return "Project not found", 404
-
-    # Check if user owns this project
-    if project.creator_id != user.id:
-        return "Access denied", 403
+    project: Project = g.project
 
     form = EditProjectForm(obj=project)
 
@@ -230,20 +335,9 @@ def edit_project(project_id: int):
 
 
 @bp.route("/project/<int:project_id>/delete", methods=["POST"])
+@project_access(api=False)
 def delete_project_endpoint(project_id: int):
     """Delete a project."""
-    user: User | None = get_current_user()
-    if not user:
-        return "Unauthorized", 401
-
-    project: Project | None = Project.query.get(project_id)
-    if project is None:
-        return "Project not found", 404
-
-    # Check if user owns this project
-    if project.creator_id != user.id:
-        return "Access denied", 403
-
     # Delete the project
     success = delete_project(project_id)
     if success:
@@ -252,21 +346,56 @@ def delete_project_endpoint(project_id: int):
         return redirect(url_for("main.edit_project", project_id=project_id))
 
 
-@bp.route("/api/project/<int:project_id>/task", methods=["POST"])
-def create_task(project_id: int):
-    """Create a new task for a project via API."""
-    user: User | None = get_current_user()
-    if not user:
-        return jsonify({"error": "Unauthorized"}), 401
+@bp.route("/api/project/<int:project_id>/tasks", methods=["GET"])
+@read_only_view
+@project_access()
+def list_tasks(project_id: int):
+    """
+    Page through the project's tasks in page order (completed by completed_at, then incomplete by order).
+
+    Query parameters: `after` or `before` cursor and `limit`. The returned `cursor`
+    continues in the same direction and is null at the end of the feed.
+    """
+    limit = request.args.get("limit", Config.TASK_PAGE_SIZE, type=int)
+    if limit is None or not 1 <= limit <= Config.TASK_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {Config.TASK_PAGE_SIZE}"}), 400
+
+    try:
+        tasks, cursor = get_task_page(
+            project_id, after=request.args.get("after"), before=request.args.get("before"), limit=limit
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"tasks": [serialize_task(task) for task in tasks], "cursor": cursor})
+
 
-    project: Project | None = Project.query.get(project_id)
-    if project is None:
-        return jsonify({"error": "Project not found"}), 404
+@bp.route("/api/project/<int:project_id>/archive", methods=["GET"])
+@read_only_view
+@project_access()
+def list_archived_tasks(project_id: int):
+    """
+    Page through the project's archived tasks from newest to oldest.
+
+    Query parameters: `before` cursor and `limit`. Tasks in a page are ordered by
+    completed_at; the returned `cursor` points to the next older page.
+    """
+    limit = request.args.get("limit", Config.TASK_PAGE_SIZE, type=int)
+    if limit is None or not 1 <= limit <= Config.TASK_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {Config.TASK_PAGE_SIZE}"}), 400
+
+    try:
+        tasks, cursor = get_archived_tasks_page(project_id, before=request.args.get("before"), limit=limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({"tasks": [dict(serialize_task(task), archived=True) for task in tasks], "cursor": cursor})
 
-    # Check if user owns this project
-    if project.creator_id != user.id:
-        return jsonify({"error": "Access denied"}), 403
 
+@bp.route("/api/project/<int:project_id>/task", methods=["POST"])
+@project_access()
+def create_task(project_id: int):
+    """Create a new task for a project via API."""
     # Use TaskForm for validation and CSRF protection
     form = TaskForm(data=request.get_json())
 
@@ -278,20 +407,7 @@ def create_task(project_id: int):
     if not title:
         return jsonify({"error": "Title is required"}), 400
 
-    # Get the highest order value for incomplete tasks in this project
-    max_order = db.session.query(db.func.max(Task.order)).filter(
-        Task.project_id == project_id,
-        Task.status != TaskStatus.DONE
-    ).scalar() or -1
-
-    task = Task()
-    task.title = title
-    task.status = TaskStatus.TODO
-    task.project_id = project_id
-    task.order = max_order + 1  # Add at the end
-
-    db.session.add(task)
-    db.session.commit()
+    task = add_task(project_id, title)
 
     # Return the sanitized task data
     return jsonify({
@@ -305,28 +421,9 @@ def create_task(project_id: int):
 
 
 @bp.route("/api/project/<int:project_id>/task/<int:task_id>", methods=["PUT"])
+@project_access()
 def update_task_endpoint(project_id: int, task_id: int):
     """Update a task title via API."""
-    user: User | None = get_current_user()
-    if not user:
-        return jsonify({"error": "Unauthorized"}), 401
-
-    project: Project | None = Project.query.get(project_id)
-    if project is None:
-        return jsonify({"error": "Project not found"}), 404
-
-    # Check if user owns this project
-    if project.creator_id != user.id:
-        return jsonify({"error": "Access denied"}), 403
-
-    # Get the task and verify it belongs to this project
-    task: Task | None = Task.query.get(task_id)
-    if task is None:
-        return jsonify({"error": "Task not found"}), 404
-
-    if task.project_id != project_id:
-        return jsonify({"error": "Task does not belong to this project"}), 403
-
     # Use TaskForm for validation
     form = TaskForm(data=request.get_json())
 
@@ -353,60 +450,17 @@ def update_task_endpoint(project_id: int, task_id: int):
 
 
 @bp.route("/api/project/<int:project_id>/task/<int:task_id>/status", methods=["PATCH"])
+@project_access()
 def toggle_task_status(project_id: int, task_id: int):
     """Toggle task status between TODO and DONE."""
-    user: User | None = get_current_user()
-    if not user:
-        return jsonify({"error": "Unauthorized"}), 401
-
-    project: Project | None = Project.query.get(project_id)
-    if project is None:
-        return jsonify({"error": "Project not found"}), 404
-
-    # Check if user owns this project
-    if project.creator_id != user.id:
-        return jsonify({"error": "Access denied"}), 403
-
-    # Get the task and verify it belongs to this project
-    task: Task | None = Task.query.get(task_id)
-    if task is None:
-        return jsonify({"error": "Task not found"}), 404
-
-    if task.project_id != project_id:
-        return jsonify({"error": "Task does not belong to this project"}), 403
+    task: Task = g.task
 
     try:
-        # Toggle status: TODO <-> DONE (skip IN_PROGRESS for simple toggle)
-        if task.status == TaskStatus.DONE:
-            task.status = TaskStatus.TODO
-            task.completed_at = None  # Clear completion time when unmarking as done
-        else:
-            task.status = TaskStatus.DONE
-            task.completed_at = datetime.datetime.now(
-                datetime.timezone.utc)  # Set completion time in UTC
-
-        db.session.commit()
-
-        # Format completed_at with explicit UTC timezone for JavaScript
-        completed_at_iso: str | None = None
-        if task.completed_at is not None:
-            # Ensure timezone-aware datetime and format with Z suffix
-            dt = task.completed_at
-            if dt.tzinfo is None:  # type: ignore[union-attr]
-                # If stored datetime is naive, treat it as UTC
-                completed_at_iso = dt.replace(  # type: ignore[union-attr]
-                    tzinfo=datetime.timezone.utc).isoformat()
-            else:
-                completed_at_iso = dt.isoformat()  # type: ignore[union-attr]
+        toggle_task(task)
 
         return jsonify({
             "success": True,
-            "task": {
-                "id": task.id,
-                "title": task.title,
-                "status": task.status.value,
-                "completed_at": completed_at_iso
-            }
+            "task": serialize_task(task)
         })
     except Exception as e:
         db.session.rollback()
@@ -415,28 +469,9 @@ def toggle_task_status(project_id: int, task_id: int):
 
 
 @bp.route("/api/project/<int:project_id>/task/<int:task_id>", methods=["DELETE"])
+@project_access()
 def delete_task_endpoint(project_id: int, task_id: int):
     """Delete a task via API."""
-    user: User | None = get_current_user()
-    if not user:
-        return jsonify({"error": "Unauthorized"}), 401
-
-    project: Project | None = Project.query.get(project_id)
-    if project is None:
-        return jsonify({"error": "Project not found"}), 404
-
-    # Check if user owns this project
-    if project.creator_id != user.id:
-        return jsonify({"error": "Access denied"}), 403
-
-    # Get the task and verify it belongs to this project
-    task: Task | None = Task.query.get(task_id)
-    if task is None:
-        return jsonify({"error": "Task not found"}), 404
-
-    if task.project_id != project_id:
-        return jsonify({"error": "Task does not belong to this project"}), 403
-
     # Delete task
     success = delete_task(task_id)
     if not success:
@@ -445,33 +480,146 @@ def delete_task_endpoint(project_id: int, task_id: int):
     return jsonify({"success": True})
 
 
-@bp.route("/api/project/<int:project_id>/tasks/reorder", methods=["POST"])
-def reorder_tasks(project_id: int):
-    """Reorder incomplete tasks for a project."""
-    user: User | None = get_current_user()
-    if not user:
-        return jsonify({"error": "Unauthorized"}), 401
+@bp.route("/api/project/<int:project_id>/tasks/bulk", methods=["POST"])
+@project_access()
+def bulk_tasks(project_id: int):
+    """
+    Apply a list of task operations in one transaction.
+
+    Body: {"operations": [{"op": "create", "title": ...}, {"op": "rename", "id": ..., "title": ...},
+    {"op": "toggle", "id": ...}, {"op": "delete", "id": ...}]}. Every operation gets its own
+    result in the same order; invalid operations are reported without affecting the others.
+    """
+    data = request.get_json(silent=True) or {}
+    operations = data.get("operations")
+
+    if not operations or not isinstance(operations, list):
+        return jsonify({"error": "Invalid operations"}), 400
+
+    if len(operations) > Config.BULK_MAX_OPERATIONS:
+        return jsonify({"error": f"Too many operations (max {Config.BULK_MAX_OPERATIONS})"}), 400
+
+    # Load every referenced task of this project with one query
+    task_ids = {op.get("id") for op in operations if isinstance(op, dict) and isinstance(op.get("id"), int)}
+    tasks: dict[int, Task] = {}
+    if task_ids:
+        tasks = {
+            task.id: task
+            for task in Task.query.filter(Task.project_id == project_id, Task.id.in_(task_ids)).all()
+        }
+
+    def validate_title(title: Any) -> tuple[str | None, str | None]:
+        # Same validation and CSRF protection as the single-task endpoints
+        form = TaskForm(formdata=MultiDict({"title": title or "", "csrf_token": data.get("csrf_token", "")}))
+        if not form.validate():
+            return None, get_first_form_error(form)
+        return form.title.data, None
+
+    results: list[dict[str, Any]] = []
+    applied: list[tuple[int, Task | None]] = []
+    try:
+        for operation in operations:
+            if not isinstance(operation, dict):
+                results.append({"success": False, "error": "Invalid operation"})
+                continue
+
+            op = operation.get("op")
+            if op == "create":
+                title, error = validate_title(operation.get("title"))
+                if error:
+                    results.append({"success": False, "error": error})
+                    continue
+                task = add_task(project_id, title, commit=False)
+                db.session.flush()
+                tasks[task.id] = task
+                applied.append((len(results), task))
+                results.append({"success": True})
+                continue
+
+            if op not in ("rename", "toggle", "delete"):
+                results.append({"success": False, "error": "Unknown operation"})
+                continue
+
+            task = tasks.get(operation.get("id"))
+            if task is None:
+                results.append({"success": False, "error": "Task not found"})
+                continue
+
+            if op == "rename":
+                title, error = validate_title(operation.get("title"))
+                if error:
+                    results.append({"success": False, "error": error})
+                    continue
+                update_task(task.id, title, commit=False)
+            elif op == "toggle":
+                toggle_task(task, commit=False)
+            else:
+                delete_task(task.id, commit=False)
+                del tasks[task.id]
+                task = None
+
+            applied.append((len(results), task))
+            results.append({"success": True})
+
+        # Serialize before commit so the response needs no reloads
+        db.session.flush()
+        for index, task in applied:
+            if task is not None:
+                results[index]["task"] = serialize_task(task)
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Failed to apply bulk operations for project {project_id}: {e}")
+        return jsonify({"error": "Failed to apply operations"}), 500
 
-    project: Project | None = Project.query.get(project_id)
-    if project is None:
-        return jsonify({"error": "Project not found"}), 404
+    return jsonify({"success": True, "results": results})
 
-    # Check if user owns this project
-    if project.creator_id != user.id:
-        return jsonify({"error": "Access denied"}), 403
 
-    data = request.get_json()
+@bp.route("/api/project/<int:project_id>/tasks/reorder", methods=["POST"])
+@project_access()
+def reorder_tasks(project_id: int):
+    """Reorder incomplete tasks for a project."""
+    data = request.get_json(silent=True) or {}
     task_ids = data.get("task_ids", [])
 
     if not task_ids or not isinstance(task_ids, list):
         return jsonify({"error": "Invalid task_ids"}), 400
 
     try:
-        # Update order for each task
-        for index, task_id in enumerate(task_ids):
-            task: Task | None = Task.query.get(task_id)
-            if task and task.project_id == project_id:
-                task.order = index
+        task_ids = [int(task_id) for task_id in task_ids]
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid task_ids"}), 400
+
+    if len(set(task_ids)) != len(task_ids):
+        return jsonify({"error": "Duplicate task_ids"}), 400
+
+    # Only incomplete tasks of this project can be reordered; check all ids with one query
+    known_ids = {
+        task_id for (task_id,) in db.session.query(Task.id).filter(
+            Task.project_id == project_id,
+            Task.status != TaskStatus.DONE,
+            Task.id.in_(task_ids)
+        )
+    }
+    unknown_ids = [task_id for task_id in task_ids if task_id not in known_ids]
+    if unknown_ids:
+        return jsonify({"error": "Unknown task_ids", "task_ids": unknown_ids}), 400
+
+    try:
+        # Apply the whole order with one UPDATE ... SET order = CASE id WHEN ... END;
+        # repeat the status check so a task completed since the validation keeps its order
+        db.session.query(Task).filter(
+            Task.project_id == project_id,
+            Task.status != TaskStatus.DONE,
+            Task.id.in_(task_ids)
+        ).update(
+            {Task.order: db.case(
+                {task_id: (index + 1) * Config.TASK_ORDER_GAP for index, task_id in enumerate(task_ids)},
+                value=Task.id
+            )},
+            synchronize_session=False
+        )
 
         db.session.commit()
         return jsonify({"success": True})
@@ -479,3 +627,27 @@ def reorder_tasks(project_id: int):
         db.session.rollback()
         logger.error(f"Failed to reorder tasks for project {project_id}: {e}")
         return jsonify({"error": "Failed to reorder tasks"}), 500
+
+
+@bp.route("/api/project/<int:project_id>/task/<int:task_id>/move", methods=["POST"])
+@project_access()
+def move_task_endpoint(project_id: int, task_id: int):
+    """Move one incomplete task right after `after_id` or right before `before_id`."""
+    data = request.get_json(silent=True) or {}
+    try:
+        after_id = int(data["after_id"]) if data.get("after_id") is not None else None
+        before_id = int(data["before_id"]) if data.get("before_id") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid anchor"}), 400
+
+    if (after_id is None) == (before_id is None):
+        return jsonify({"error": "Exactly one of after_id and before_id is required"}), 400
+
+    try:
+        task = move_task(g.task, after_id=after_id, before_id=before_id)
+        return jsonify({"success": True, "task_id": task.id, "order": task.order})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Failed to move task {task_id} in project {project_id}: {e}")
+        return jsonify({"error": "Failed to move task"}), 500
@@ -0,0 +1,132 @@
+"""
+Read-replica routing.
+
+With DATABASE_REPLICA_URL set, the replica is configured as the "replica"
+Flask-SQLAlchemy bind and RoutingSession sends SELECTs issued inside a
+read-only scope (`read_only` context manager, `read_only_view` decorator) to
+it. Everything else — writes, flushes and reads outside a read-only scope —
+goes to the primary. Once a session has written (a flush or an UPDATE, DELETE
+or INSERT statement), its later SELECTs stay on the primary too, so objects it just inserted or changed are never
+reloaded from a replica that has not caught up. Without a replica every
+statement uses the primary.
+
+Read-your-writes: a user who changed data in the last
+REPLICA_READ_YOUR_WRITES_WINDOW seconds reads from the primary, so a page
+loaded right after a mutation never shows replica lag. Web requests remember
+the last write in the Flask session (works across web processes), other
+callers mark writes with `note_write`.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Hashable, Iterator, Optional
+
+from flask import Flask, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+from app.cache import TTLCache
+from config import Config
+
+REPLICA_BIND = "replica"
+
+# Flask session key with the time of the user's last write
+SESSION_WRITE_KEY = "db_write_at"
+
+_read_only: ContextVar[bool] = ContextVar("read_only", default=False)
+
+# user key (telegram_id) -> time of the last write, for callers without a Flask session
+_recent_writers = TTLCache(maxsize=Config.USER_ID_CACHE_SIZE, ttl=Config.REPLICA_READ_YOUR_WRITES_WINDOW)
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs of read-only scopes to the replica engine."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and _read_only.get()
+            and not self._flushing
+            and not self.info.get("wrote")
+            and getattr(clause, "is_select", False)
+        ):
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _remember_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _remember_dml(orm_execute_state):
+    # query.update()/delete() and session.execute(insert(...)) write without a flush
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.info["wrote"] = True
+
+
+def note_write(user_key: Optional[Hashable]) -> None:
+    """Route reads of this user to the primary for the read-your-writes window."""
+    if user_key is not None:
+        _recent_writers.set(user_key, time.time())
+
+
+def wrote_recently(user_key: Optional[Hashable] = None) -> bool:
+    """Whether reads for this user (or the current web session) must see the primary."""
+    if has_request_context():
+        written_at = session.get(SESSION_WRITE_KEY)
+        if written_at and time.time() - written_at < Config.REPLICA_READ_YOUR_WRITES_WINDOW:
+            return True
+        if user_key is None:
+            user_key = session.get("telegram_id")
+
+    return user_key is not None and _recent_writers.get(user_key) is not None
+
+
+def is_read_only() -> bool:
+    """Whether SELECTs of the current context go to the replica."""
+    return _read_only.get()
+
+
+@contextmanager
+def read_only(user_key: Optional[Hashable] = None) -> Iterator[None]:
+    """
+    Send SELECTs inside the block to the replica.
+
+    Args:
+        user_key: telegram_id of the user the data is read for; reads stay on the
+            primary if that user wrote recently (defaults to the web session's user)
+    """
+    if wrote_recently(user_key):
+        yield
+        return
+
+    token = _read_only.set(True)
+    try:
+        yield
+    finally:
+        _read_only.reset(token)
+
+
+def read_only_view(view):
+    """Run a view in a read-only scope for the session's user."""
+    @wraps(view)
+    def wrapper(*args: Any, **kwargs: Any):
+        with read_only():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def init_routing(app: Flask, db) -> None:
+    """Remember the time of a request's writes in the user's Flask session."""
+
+    @app.after_request
+    def remember_request_write(response):
+        if db.session.info.pop("wrote", False):
+            session[SESSION_WRITE_KEY] = time.time()
+            note_write(session.get("telegram_id"))
+        return response
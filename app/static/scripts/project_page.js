@@ -137,6 +137,12 @@ document.addEventListener('DOMContentLoaded', function() {
             setupDragAndDrop(taskRow);
         }
         
+        // Archived tasks are read-only
+        if (task.archived) {
+            taskDiv.classList.add('archived');
+            return taskRow;
+        }
+        
         // Add long press event listeners
         setupLongPress(taskDiv);
         
@@ -282,8 +288,8 @@ document.addEventListener('DOMContentLoaded', function() {
                         draggedElement.classList.remove('drop-animation');
                     }, 300);
                     
-                    // Save new order to server
-                    saveTaskOrder();
+                    // Save the new position of the moved task to server
+                    saveTaskMove(draggedElement);
                 }
             }
             
@@ -414,7 +420,7 @@ document.addEventListener('DOMContentLoaded', function() {
                             navigator.vibrate([30, 10, 30]);
                         }
                         
-                        saveTaskOrder();
+                        saveTaskMove(taskRow);
                     }
                 }
                 
@@ -540,6 +546,43 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Save the position of one moved task: the server places it between its
+    // neighbours, so only that task is updated
+    async function saveTaskMove(taskRow) {
+        const incompleteTasks = getIncompleteTaskRows();
+        const index = incompleteTasks.indexOf(taskRow);
+        const previous = incompleteTasks[index - 1];
+        const next = incompleteTasks[index + 1];
+
+        if (index === -1 || (!previous && !next)) {
+            return;
+        }
+
+        const anchor = previous
+            ? { after_id: previous.dataset.taskId }
+            : { before_id: next.dataset.taskId };
+
+        try {
+            const response = await fetch(`/api/project/${projectId}/task/${taskRow.dataset.taskId}/move`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(anchor)
+            });
+
+            const data = await response.json();
+            if (!response.ok || !data.success) {
+                throw new Error(data.error || 'Ошибка при перемещении задачи');
+            }
+        } catch (error) {
+            console.error('Error moving task:', error);
+            // Neighbours may be stale (e.g. a task was completed meanwhile):
+            // fall back to saving the whole visible order
+            saveTaskOrder();
+        }
+    }
+
     // Save task order to server
     async function saveTaskOrder() {
         const incompleteTasks = getIncompleteTaskRows();
@@ -745,8 +788,13 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Pending status toggles are sent together in one bulk request
+    const TOGGLE_FLUSH_DELAY = 400; // milliseconds
+    let pendingToggles = [];
+    let toggleFlushTimer = null;
+
     // Toggle task status
-    async function toggleTaskStatus(taskElement) {
+    function toggleTaskStatus(taskElement) {
         const taskId = taskElement.dataset.taskId;
         const taskRow = taskElement.closest('.task-row');
         const timeline = taskRow.querySelector('.timeline');
@@ -797,12 +845,33 @@ document.addEventListener('DOMContentLoaded', function() {
         // Reorder tasks after status change
         reorderTasks();
         
+        // Queue the change; several quick toggles cost one request and one commit
+        pendingToggles.push({ taskElement, taskId, oldStatus, newStatus });
+        clearTimeout(toggleFlushTimer);
+        toggleFlushTimer = setTimeout(flushToggles, TOGGLE_FLUSH_DELAY);
+    }
+
+    // Send all queued toggles in one bulk request
+    async function flushToggles() {
+        clearTimeout(toggleFlushTimer);
+        toggleFlushTimer = null;
+        
+        const batch = pendingToggles;
+        pendingToggles = [];
+        if (batch.length === 0) {
+            return;
+        }
+        
         try {
-            const response = await fetch(`/api/project/${projectId}/task/${taskId}/status`, {
-                method: 'PATCH',
+            const response = await fetch(`/api/project/${projectId}/tasks/bulk`, {
+                method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
+                body: JSON.stringify({
+                    operations: batch.map(entry => ({ op: 'toggle', id: Number(entry.taskId) }))
+                }),
+                keepalive: true // Let the request finish if the page is being closed
             });
 
             if (!response.ok) {
@@ -811,56 +880,33 @@ document.addEventListener('DOMContentLoaded', function() {
             }
 
             const data = await response.json();
+            let failedCount = 0;
             
-            // Verify server response matches our optimistic update
-            if (data.success && data.task) {
-                // Update completed_at data attribute with server value
-                taskElement.dataset.completedAt = data.task.completed_at || '';
-                
-                // If server returned different status, update to match
-                if (data.task.status !== newStatus) {
-                    taskElement.classList.remove(`status-${newStatus}`);
-                    taskElement.classList.add(`status-${data.task.status}`);
+            // Roll back failed toggles in reverse order so repeated toggles of one task unwind correctly
+            batch.slice().reverse().forEach((entry, reverseIndex) => {
+                const result = data.results[batch.length - 1 - reverseIndex];
+                if (!result || !result.success) {
+                    failedCount += 1;
+                    rollbackToggle(entry);
                 }
-                
-                // Update time with actual server time if completed
-                if (data.task.status === 'done' && data.task.completed_at) {
-                    const timelineTime = timeline.querySelector('.timeline-time');
-                    if (timelineTime) {
-                        // Use the helper function to format time in user's timezone
-                        timelineTime.textContent = formatTimeInUserTimezone(data.task.completed_at);
-                    }
+            });
+            batch.forEach((entry, index) => {
+                const result = data.results[index];
+                if (result && result.success && result.task) {
+                    applyToggleResult(entry, result.task);
                 }
-                
-                // Reorder again with accurate server time
-                reorderTasks();
+            });
+            
+            // Reorder again with accurate server time
+            reorderTasks();
+            
+            if (failedCount > 0) {
+                alert('Не удалось изменить статус некоторых задач');
             }
         } catch (error) {
             console.error('Error toggling task status:', error);
             
-            // Rollback to old status on error
-            taskElement.classList.remove(`status-${newStatus}`);
-            taskElement.classList.add(`status-${oldStatus}`);
-            
-            // Rollback draggable state
-            if (oldStatus === 'done') {
-                // Was completed, should not be draggable
-                taskRow.removeAttribute('draggable');
-                timeline.classList.remove('draggable-handle');
-                timelineDot.classList.add('completed');
-                // Restore previous completed_at value if it existed
-                // (We don't have the old value saved, but server should have it)
-            } else {
-                // Was incomplete, should be draggable
-                taskRow.setAttribute('draggable', 'true');
-                timeline.classList.add('draggable-handle');
-                timelineDot.classList.remove('completed');
-                const timelineTime = timeline.querySelector('.timeline-time');
-                if (timelineTime) {
-                    timelineTime.remove();
-                }
-                taskElement.dataset.completedAt = '';
-            }
+            batch.slice().reverse().forEach(rollbackToggle);
             
             // Reorder tasks back to correct state
             reorderTasks();
@@ -869,6 +915,70 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
+    // Sync a toggled task with the server response
+    function applyToggleResult(entry, task) {
+        const taskElement = entry.taskElement;
+        const timeline = taskElement.closest('.task-row').querySelector('.timeline');
+        const currentStatus = taskElement.className.match(/status-(\w+)/)[1];
+        
+        // Update completed_at data attribute with server value
+        taskElement.dataset.completedAt = task.completed_at || '';
+        
+        // If server returned different status, update to match
+        if (task.status !== currentStatus) {
+            taskElement.classList.remove(`status-${currentStatus}`);
+            taskElement.classList.add(`status-${task.status}`);
+        }
+        
+        // Update time with actual server time if completed
+        if (task.status === 'done' && task.completed_at) {
+            const timelineTime = timeline.querySelector('.timeline-time');
+            if (timelineTime) {
+                // Use the helper function to format time in user's timezone
+                timelineTime.textContent = formatTimeInUserTimezone(task.completed_at);
+            }
+        }
+    }
+
+    // Restore the UI state a toggle had before the optimistic update
+    function rollbackToggle(entry) {
+        const { taskElement, oldStatus, newStatus } = entry;
+        const taskRow = taskElement.closest('.task-row');
+        const timeline = taskRow.querySelector('.timeline');
+        const timelineDot = timeline.querySelector('.timeline-dot');
+        
+        // Rollback to old status on error
+        taskElement.classList.remove(`status-${newStatus}`);
+        taskElement.classList.add(`status-${oldStatus}`);
+        
+        // Rollback draggable state
+        if (oldStatus === 'done') {
+            // Was completed, should not be draggable
+            taskRow.removeAttribute('draggable');
+            timeline.classList.remove('draggable-handle');
+            timelineDot.classList.add('completed');
+            // Restore previous completed_at value if it existed
+            // (We don't have the old value saved, but server should have it)
+        } else {
+            // Was incomplete, should be draggable
+            taskRow.setAttribute('draggable', 'true');
+            timeline.classList.add('draggable-handle');
+            timelineDot.classList.remove('completed');
+            const timelineTime = timeline.querySelector('.timeline-time');
+            if (timelineTime) {
+                timelineTime.remove();
+            }
+            taskElement.dataset.completedAt = '';
+        }
+    }
+
+    // Do not lose queued toggles when the Mini App is hidden or closed
+    document.addEventListener('visibilitychange', function() {
+        if (document.visibilityState === 'hidden') {
+            flushToggles();
+        }
+    });
+
     // Open edit modal
     function openEditModal(taskElement) {
         currentTaskId = taskElement.dataset.taskId;
@@ -1117,4 +1227,59 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Call scroll function after a short delay to ensure layout is complete
     setTimeout(scrollToShowOneCompletedTask, 100);
+
+    // Older completed tasks are not rendered with the page: load them
+    // page by page when the timeline is scrolled close to the top.
+    // When the task feed is exhausted, continue with the archive
+    const HISTORY_LOAD_THRESHOLD = 200; // pixels from the top
+    let historySource = tasksContainer.dataset.historyCursor ? 'tasks' : 'archive-start';
+    let historyCursor = tasksContainer.dataset.historyCursor || null;
+    let historyLoading = false;
+
+    async function loadOlderTasks() {
+        if ((!historyCursor && historySource !== 'archive-start') || historyLoading) {
+            return;
+        }
+        historyLoading = true;
+
+        const endpoint = historySource === 'tasks' ? 'tasks' : 'archive';
+        const query = historyCursor ? `?before=${encodeURIComponent(historyCursor)}` : '';
+
+        try {
+            const response = await fetch(`/api/project/${projectId}/${endpoint}${query}`);
+            const data = await response.json();
+
+            if (!response.ok) {
+                throw new Error(data.error || 'Ошибка при загрузке задач');
+            }
+
+            // Prepend and keep the visible tasks in place
+            const previousHeight = tasksContainer.scrollHeight;
+            const fragment = document.createDocumentFragment();
+            data.tasks.forEach(task => {
+                if (!document.getElementById(`task-${task.id}`)) {
+                    fragment.appendChild(createTaskElement(task));
+                }
+            });
+            tasksContainer.insertBefore(fragment, tasksContainer.firstChild);
+            tasksContainer.scrollTop += tasksContainer.scrollHeight - previousHeight;
+
+            historyCursor = data.cursor;
+            if (!historyCursor && historySource === 'tasks') {
+                historySource = 'archive-start';
+            } else if (historySource === 'archive-start') {
+                historySource = 'archive';
+            }
+        } catch (error) {
+            console.error('Error loading older tasks:', error);
+        } finally {
+            historyLoading = false;
+        }
+    }
+
+    tasksContainer.addEventListener('scroll', function() {
+        if (tasksContainer.scrollTop < HISTORY_LOAD_THRESHOLD) {
+            loadOlderTasks();
+        }
+    }, { passive: true });
 });
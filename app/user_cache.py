@@ -0,0 +1,104 @@
+"""
+Cache of user snapshots for the bot, looked up by telegram_id.
+
+A snapshot is a small dict with the user's id and reminder settings, so bot
+commands of chatty users are answered without reading `user` and
+`user_settings` again. Writers must call `invalidate_user` after changing the
+settings (app.crud does it); entries also expire after USER_SNAPSHOT_CACHE_TTL.
+
+The cache is per process, like app.cache.TTLCache itself, and `invalidate_user`
+only reaches the process that made the change. In polling and async modes that
+is fine: settings are changed by bot commands, and one process (the holder of
+the polling lease) handles all of them. In webhook mode any web process may
+handle a chat's next command, so snapshots there live only
+USER_SNAPSHOT_WEBHOOK_CACHE_TTL seconds: a command can show settings changed
+through another process at most that long ago. Priming from the reminder
+outbox is skipped in that mode, the scheduler's cache serves no commands.
+"""
+from typing import Any, Dict, Iterable, Optional
+
+from app import db
+from app.cache import TTLCache
+from app.models import User, UserSettings
+from config import Config
+
+WEBHOOK_MODE = Config.BOT_MODE == "webhook"
+
+# Keyed by user.id, so invalidate_user always finds the entry it has to drop
+_snapshots = TTLCache(
+    maxsize=Config.USER_SNAPSHOT_CACHE_SIZE,
+    ttl=Config.USER_SNAPSHOT_WEBHOOK_CACHE_TTL if WEBHOOK_MODE else Config.USER_SNAPSHOT_CACHE_TTL,
+)
+
+# telegram_id -> user.id never changes, losing an entry only costs a lookup query
+_user_ids = TTLCache(maxsize=Config.USER_SNAPSHOT_CACHE_SIZE, ttl=Config.USER_SNAPSHOT_CACHE_TTL)
+
+
+def _store(snapshot: Dict[str, Any]) -> None:
+    _user_ids.set(snapshot["telegram_id"], snapshot["user_id"])
+    _snapshots.set(snapshot["user_id"], snapshot)
+
+
+def get_user_snapshot(telegram_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Get the user's id and reminder settings, reading the database only on a cache miss.
+
+    Args:
+        telegram_id: Telegram user ID
+
+    Returns:
+        Dictionary with user_id, telegram_id, reminders_enabled, reminder_time and
+        timezone (settings fields are None if the user has no settings yet),
+        or None if the user does not exist
+    """
+    # An unknown telegram_id looks up None, which still counts as a snapshot miss
+    snapshot = _snapshots.get(_user_ids.get(telegram_id))
+    if snapshot is not None:
+        return dict(snapshot)
+
+    row = db.session.query(
+        User.id, UserSettings.reminders_enabled, UserSettings.reminder_time, UserSettings.timezone
+    ).outerjoin(UserSettings, UserSettings.user_id == User.id)\
+        .filter(User.telegram_id == telegram_id).first()
+    if row is None:
+        return None
+
+    snapshot = {
+        "user_id": row[0],
+        "telegram_id": telegram_id,
+        "reminders_enabled": row[1],
+        "reminder_time": row[2],
+        "timezone": row[3],
+    }
+    _store(snapshot)
+    return dict(snapshot)
+
+
+def prime_user_snapshots(recipients: Iterable[Dict[str, Any]]) -> None:
+    """
+    Cache snapshots of reminder recipients (claimed rows of app.outbox).
+
+    Users usually answer a reminder with a command, which then needs no query.
+    Does nothing in webhook mode, where commands are handled by the web processes.
+    """
+    if WEBHOOK_MODE:
+        return
+
+    for recipient in recipients:
+        _store({
+            "user_id": recipient["user_id"],
+            "telegram_id": recipient["telegram_id"],
+            "reminders_enabled": recipient["reminders_enabled"],
+            "reminder_time": recipient["reminder_time"],
+            "timezone": recipient["timezone"],
+        })
+
+
+def invalidate_user(user_id: int) -> None:
+    """Drop the cached snapshot of a user after their settings changed."""
+    _snapshots.pop(user_id)
+
+
+def user_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters of the snapshot cache."""
+    return _snapshots.stats()
@@ -0,0 +1,197 @@
+"""
+Webhook intake for the Telegram bot.
+
+Telegram POSTs updates to /telegram/webhook. The view only checks the secret
+token, parses the update and puts it on an in-process queue, so HTTP intake never
+waits for a handler. UpdateDispatcher drains the queues with a pool of worker
+threads; updates are sharded by chat, so each chat is handled by one worker and
+its updates are processed in the order they arrived.
+
+Each web process (gunicorn worker or dev server) starts its own bot and
+dispatcher on the first update it receives, so intake works whether or not the
+bot is embedded. Telegram is pointed at the endpoint once, by the process that
+runs the reminder scheduler (CheckBot.register_webhook) or `flask set-webhook`,
+with max_connections=1: Telegram then sends the next update only after the
+previous one was acknowledged, instead of up to 40 requests in parallel that
+could reach different processes. Order is only guaranteed within one process's
+dispatcher, so when several web processes serve the endpoint, an update queued
+in one of them may still be handled after the next update of the same chat
+queued in another; route /telegram/webhook to a single process if strict
+per-chat order matters.
+
+fake_telegram.py runs a local stand-in for the Bot API and posts updates to the
+endpoint, so webhook mode can be exercised without Telegram.
+"""
+import hmac
+import logging
+import queue
+import threading
+from typing import Callable, List, Optional
+
+from flask import Blueprint, current_app, request
+from telebot import types
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint("webhook", __name__)
+
+WEBHOOK_PATH = "/telegram/webhook"
+
+# Parallel webhook requests Telegram may open, one keeps updates in delivery order
+WEBHOOK_MAX_CONNECTIONS = 1
+
+# Key in app.extensions under which the running dispatcher is registered
+DISPATCHER_EXTENSION = "telegram_dispatcher"
+
+
+_intake_lock = threading.Lock()
+
+
+def get_update_chat_id(update: types.Update) -> Optional[int]:
+    """Return the chat (or user) an update belongs to, used as the ordering key."""
+    for message in (update.message, update.edited_message, update.channel_post, update.edited_channel_post):
+        if message is not None:
+            return message.chat.id
+
+    if update.callback_query is not None:
+        if update.callback_query.message is not None:
+            return update.callback_query.message.chat.id
+        return update.callback_query.from_user.id
+
+    for event in (update.inline_query, update.chosen_inline_result, update.my_chat_member, update.chat_member):
+        if event is not None:
+            return event.from_user.id
+
+    return None
+
+
+class UpdateDispatcher:
+    """
+    Bounded update queue drained by a pool of worker threads.
+
+    Every worker owns one queue shard and updates are routed by chat id, which
+    keeps per-chat order while different chats are handled in parallel.
+    """
+
+    def __init__(self, process: Callable[[types.Update], None],
+                 workers: int = Config.WEBHOOK_WORKERS,
+                 queue_size: int = Config.WEBHOOK_QUEUE_SIZE):
+        """
+        Args:
+            process: Callback that handles one update (runs in a worker thread)
+            workers: Number of worker threads (queue shards)
+            queue_size: Total number of queued updates across all shards
+        """
+        self.process = process
+        self.workers = max(1, workers)
+        shard_size = max(1, queue_size // self.workers)
+        self._queues: List[queue.Queue] = [queue.Queue(maxsize=shard_size) for _ in range(self.workers)]
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        """Start the worker threads."""
+        for index, shard in enumerate(self._queues):
+            thread = threading.Thread(target=self._worker, args=(shard,), name=f"webhook-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Update dispatcher started with {self.workers} workers")
+
+    def stop(self, timeout: float = 5) -> None:
+        """Let the workers finish queued updates and stop them."""
+        for shard in self._queues:
+            shard.put(None)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads.clear()
+
+    def submit(self, update: types.Update) -> bool:
+        """
+        Queue an update without blocking.
+
+        Returns:
+            False if the update's shard is full
+        """
+        chat_id = get_update_chat_id(update)
+        key = chat_id if chat_id is not None else update.update_id
+        try:
+            self._queues[hash(key) % self.workers].put_nowait(update)
+            return True
+        except queue.Full:
+            return False
+
+    def pending(self) -> int:
+        """Number of queued updates."""
+        return sum(shard.qsize() for shard in self._queues)
+
+    def _worker(self, shard: queue.Queue) -> None:
+        while True:
+            update = shard.get()
+            if update is None:
+                return
+            try:
+                self.process(update)
+            except Exception as e:
+                logger.error(f"Failed to process update {update.update_id}: {e}")
+
+
+def get_dispatcher(app) -> Optional[UpdateDispatcher]:
+    """
+    Return this process's update dispatcher, starting the webhook intake on first use.
+
+    Returns:
+        None if no bot token is configured
+    """
+    dispatcher = app.extensions.get(DISPATCHER_EXTENSION)
+    if dispatcher is not None or not app.config.get("TELEGRAM_BOT_TOKEN"):
+        return dispatcher
+
+    with _intake_lock:
+        dispatcher = app.extensions.get(DISPATCHER_EXTENSION)
+        if dispatcher is None:
+            from app import db
+            from app.bot import create_bot
+
+            # Reminders are sent by the scheduler process, this bot only handles updates
+            bot = create_bot(token=app.config["TELEGRAM_BOT_TOKEN"], app=app, db=db, reminders_enabled=False)
+            dispatcher = bot.start_intake()
+            logger.info("Webhook intake started")
+    return dispatcher
+
+
+@bp.route(WEBHOOK_PATH, methods=["POST"])
+def telegram_webhook():
+    """Accept an update from Telegram and queue it for the bot."""
+    if current_app.config.get("BOT_MODE") != "webhook":
+        return "Not found", 404
+
+    secret = current_app.config.get("TELEGRAM_WEBHOOK_SECRET") or ""
+    received = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not secret or not hmac.compare_digest(received.encode(), secret.encode()):
+        return "Forbidden", 403
+
+    try:
+        # The bot keeps the app for its handler threads, which have no app context
+        dispatcher = get_dispatcher(current_app._get_current_object())
+    except Exception as e:
+        logger.error(f"Failed to start webhook intake: {e}")
+        dispatcher = None
+    if dispatcher is None:
+        return "Bot is not running", 503
+
+    try:
+        update = types.Update.de_json(request.get_data(as_text=True))
+    except Exception as e:
+        logger.warning(f"Malformed webhook update: {e}")
+        return "Bad request", 400
+
+    if update is None:
+        return "Bad request", 400
+
+    if not dispatcher.submit(update):
+        # Telegram redelivers the update later
+        logger.warning(f"Update queue is full, rejecting update {update.update_id}")
+        return "Busy", 503
+
+    return "", 200
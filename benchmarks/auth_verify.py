@@ -0,0 +1,84 @@
+"""
+Microbenchmark of Telegram Mini App initData verification.
+
+Measures verify_telegram_web_app_data throughput for three cases:
+cold (every call verifies new initData), warm (repeat opens with the same
+initData, served from the cache) and the legacy path (key derivation and
+HMAC on every call, as before the cache).
+
+    python benchmarks/auth_verify.py [--iterations 50000]
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlencode
+
+# Add parent directory to path to import app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.auth import _verified_init_data, init_data_cache_stats, verify_telegram_web_app_data
+
+BOT_TOKEN = "123456:benchmark-token"
+
+
+def make_init_data(telegram_id: int, bot_token: str = BOT_TOKEN) -> str:
+    """Build initData signed the way Telegram signs it."""
+    fields = {
+        "auth_date": str(int(time.time())),
+        "query_id": f"AAH{telegram_id}",
+        "user": json.dumps({"id": telegram_id, "first_name": "Bench", "language_code": "ru"}),
+    }
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode(fields)
+
+
+def legacy_verify(init_data: str, bot_token: str) -> dict | None:
+    """Verification without caching: derive the key and compute the HMAC every time."""
+    from urllib.parse import parse_qsl
+
+    parsed_data = dict(parse_qsl(init_data))
+    received_hash = parsed_data.pop("hash")
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(parsed_data.items()))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    if calculated_hash != received_hash:
+        return None
+    return json.loads(parsed_data["user"])
+
+
+def run(name: str, verify, payloads: list) -> None:
+    started_at = time.perf_counter()
+    for init_data in payloads:
+        assert verify(init_data, BOT_TOKEN) is not None
+    elapsed = time.perf_counter() - started_at
+    print(f"{name:<8} {len(payloads) / elapsed:>12,.0f} verifications/s  {elapsed / len(payloads) * 1e6:8.2f} us/op")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50000)
+    args = parser.parse_args()
+
+    # Distinct users, each opening the Mini App several times with the same initData
+    unique = [make_init_data(telegram_id) for telegram_id in range(1000, 1000 + min(args.iterations, 5000))]
+    repeated = [unique[i % len(unique)] for i in range(args.iterations)]
+
+    run("legacy", legacy_verify, repeated)
+
+    _verified_init_data.clear()
+    run("cold", verify_telegram_web_app_data, unique)
+    run("warm", verify_telegram_web_app_data, repeated)
+
+    print(f"cache: {init_data_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+SQL query budgets of the pages, API endpoints and bot summaries.
+
+Seeds a small dataset into a temporary SQLite database and runs every endpoint
+and get_daily_summary once under app.query_stats.query_budget. The budgets do
+not depend on the number of projects or tasks, so a change that adds a query
+per row exceeds them. Exits with status 1 when a budget is exceeded, so it
+can run in CI:
+
+    python benchmarks/query_budgets.py
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Add parent directory to path to import app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+DATABASE = os.path.join(tempfile.mkdtemp(prefix="check-budgets-"), "budgets.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{DATABASE}"
+os.environ["DATABASE_REPLICA_URL"] = ""
+os.environ["TELEGRAM_MOCK"] = "false"
+os.environ.setdefault("SECRET_KEY", "budgets")
+
+from app import create_app, db
+from app.archive import archive_completed_tasks
+from app.bot_service import get_daily_summary, get_reminder_messages
+from app.generate import generate_data
+from app.models import Project, Task, TaskStatus, User
+from app.query_stats import QueryBudgetExceeded, query_budget
+from app.routes import dashboard_cache
+
+# Maximum statements per call (the dashboard cache is cleared first, so GET / renders)
+ROUTE_BUDGETS: Dict[str, int] = {
+    "GET /": 2,
+    "GET /project/<id>": 3,
+    "GET /api/project/<id>/tasks": 3,
+    "GET /api/project/<id>/archive": 2,
+    "POST /api/project/<id>/task": 5,
+    "PUT /api/project/<id>/task/<id>": 3,
+    "PATCH /api/project/<id>/task/<id>/status": 4,
+    "POST /api/project/<id>/tasks/bulk": 10,
+    "POST /api/project/<id>/tasks/reorder": 3,
+    "POST /api/project/<id>/task/<id>/move": 5,
+    "DELETE /api/project/<id>/task/<id>": 3,
+}
+
+FUNCTION_BUDGETS: Dict[str, int] = {
+    "get_daily_summary": 3,
+    "get_reminder_messages (all users)": 3,
+}
+
+
+def route_requests(project_id: int, task_id: int, pending_ids: List[int]) -> Dict[str, Tuple[str, str, Optional[Any]]]:
+    """Endpoint name -> (method, url, json body)."""
+    base = f"/api/project/{project_id}"
+    return {
+        "GET /": ("GET", "/", None),
+        "GET /project/<id>": ("GET", f"/project/{project_id}", None),
+        "GET /api/project/<id>/tasks": ("GET", f"{base}/tasks", None),
+        "GET /api/project/<id>/archive": ("GET", f"{base}/archive", None),
+        "POST /api/project/<id>/task": ("POST", f"{base}/task", {"title": "Budget task"}),
+        "PUT /api/project/<id>/task/<id>": ("PUT", f"{base}/task/{task_id}", {"title": "Renamed"}),
+        "PATCH /api/project/<id>/task/<id>/status": ("PATCH", f"{base}/task/{task_id}/status", None),
+        "POST /api/project/<id>/tasks/bulk": ("POST", f"{base}/tasks/bulk", {"operations": [
+            {"op": "create", "title": "Bulk 1"},
+            {"op": "create", "title": "Bulk 2"},
+            {"op": "rename", "id": task_id, "title": "Bulk renamed"},
+            {"op": "toggle", "id": task_id},
+        ]}),
+        "POST /api/project/<id>/tasks/reorder": ("POST", f"{base}/tasks/reorder", {"task_ids": pending_ids[::-1]}),
+        "POST /api/project/<id>/task/<id>/move": ("POST", f"{base}/task/{pending_ids[0]}/move",
+                                                  {"after_id": pending_ids[-1]}),
+        "DELETE /api/project/<id>/task/<id>": ("DELETE", f"{base}/task/{task_id}", None),
+    }
+
+
+def check(label: str, budget: int, run) -> Optional[str]:
+    """Run `run` under its budget; returns the failure message, if any."""
+    try:
+        with query_budget(budget, label) as stats:
+            run()
+    except QueryBudgetExceeded as e:
+        print(f"FAIL {label}: {stats['count']} > {budget}")
+        return str(e)
+    print(f"ok   {label}: {stats['count']} <= {budget}")
+    return None
+
+
+def main() -> int:
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    with app.app_context():
+        db.create_all()
+        generate_data(users=5, projects=8, tasks=60, seed=7)
+        archive_completed_tasks()
+
+        user = User.query.order_by(User.id).first()
+        project = Project.query.filter(Project.creator_id == user.id, Project.pending_count >= 2)\
+            .order_by(Project.id).first()
+        pending_ids = [task_id for (task_id,) in db.session.query(Task.id).filter(
+            Task.project_id == project.id, Task.status != TaskStatus.DONE).order_by(Task.order)]
+        task_id = db.session.query(Task.id).filter(Task.project_id == project.id)\
+            .order_by(Task.id.desc()).limit(1).scalar()
+        telegram_id, user_id, user_ids = user.telegram_id, user.id, [u.id for u in User.query]
+        project_id = project.id
+
+    failures: List[str] = []
+    requests = route_requests(project_id, task_id, pending_ids)
+
+    for label, budget in ROUTE_BUDGETS.items():
+        method, url, body = requests[label]
+        # Fresh client and caches: measure the cold path
+        client = app.test_client()
+        with client.session_transaction() as flask_session:
+            flask_session["telegram_id"] = telegram_id
+        dashboard_cache.clear()
+
+        def run_request():
+            response = client.open(url, method=method, json=body)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{label} returned {response.status_code}: {response.get_data(as_text=True)}")
+
+        with app.app_context():
+            failure = check(label, budget, run_request)
+        if failure:
+            failures.append(failure)
+
+    with app.app_context():
+        for label, run in (
+            ("get_daily_summary", lambda: get_daily_summary(user_id)),
+            ("get_reminder_messages (all users)", lambda: get_reminder_messages(user_ids)),
+        ):
+            db.session.expire_all()
+            failure = check(label, FUNCTION_BUDGETS[label], run)
+            if failure:
+                failures.append(failure)
+
+    for failure in failures:
+        print(f"\n{failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
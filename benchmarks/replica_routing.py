@@ -0,0 +1,152 @@
+"""
+Read-replica routing check with two SQLite files as primary and replica.
+
+Seeds the primary, copies it to the replica file and then only writes to the
+primary, so the replica behaves like one that stopped replicating. Checks that
+read-only endpoints of a user who did not write are served by the replica, and
+that after every mutation endpoint the same user's next read goes to the
+primary and sees the write (read-your-writes). Exits with status 1 on failure,
+so it can run in CI:
+
+    python benchmarks/replica_routing.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Add parent directory to path to import app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+DIRECTORY = tempfile.mkdtemp(prefix="check-replica-")
+PRIMARY = os.path.join(DIRECTORY, "primary.db")
+REPLICA = os.path.join(DIRECTORY, "replica.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{PRIMARY}"
+os.environ["DATABASE_REPLICA_URL"] = f"sqlite:///{REPLICA}"
+os.environ["TELEGRAM_MOCK"] = "false"
+os.environ.setdefault("SECRET_KEY", "replica")
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.generate import generate_data
+from app.models import Project, Task, TaskStatus, User
+from app.routes import dashboard_cache
+from app.routing import REPLICA_BIND, SESSION_WRITE_KEY
+
+# Request: (method, url, json body)
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+class Seeded:
+    """Ids of the seeded data the checks work on."""
+
+    def __init__(self, reader: int, writer: int, project_id: int, pending_ids: List[int]):
+        self.reader = reader
+        self.writer = writer
+        self.project_id = project_id
+        self.pending_ids = pending_ids
+
+
+def seed(app) -> Seeded:
+    with app.app_context():
+        db.create_all()
+        generate_data(users=2, projects=2, tasks=20, seed=3)
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+        reader, writer = User.query.order_by(User.id).limit(2).all()
+        project = Project.query.filter(Project.creator_id == writer.id, Project.pending_count >= 3)\
+            .order_by(Project.id).first()
+        pending_ids = [task_id for (task_id,) in db.session.query(Task.id).filter(
+            Task.project_id == project.id, Task.status != TaskStatus.DONE).order_by(Task.order)]
+        seeded = Seeded(reader.telegram_id, writer.telegram_id, project.id, pending_ids)
+        db.session.remove()
+
+    # The replica is a snapshot: nothing written from now on reaches it
+    shutil.copyfile(PRIMARY, REPLICA)
+    return seeded
+
+
+def client_for(app, telegram_id: int):
+    client = app.test_client()
+    with client.session_transaction() as flask_session:
+        flask_session["telegram_id"] = telegram_id
+    return client
+
+
+def feed(client, project_id: int) -> List[Dict[str, Any]]:
+    response = client.get(f"/api/project/{project_id}/tasks")
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()["tasks"]
+
+
+def main() -> int:
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+    seeded = seed(app)
+
+    replica_statements = {"count": 0}
+    with app.app_context():
+        @event.listens_for(db.engines[REPLICA_BIND], "before_cursor_execute")
+        def count_replica(conn, cursor, statement, parameters, context, executemany):
+            replica_statements["count"] += 1
+
+    failures: List[str] = []
+
+    def check(label: str, ok: bool, detail: str = "") -> None:
+        print(f"{'ok  ' if ok else 'FAIL'} {label}")
+        if not ok:
+            failures.append(f"{label}: {detail}")
+
+    # A user who did not write reads from the replica
+    reader = client_for(app, seeded.reader)
+    for url in ("/", f"/api/project/{seeded.project_id}/tasks"):
+        dashboard_cache.clear()
+        before = replica_statements["count"]
+        reader.get(url)
+        check(f"GET {url} without a write uses the replica", replica_statements["count"] > before)
+
+    base = f"/api/project/{seeded.project_id}"
+    pending = seeded.pending_ids
+    mutations: List[Tuple[str, Request, Callable[[List[Dict[str, Any]]], bool]]] = [
+        ("reorder", ("POST", f"{base}/tasks/reorder", {"task_ids": pending[::-1]}),
+         lambda tasks: [task["id"] for task in tasks if task["id"] in pending][:len(pending)] == pending[::-1]),
+        ("move", ("POST", f"{base}/task/{pending[0]}/move", {"after_id": pending[1]}),
+         lambda tasks: [task["id"] for task in tasks].index(pending[0])
+         > [task["id"] for task in tasks].index(pending[1])),
+        ("create", ("POST", f"{base}/task", {"title": "Replica check"}),
+         lambda tasks: any(task["title"] == "Replica check" for task in tasks)),
+        ("rename", ("PUT", f"{base}/task/{pending[2]}", {"title": "Renamed on primary"}),
+         lambda tasks: any(task["title"] == "Renamed on primary" for task in tasks)),
+        ("toggle", ("PATCH", f"{base}/task/{pending[2]}/status", None),
+         lambda tasks: any(task["id"] == pending[2] and task["status"] == TaskStatus.DONE.value for task in tasks)),
+    ]
+
+    for name, (method, url, body), sees_write in mutations:
+        # A fresh client per mutation: only that mutation may mark the session
+        writer = client_for(app, seeded.writer)
+        response = writer.open(url, method=method, json=body)
+        check(f"{name} succeeded", response.status_code < 300, response.get_data(as_text=True))
+
+        with writer.session_transaction() as flask_session:
+            marked = SESSION_WRITE_KEY in flask_session
+        check(f"{name} marked the session as written", marked)
+
+        before = replica_statements["count"]
+        tasks = feed(writer, seeded.project_id)
+        check(f"read after {name} stays on the primary", replica_statements["count"] == before,
+              f"{replica_statements['count'] - before} statements went to the replica")
+        check(f"read after {name} sees the write", sees_write(tasks))
+
+    for failure in failures:
+        print(f"\n{failure}")
+    shutil.rmtree(DIRECTORY, ignore_errors=True)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
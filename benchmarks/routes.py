@@ -0,0 +1,297 @@
+"""
+Route-level load and latency benchmark.
+
+Seeds a synthetic dataset (app.generate) into a fresh SQLite database, then drives every page
+and /api/project/... endpoint through the Flask test client with concurrent
+clients (one user per client). For each endpoint it reports throughput,
+p50/p95/p99 latency, error count and SQL statements per request, and writes
+the results to a JSON file that can be compared across commits:
+
+    python benchmarks/routes.py --users 50 --projects 5 --tasks 200 --clients 8
+    python benchmarks/routes.py --output after.json --compare before.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).parent.parent
+
+# Add parent directory to path to import app
+sys.path.insert(0, str(ROOT))
+
+# Request: (method, url, json body)
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="users to seed (and the maximum number of clients)")
+    parser.add_argument("--projects", type=int, default=5, help="projects per user")
+    parser.add_argument("--tasks", type=int, default=200, help="tasks per project")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=400, help="requests per endpoint")
+    parser.add_argument("--seed", type=int, default=42, help="random seed of the dataset and the request mix")
+    parser.add_argument("--database", help="new SQLite file to create (default: a temporary file)")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="delete the --database file first if it exists (it is wiped and reseeded)")
+    parser.add_argument("--output", default="benchmark-routes.json", help="JSON file for the results")
+    parser.add_argument("--compare", help="earlier results file to print the difference against")
+    return parser.parse_args()
+
+
+def configure_environment(database: str) -> None:
+    """Point the application at the benchmark database before config is imported."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    os.environ["DATABASE_REPLICA_URL"] = ""
+    os.environ["TELEGRAM_MOCK"] = "false"
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+
+
+def seed_dataset(users: int, projects: int, tasks: int, seed: int) -> None:
+    """Create users x projects x tasks (flask generate-data) and archive old history."""
+    from app.archive import archive_completed_tasks
+    from app.generate import generate_data
+
+    generate_data(users, projects, tasks, seed=seed)
+    archive_completed_tasks()
+
+
+class Client:
+    """One simulated user with a test client and the ids it may touch."""
+
+    def __init__(self, app, telegram_id: int, project_ids: List[int], rng: random.Random):
+        self.client = app.test_client()
+        with self.client.session_transaction() as flask_session:
+            flask_session["telegram_id"] = telegram_id
+        self.project_ids = project_ids
+        self.rng = rng
+
+    def project(self) -> int:
+        return self.rng.choice(self.project_ids)
+
+    def pending_tasks(self, app, project_id: int) -> List[int]:
+        from app.models import Task, TaskStatus
+
+        with app.app_context():
+            return [task_id for (task_id,) in Task.query.with_entities(Task.id).filter(
+                Task.project_id == project_id, Task.status == TaskStatus.TODO).order_by(Task.order).all()]
+
+    def any_task(self, app, project_id: int) -> Optional[int]:
+        from app.models import Task
+
+        with app.app_context():
+            row = Task.query.with_entities(Task.id).filter(Task.project_id == project_id)\
+                .order_by(Task.id.desc()).first()
+            return row[0] if row else None
+
+
+def build_scenarios(app) -> Dict[str, Callable[[Client], Request]]:
+    """Endpoint name -> function producing the next request of a client."""
+
+    def create_task(client: Client) -> Request:
+        return "POST", f"/api/project/{client.project()}/task", {"title": "Benchmark task"}
+
+    def update_task(client: Client) -> Request:
+        project_id = client.project()
+        return "PUT", f"/api/project/{project_id}/task/{client.any_task(app, project_id)}", {"title": "Renamed"}
+
+    def toggle_task(client: Client) -> Request:
+        project_id = client.project()
+        return "PATCH", f"/api/project/{project_id}/task/{client.any_task(app, project_id)}/status", None
+
+    def delete_task(client: Client) -> Request:
+        project_id = client.project()
+        return "DELETE", f"/api/project/{project_id}/task/{client.any_task(app, project_id)}", None
+
+    def bulk(client: Client) -> Request:
+        project_id = client.project()
+        task_id = client.any_task(app, project_id)
+        return "POST", f"/api/project/{project_id}/tasks/bulk", {"operations": [
+            {"op": "create", "title": "Bulk 1"},
+            {"op": "create", "title": "Bulk 2"},
+            {"op": "rename", "id": task_id, "title": "Bulk renamed"},
+            {"op": "toggle", "id": task_id},
+        ]}
+
+    def reorder(client: Client) -> Request:
+        project_id = client.project()
+        task_ids = client.pending_tasks(app, project_id)
+        client.rng.shuffle(task_ids)
+        return "POST", f"/api/project/{project_id}/tasks/reorder", {"task_ids": task_ids}
+
+    def move(client: Client) -> Request:
+        project_id = client.project()
+        task_ids = client.pending_tasks(app, project_id)
+        if len(task_ids) < 2:
+            return create_task(client)
+        task_id, anchor = client.rng.sample(task_ids, 2)
+        return "POST", f"/api/project/{project_id}/task/{task_id}/move", {"after_id": anchor}
+
+    return {
+        "GET /": lambda client: ("GET", "/", None),
+        "GET /project/<id>": lambda client: ("GET", f"/project/{client.project()}", None),
+        "GET /api/project/<id>/tasks": lambda client: ("GET", f"/api/project/{client.project()}/tasks", None),
+        "GET /api/project/<id>/archive": lambda client: ("GET", f"/api/project/{client.project()}/archive", None),
+        "POST /api/project/<id>/task": create_task,
+        "PUT /api/project/<id>/task/<id>": update_task,
+        "PATCH /api/project/<id>/task/<id>/status": toggle_task,
+        "POST /api/project/<id>/tasks/bulk": bulk,
+        "POST /api/project/<id>/tasks/reorder": reorder,
+        "POST /api/project/<id>/task/<id>/move": move,
+        "DELETE /api/project/<id>/task/<id>": delete_task,
+    }
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_endpoint(clients: List[Client], make_request: Callable[[Client], Request],
+                 requests: int, statements: threading.local) -> Dict[str, Any]:
+    """Send `requests` requests spread over all clients in parallel and collect the measurements."""
+    latencies: List[float] = []
+    sql_counts: List[int] = []
+    errors = 0
+    results_lock = threading.Lock()
+
+    def worker(client: Client, count: int) -> None:
+        nonlocal errors
+        for _ in range(count):
+            # Each client runs in one thread, so its rng and ids are never shared
+            method, url, body = make_request(client)
+            statements.count = 0
+            started_at = time.perf_counter()
+            response = client.client.open(url, method=method, json=body)
+            elapsed = time.perf_counter() - started_at
+            with results_lock:
+                latencies.append(elapsed)
+                sql_counts.append(statements.count)
+                if response.status_code >= 400:
+                    errors += 1
+
+    share, extra = divmod(requests, len(clients))
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+        futures = [executor.submit(worker, client, share + (1 if index < extra else 0))
+                   for index, client in enumerate(clients)]
+        # Re-raise a failure of a client thread instead of reporting fewer requests
+        for future in futures:
+            future.result()
+    wall = time.perf_counter() - started_at
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "sql_per_request": statistics.fmean(sql_counts),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_results(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]]) -> None:
+    header = f"{'endpoint':<42} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sql':>6} {'err':>5}"
+    print(header)
+    print("-" * len(header))
+    for name, result in results.items():
+        line = (f"{name:<42} {result['throughput']:>9.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                f"{result['p99_ms']:>8.2f} {result['sql_per_request']:>6.1f} {result['errors']:>5}")
+        before = (baseline or {}).get(name)
+        if before:
+            change = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+            line += f"   p95 {change:+.0f}%, sql {result['sql_per_request'] - before['sql_per_request']:+.1f}"
+        print(line)
+
+
+def main() -> None:
+    args = parse_args()
+
+    database = args.database or os.path.join(tempfile.mkdtemp(prefix="check-bench-"), "bench.db")
+    if os.path.exists(database):
+        if not args.overwrite:
+            sys.exit(f"{database} already exists, pass --overwrite to delete it and reseed")
+        os.remove(database)
+    configure_environment(database)
+
+    from sqlalchemy import event
+
+    from app import create_app, db
+
+    app = create_app()
+    app.config["WTF_CSRF_ENABLED"] = False
+
+    statements = threading.local()
+
+    with app.app_context():
+        db.create_all()
+        started_at = time.perf_counter()
+        seed_dataset(args.users, args.projects, args.tasks, args.seed)
+        print(f"Seeded {args.users * args.projects * args.tasks} tasks in {time.perf_counter() - started_at:.1f}s")
+
+        for engine in db.engines.values():
+            @event.listens_for(engine, "before_cursor_execute")
+            def count_statement(conn, cursor, statement, parameters, context, executemany):
+                statements.count = getattr(statements, "count", 0) + 1
+
+    from app.models import Project, User
+
+    rng = random.Random(args.seed)
+    clients = []
+    with app.app_context():
+        owners = User.query.order_by(User.id).limit(min(args.clients, args.users)).all()
+        for user in owners:
+            project_ids = [project_id for (project_id,) in
+                           Project.query.with_entities(Project.id).filter(Project.creator_id == user.id)]
+            clients.append(Client(app, user.telegram_id, project_ids, random.Random(rng.random())))
+
+    results = {}
+    for name, make_request in build_scenarios(app).items():
+        results[name] = run_endpoint(clients, make_request, args.requests, statements)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    print_results(results, baseline)
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "dataset": {"users": args.users, "projects": args.projects, "tasks": args.tasks, "seed": args.seed},
+        "clients": len(clients),
+        "requests_per_endpoint": args.requests,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,69 @@ load_dotenv()
 
 class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///check.db")
+
+    # Read replica: SELECTs of read-only routes and bot summaries go there (app.routing).
+    # A user's reads stay on the primary for this many seconds after their last write
+    DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+    SQLALCHEMY_BINDS = {"replica": DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
+    REPLICA_READ_YOUR_WRITES_WINDOW = int(os.getenv("REPLICA_READ_YOUR_WRITES_WINDOW", "5"))
+
+    # Return X-Query-Count / X-Query-Time headers outside debug mode too (app.query_stats)
+    QUERY_STATS_HEADERS = os.getenv("QUERY_STATS_HEADERS", "false").lower() == "true"
+
+    # Prometheus metrics at /metrics (app.metrics), off unless enabled; with METRICS_TOKEN
+    # set the scraper must send "Authorization: Bearer <token>"
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+    # worker.py has no web app: it serves /metrics on its own port (0 disables), give each
+    # worker on a host its own port
+    WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
+
+    # Database engine profile applied by create_app: "sqlite", "postgresql" or "default" (no tuning).
+    # Chosen from the database URL when not set
+    DB_ENGINE_PROFILE = os.getenv("DB_ENGINE_PROFILE", "")
+
+    # sqlite: WAL lets requests read while the bot writes, busy_timeout makes writers wait for
+    # the lock instead of failing with "database is locked"
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # milliseconds
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-32000"))  # pages, negative values are KiB
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", "268435456"))  # bytes
+
+    # postgresql: connection pool of each process and server-side statement timeout
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds
+    DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT", "30000"))  # milliseconds, 0 disables
+
+    ENGINE_PROFILES = {
+        "sqlite": {
+            # PRAGMAs executed on every new connection
+            "pragmas": {
+                "journal_mode": SQLITE_JOURNAL_MODE,
+                "synchronous": SQLITE_SYNCHRONOUS,
+                "busy_timeout": SQLITE_BUSY_TIMEOUT,
+                "cache_size": SQLITE_CACHE_SIZE,
+                "mmap_size": SQLITE_MMAP_SIZE,
+            },
+            "engine_options": {
+                "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT / 1000, "check_same_thread": False},
+            },
+        },
+        "postgresql": {
+            "engine_options": {
+                "pool_size": DB_POOL_SIZE,
+                "max_overflow": DB_MAX_OVERFLOW,
+                "pool_timeout": DB_POOL_TIMEOUT,
+                "pool_recycle": DB_POOL_RECYCLE,
+                "pool_pre_ping": True,
+                "connect_args": {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT}"},
+            },
+        },
+        "default": {},
+    }
     # Secret key required by Flask-WTF for CSRF protection. In production, set via env var.
     SECRET_KEY = os.getenv("SECRET_KEY")
     if not SECRET_KEY:
@@ -31,8 +94,93 @@ class Config:
     # Enable/disable bot reminders
     BOT_REMINDERS_ENABLED = os.getenv("BOT_REMINDERS_ENABLED", "true").lower() == "true"
 
+    # Run the bot and the reminder scheduler inside the web process (run.py).
+    # Set to false in production and run worker.py instead
+    BOT_EMBEDDED = os.getenv("BOT_EMBEDDED", "true").lower() == "true"
+
+    # Leader election: a scheduler instance that stops renewing its lease is replaced after this many seconds
+    SCHEDULER_LEASE_TTL = int(os.getenv("SCHEDULER_LEASE_TTL", "180"))
+
+    # How the bot runs: "polling" (long polling thread), "webhook" or "async" (asyncio runtime, needs aiohttp)
+    BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+
+    # Webhook mode: public URL of /telegram/webhook and the secret token Telegram sends back
+    TELEGRAM_WEBHOOK_URL = os.getenv("TELEGRAM_WEBHOOK_URL", "")
+    TELEGRAM_WEBHOOK_SECRET = os.getenv("TELEGRAM_WEBHOOK_SECRET", "")
+
+    # Base URL of the Bot API, set to a local stand-in (fake_telegram.py) for testing
+    TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
+
+    # Webhook update queue: worker threads and total queued updates before intake returns 503
+    WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "4"))
+    WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+
+    # Asyncio runtime: threads for database work and open connections to the Bot API
+    ASYNC_BOT_DB_WORKERS = int(os.getenv("ASYNC_BOT_DB_WORKERS", "8"))
+    ASYNC_BOT_HTTP_POOL_SIZE = int(os.getenv("ASYNC_BOT_HTTP_POOL_SIZE", "100"))
+
     REMINDER_CHECK_INTERVAL = 60  # Check for reminders every 60 seconds
 
+    # Catch-up window (seconds): reminders whose fire time passed while no scheduler was running
+    # are still sent if they are at most this late, older ones are skipped for the day
+    REMINDER_CATCHUP_WINDOW = int(os.getenv("REMINDER_CATCHUP_WINDOW", "3600"))
+
+    # Reminder outbox: rows claimed per batch, how long a claim lasts before another
+    # instance may take the row over, delivery attempts per reminder and retention of finished rows
+    REMINDER_OUTBOX_BATCH_SIZE = int(os.getenv("REMINDER_OUTBOX_BATCH_SIZE", "500"))
+    REMINDER_OUTBOX_CLAIM_TIMEOUT = int(os.getenv("REMINDER_OUTBOX_CLAIM_TIMEOUT", "600"))
+    REMINDER_OUTBOX_MAX_ATTEMPTS = int(os.getenv("REMINDER_OUTBOX_MAX_ATTEMPTS", "5"))
+    REMINDER_OUTBOX_RETENTION_DAYS = int(os.getenv("REMINDER_OUTBOX_RETENTION_DAYS", "7"))
+    REMINDER_OUTBOX_PRUNE_INTERVAL = 86400  # Prune finished outbox rows once a day
+
+    # Number of users whose summaries are built together with one set of queries
+    SUMMARY_BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "500"))
+
+    # Completed task titles listed per project in the daily summary
+    SUMMARY_TASKS_SHOWN = 5
+
+    # Reminder delivery: concurrent senders and Telegram rate limits
+    REMINDER_DELIVERY_WORKERS = int(os.getenv("REMINDER_DELIVERY_WORKERS", "8"))
+    REMINDER_DELIVERY_MAX_RETRIES = int(os.getenv("REMINDER_DELIVERY_MAX_RETRIES", "3"))
+    TELEGRAM_GLOBAL_RATE_LIMIT = float(os.getenv("TELEGRAM_GLOBAL_RATE_LIMIT", "30"))  # messages per second
+    TELEGRAM_PER_CHAT_INTERVAL = float(os.getenv("TELEGRAM_PER_CHAT_INTERVAL", "1"))  # seconds between messages to one chat
+
+    # Rendered dashboard cache (per user, per process)
+    DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "300"))  # seconds
+    DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", "1024"))  # users
+
+    # telegram_id -> user.id cache used to authenticate API requests
+    USER_ID_CACHE_TTL = int(os.getenv("USER_ID_CACHE_TTL", "3600"))  # seconds
+    USER_ID_CACHE_SIZE = int(os.getenv("USER_ID_CACHE_SIZE", "10000"))
+
+    # Mini App initData: maximum age by auth_date (0 disables the check) and cache of verified initData
+    INIT_DATA_MAX_AGE = int(os.getenv("INIT_DATA_MAX_AGE", "86400"))  # seconds
+    INIT_DATA_CACHE_TTL = int(os.getenv("INIT_DATA_CACHE_TTL", "3600"))  # seconds
+    INIT_DATA_CACHE_SIZE = int(os.getenv("INIT_DATA_CACHE_SIZE", "10000"))
+
+    # telegram_id -> user id and reminder settings snapshot used by bot commands
+    USER_SNAPSHOT_CACHE_TTL = int(os.getenv("USER_SNAPSHOT_CACHE_TTL", "600"))
+    # In webhook mode commands are spread over the web processes and an invalidation only reaches its own
+    USER_SNAPSHOT_WEBHOOK_CACHE_TTL = int(os.getenv("USER_SNAPSHOT_WEBHOOK_CACHE_TTL", "10"))
+    USER_SNAPSHOT_CACHE_SIZE = int(os.getenv("USER_SNAPSHOT_CACHE_SIZE", "10000"))
+
+    # Distance between the order values of neighbouring tasks; a move writes one row
+    # until the gap between two neighbours is used up and the project is rebalanced
+    TASK_ORDER_GAP = 1024
+
+    # Task feed pagination: page size limit and completed tasks rendered with the project page
+    TASK_PAGE_SIZE = int(os.getenv("TASK_PAGE_SIZE", 50))
+    TASK_HISTORY_INITIAL = int(os.getenv("TASK_HISTORY_INITIAL", 20))
+
+    # Cold archive: completed tasks older than this many days move to task_archive in batches
+    TASK_ARCHIVE_AFTER_DAYS = int(os.getenv("TASK_ARCHIVE_AFTER_DAYS", 90))
+    TASK_ARCHIVE_BATCH_SIZE = int(os.getenv("TASK_ARCHIVE_BATCH_SIZE", 1000))
+    # How often worker.py runs the archive job (seconds)
+    TASK_ARCHIVE_INTERVAL = int(os.getenv("TASK_ARCHIVE_INTERVAL", 86400))
+
+    # Maximum number of operations accepted by the bulk task endpoint
+    BULK_MAX_OPERATIONS = 200
+
     # Flask server settings
     FLASK_DEBUG: bool = os.getenv("FLASK_DEBUG", "false").lower() == "true"
     FLASK_HOST: str = "0.0.0.0"
@@ -0,0 +1,198 @@
+"""
+Local stand-in for the Telegram Bot API to exercise the bot without Telegram.
+
+Serves the Bot API methods the bot calls (getMe, sendMessage, setWebhook, ...)
+and records every call, then posts a burst of command updates for several chats
+to the webhook endpoint and prints the replies each chat received, in order.
+With --polling the updates are handed out through getUpdates instead, for the
+polling and async bot modes.
+
+Start the app against the stand-in, then run the script with the same secret:
+
+    BOT_MODE=webhook TELEGRAM_BOT_TOKEN=123:fake TELEGRAM_WEBHOOK_SECRET=secret \\
+        TELEGRAM_WEBHOOK_URL=http://localhost:5000/telegram/webhook \\
+        TELEGRAM_API_URL=http://localhost:8081 python run.py
+    python fake_telegram.py --secret secret --chats 3 --rounds 5
+
+    TELEGRAM_BOT_TOKEN=123:fake TELEGRAM_API_URL=http://localhost:8081 BOT_MODE=async python worker.py
+    python fake_telegram.py --polling --chats 3 --rounds 5
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qsl, urlparse
+
+COMMANDS = ["/start", "/summary", "/settings", "/help"]
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Check", "username": "check_fake_bot"}
+
+
+class FakeBotApi(ThreadingHTTPServer):
+    """HTTP server answering Bot API calls and keeping the messages sent per chat."""
+
+    def __init__(self, address):
+        super().__init__(address, BotApiHandler)
+        self.lock = threading.Lock()
+        self.calls: List[Dict[str, Any]] = []
+        self.sent: Dict[int, List[str]] = defaultdict(list)
+        self.next_message_id = 1
+        # Updates handed out by getUpdates (--polling)
+        self.updates: List[Dict[str, Any]] = []
+
+
+class BotApiHandler(BaseHTTPRequestHandler):
+    server: FakeBotApi
+
+    def do_GET(self):
+        self._answer()
+
+    def do_POST(self):
+        self._answer()
+
+    def _answer(self):
+        url = urlparse(self.path)
+        # Path is /bot<token>/<method>
+        method = url.path.rsplit("/", 1)[-1]
+        params = dict(parse_qsl(url.query))
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if body:
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                params.update(json.loads(body))
+            else:
+                params.update(parse_qsl(body.decode()))
+
+        if method == "getUpdates":
+            result = self._get_updates(params)
+        else:
+            with self.server.lock:
+                self.server.calls.append({"method": method, "params": params})
+                result = self._result(method, params)
+
+        payload = json.dumps({"ok": True, "result": result}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _result(self, method: str, params: Dict[str, Any]) -> Any:
+        if method == "getMe":
+            return BOT_USER
+        if method.startswith("send") or method.startswith("edit"):
+            chat_id = int(params.get("chat_id", 0))
+            text = params.get("text", "")
+            self.server.sent[chat_id].append(text)
+            message_id = self.server.next_message_id
+            self.server.next_message_id += 1
+            return {"message_id": message_id, "date": int(time.time()), "from": BOT_USER,
+                    "chat": {"id": chat_id, "type": "private"}, "text": text}
+        return True
+
+    def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(params.get("offset") or 0)
+        with self.server.lock:
+            updates = [update for update in self.server.updates if update["update_id"] >= offset]
+        if not updates:
+            # A short long poll, so idle pollers do not spin
+            time.sleep(0.5)
+        return updates
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_update(update_id: int, chat_id: int, text: str) -> Dict[str, Any]:
+    """A private-chat message update as Telegram sends it."""
+    user = {"id": chat_id, "is_bot": False, "first_name": f"User {chat_id}", "language_code": "ru"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": user["first_name"]},
+            "from": user,
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}],
+        },
+    }
+
+
+def post_update(webhook: str, secret: str, update: Dict[str, Any]) -> int:
+    request = urllib.request.Request(
+        webhook, data=json.dumps(update).encode(), method="POST",
+        headers={"Content-Type": "application/json", "X-Telegram-Bot-Api-Secret-Token": secret},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8081, help="port of the fake Bot API (TELEGRAM_API_URL)")
+    parser.add_argument("--webhook", default="http://localhost:5000/telegram/webhook", help="webhook endpoint")
+    parser.add_argument("--secret", default="", help="TELEGRAM_WEBHOOK_SECRET of the app")
+    parser.add_argument("--polling", action="store_true", help="hand the updates out through getUpdates")
+    parser.add_argument("--chats", type=int, default=3, help="chats sending updates")
+    parser.add_argument("--rounds", type=int, default=5, help="commands each chat sends")
+    parser.add_argument("--first-chat-id", type=int, default=900_000_000, help="telegram id of the first chat")
+    parser.add_argument("--wait", type=float, default=5, help="seconds to wait for replies")
+    parser.add_argument("--serve", action="store_true", help="only run the fake Bot API, post no updates")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    api = FakeBotApi(("127.0.0.1", args.port))
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+    print(f"Fake Bot API listening on http://127.0.0.1:{args.port}")
+
+    if args.serve:
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            return
+
+    # Interleave the chats like Telegram delivers concurrent users, one request at a time
+    update_id = 1
+    for round_index in range(args.rounds):
+        for chat_index in range(args.chats):
+            chat_id = args.first_chat_id + chat_index
+            text = COMMANDS[round_index % len(COMMANDS)]
+            update = make_update(update_id, chat_id, text)
+            if args.polling:
+                with api.lock:
+                    api.updates.append(update)
+                update_id += 1
+                continue
+            status = post_update(args.webhook, args.secret, update)
+            if status != 200:
+                print(f"update {update_id} ({chat_id} {text}): HTTP {status}")
+            update_id += 1
+
+    time.sleep(args.wait)
+    api.shutdown()
+
+    with api.lock:
+        for chat_index in range(args.chats):
+            chat_id = args.first_chat_id + chat_index
+            replies = api.sent.get(chat_id, [])
+            print(f"\nchat {chat_id}: {len(replies)} replies")
+            for text in replies:
+                print(f"  {text.splitlines()[0] if text else '<empty>'}")
+        methods = sorted({call["method"] for call in api.calls})
+        print(f"\n{len(api.calls)} Bot API calls: {', '.join(methods)}")
+
+
+if __name__ == "__main__":
+    main()
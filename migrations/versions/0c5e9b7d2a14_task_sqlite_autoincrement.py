@@ -0,0 +1,76 @@
+"""task_sqlite_autoincrement
+
+Revision ID: 0c5e9b7d2a14
+Revises: f2c6a8d4b913
+Create Date: 2026-10-17 11:03:12.640918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c5e9b7d2a14'
+down_revision = 'f2c6a8d4b913'
+branch_labels = None
+depends_on = None
+
+
+def _task_table(autoincrement: bool) -> sa.Table:
+    """Schema of `task` at this revision, so batch mode copies it without reflecting it."""
+    return sa.Table(
+        'task', sa.MetaData(),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=128), nullable=False),
+        sa.Column('status', sa.Enum('TODO', 'IN_PROGRESS', 'DONE', name='taskstatus'), nullable=False),
+        sa.Column('order', sa.Integer(), nullable=False),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['project_id'], ['project.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.CheckConstraint("status != 'DONE' OR completed_at IS NOT NULL", name='ck_task_done_completed_at'),
+        sa.Index('idx_task_project_id', 'project_id'),
+        sa.Index('idx_task_project_status', 'project_id', 'status'),
+        sa.Index('idx_task_completed_at', 'completed_at'),
+        sa.Index('idx_task_project_order', 'project_id', 'order'),
+        sa.Index('idx_task_project_completed', 'project_id', 'completed_at', 'id'),
+        sqlite_autoincrement=autoincrement,
+    )
+
+
+def upgrade():
+    # Without AUTOINCREMENT SQLite reuses the ids of deleted rows, so a task created
+    # after its predecessor was archived collides with it in task_archive.
+    # Other databases never reuse sequence values
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+
+    # Tasks that already reuse an archived id get fresh ones past both tables
+    next_id = bind.execute(sa.text(
+        "SELECT MAX(COALESCE((SELECT MAX(id) FROM task), 0), COALESCE((SELECT MAX(id) FROM task_archive), 0))"
+    )).scalar() + 1
+    colliding = [row[0] for row in bind.execute(sa.text(
+        "SELECT id FROM task WHERE id IN (SELECT id FROM task_archive) ORDER BY id"))]
+    for task_id in colliding:
+        bind.execute(sa.text("UPDATE task SET id = :new_id WHERE id = :old_id"),
+                     {"new_id": next_id, "old_id": task_id})
+        next_id += 1
+
+    with op.batch_alter_table('task', recreate='always', copy_from=_task_table(autoincrement=True)):
+        pass
+
+    # Start the sequence past every id ever handed out, archived ones included
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'task'")
+    bind.execute(sa.text("INSERT INTO sqlite_sequence (name, seq) VALUES ('task', :seq)"), {"seq": next_id - 1})
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        return
+
+    with op.batch_alter_table('task', recreate='always', copy_from=_task_table(autoincrement=False)):
+        pass
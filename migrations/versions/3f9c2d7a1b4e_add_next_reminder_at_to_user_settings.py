@@ -0,0 +1,30 @@
+"""add_next_reminder_at_to_user_settings
+
+Revision ID: 3f9c2d7a1b4e
+Revises: 1a23a47554ed
+Create Date: 2026-10-16 10:12:41.218304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9c2d7a1b4e'
+down_revision = '1a23a47554ed'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # next_reminder_at is left NULL here: the reminder scheduler fills it
+    # on startup (sync_reminder_index) using per-timezone DST rules
+    with op.batch_alter_table('user_settings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('next_reminder_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('idx_user_settings_next_reminder_at', ['next_reminder_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_settings', schema=None) as batch_op:
+        batch_op.drop_index('idx_user_settings_next_reminder_at')
+        batch_op.drop_column('next_reminder_at')
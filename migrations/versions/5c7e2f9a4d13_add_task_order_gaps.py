@@ -0,0 +1,34 @@
+"""add_task_order_gaps
+
+Revision ID: 5c7e2f9a4d13
+Revises: 8d41e6b0c2a7
+Create Date: 2026-10-16 14:21:05.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c7e2f9a4d13'
+down_revision = '8d41e6b0c2a7'
+branch_labels = None
+depends_on = None
+
+# Must match Config.TASK_ORDER_GAP at the time of the migration
+TASK_ORDER_GAP = 1024
+
+
+def upgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.create_index('idx_task_project_order', ['project_id', 'order'], unique=False)
+
+    # Spread existing dense orders (0, 1, 2, ...) apart so moves touch one row
+    op.execute(f'UPDATE task SET "order" = ("order" + 1) * {TASK_ORDER_GAP}')
+
+
+def downgrade():
+    op.execute(f'UPDATE task SET "order" = "order" / {TASK_ORDER_GAP} - 1')
+
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('idx_task_project_order')
@@ -0,0 +1,29 @@
+"""add_scheduler_lease_table
+
+Revision ID: 6b2e8f4a9c71
+Revises: a9d3c61e7b20
+Create Date: 2026-10-16 18:12:37.064518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b2e8f4a9c71'
+down_revision = 'a9d3c61e7b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('scheduler_lease',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('holder', sa.String(length=128), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('scheduler_lease')
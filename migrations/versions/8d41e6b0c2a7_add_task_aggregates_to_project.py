@@ -0,0 +1,41 @@
+"""add_task_aggregates_to_project
+
+Revision ID: 8d41e6b0c2a7
+Revises: 3f9c2d7a1b4e
+Create Date: 2026-10-16 12:03:17.540912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41e6b0c2a7'
+down_revision = '3f9c2d7a1b4e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_activity_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('pending_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('done_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill from existing tasks
+    op.execute(
+        "UPDATE project SET "
+        "pending_count = (SELECT COUNT(*) FROM task "
+        "WHERE task.project_id = project.id AND task.status != 'DONE'), "
+        "done_count = (SELECT COUNT(*) FROM task "
+        "WHERE task.project_id = project.id AND task.status = 'DONE'), "
+        "last_activity_at = (SELECT MAX(task.completed_at) FROM task "
+        "WHERE task.project_id = project.id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('project', schema=None) as batch_op:
+        batch_op.drop_column('done_count')
+        batch_op.drop_column('pending_count')
+        batch_op.drop_column('last_activity_at')
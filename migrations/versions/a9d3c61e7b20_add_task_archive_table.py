@@ -0,0 +1,44 @@
+"""add_task_archive_table
+
+Revision ID: a9d3c61e7b20
+Revises: e4b19a7c3f58
+Create Date: 2026-10-16 16:40:12.905117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3c61e7b20'
+down_revision = 'e4b19a7c3f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('task_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('title', sa.String(length=128), nullable=False),
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['project.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('task_archive', schema=None) as batch_op:
+        batch_op.create_index('idx_task_archive_project_completed', ['project_id', 'completed_at', 'id'], unique=False)
+
+
+def downgrade():
+    # Move archived tasks back so downgrading loses no history
+    op.execute(
+        'INSERT INTO task (id, title, status, "order", project_id, created_at, updated_at, completed_at) '
+        "SELECT id, title, 'DONE', 0, project_id, created_at, archived_at, completed_at FROM task_archive"
+    )
+
+    with op.batch_alter_table('task_archive', schema=None) as batch_op:
+        batch_op.drop_index('idx_task_archive_project_completed')
+
+    op.drop_table('task_archive')
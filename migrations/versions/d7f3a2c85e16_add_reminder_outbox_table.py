@@ -0,0 +1,46 @@
+"""add_reminder_outbox_table
+
+Revision ID: d7f3a2c85e16
+Revises: 6b2e8f4a9c71
+Create Date: 2026-10-16 19:04:51.218734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7f3a2c85e16'
+down_revision = '6b2e8f4a9c71'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reminder_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+    sa.Column('fire_at', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'CLAIMED', 'SENT', 'FAILED', name='outboxstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('claimed_by', sa.String(length=128), nullable=True),
+    sa.Column('claimed_until', sa.DateTime(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(length=256), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'fire_at', name='uq_reminder_outbox_user_fire')
+    )
+    with op.batch_alter_table('reminder_outbox', schema=None) as batch_op:
+        batch_op.create_index('idx_reminder_outbox_status_available', ['status', 'available_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reminder_outbox', schema=None) as batch_op:
+        batch_op.drop_index('idx_reminder_outbox_status_available')
+
+    op.drop_table('reminder_outbox')
+    sa.Enum(name='outboxstatus').drop(op.get_bind(), checkfirst=True)
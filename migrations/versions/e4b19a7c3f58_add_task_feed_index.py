@@ -0,0 +1,35 @@
+"""add_task_feed_index
+
+Revision ID: e4b19a7c3f58
+Revises: 5c7e2f9a4d13
+Create Date: 2026-10-16 15:02:44.871930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b19a7c3f58'
+down_revision = '5c7e2f9a4d13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Completed tasks from before completed_at existed have no completion time;
+    # the keyset feed needs one, so fall back to the last update
+    op.execute("UPDATE task SET completed_at = updated_at WHERE status = 'DONE' AND completed_at IS NULL")
+    # last_activity_at was computed from completed_at before the backfill
+    op.execute(
+        "UPDATE project SET last_activity_at = (SELECT MAX(task.completed_at) FROM task "
+        "WHERE task.project_id = project.id)"
+    )
+
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.create_index('idx_task_project_completed', ['project_id', 'completed_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('idx_task_project_completed')
@@ -0,0 +1,32 @@
+"""require_completed_at_for_done_tasks
+
+Revision ID: f2c6a8d4b913
+Revises: d7f3a2c85e16
+Create Date: 2026-10-17 10:12:37.514208
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6a8d4b913'
+down_revision = 'd7f3a2c85e16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The keyset feed orders completed tasks by completed_at: a NULL there can
+    # neither be paged past nor archived, so backfill what is left and forbid it
+    op.execute("UPDATE task SET completed_at = COALESCE(updated_at, created_at) "
+               "WHERE status = 'DONE' AND completed_at IS NULL")
+
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.create_check_constraint(
+            'ck_task_done_completed_at', "status != 'DONE' OR completed_at IS NOT NULL")
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_task_done_completed_at', type_='check')
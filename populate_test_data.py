@@ -9,6 +9,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from app import create_app, db
+from app.crud import verify_project_aggregates
 from app.models import User, Project, Task, ProjectPeriodicity, TaskStatus
 
 def populate_test_data():
@@ -149,7 +150,7 @@ def populate_test_data():
                 name=proj_data["name"],
                 short_name=proj_data["short_name"],
                 description=proj_data["description"],
-                periodicity=proj_data["periodicity"],
+                periodicity_days=proj_data["periodicity"].value,
                 creator_id=user.id
             )
             
@@ -180,6 +181,10 @@ def populate_test_data():
             created_count += 1
             print(f"✓ Created project: {proj_data['name']} (staleness ~{proj_data['days_ago'] / 7:.1f})")
         
+        # Tasks were added with backdated completion times, bypassing the crud helpers
+        # that maintain the project counters and last_activity_at
+        db.session.flush()
+        verify_project_aggregates(repair=True)
         db.session.commit()
         print(f"\n✅ Successfully created {created_count} test projects!")
         print(f"Total projects for mock user: {Project.query.filter_by(creator_id=user.id).count()}")
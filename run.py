@@ -11,25 +11,47 @@ migrate = Migrate(app, db)
 # Initialize bot if token is configured
 # ВАЖНО: Запускаем бота только в основном процессе Flask, не в reloader
 bot_instance = None
+# В продакшене бот и напоминания работают в отдельном процессе (worker.py, BOT_EMBEDDED=false).
+# Обновления в режиме webhook принимает каждый веб-процесс сам (app.webhook), независимо от этого флага
+bot_embedded = app.config.get("BOT_EMBEDDED", True)
+webhook_mode = app.config.get("BOT_MODE") == "webhook"
 if (
     app.config.get("TELEGRAM_BOT_TOKEN")
+    and bot_embedded
     and os.environ.get("WERKZEUG_RUN_MAIN") == "true"
 ):
     try:
-        from app.bot import create_bot
+        if app.config.get("BOT_MODE") == "async":
+            from app.bot_async import create_async_bot
 
-        bot_instance = create_bot(
-            token=app.config["TELEGRAM_BOT_TOKEN"],
-            app=app,
-            db=db,
-            reminder_time=app.config.get("BOT_REMINDER_TIME", "20:00"),
-            timezone=app.config.get("BOT_TIMEZONE", "UTC"),
-            reminders_enabled=app.config.get("BOT_REMINDERS_ENABLED", True),
-        )
+            bot_instance = create_async_bot(
+                token=app.config["TELEGRAM_BOT_TOKEN"],
+                app=app,
+                db=db,
+                reminders_enabled=app.config.get("BOT_REMINDERS_ENABLED", True),
+            )
+            # One event loop serves all chats
+            threading.Thread(target=bot_instance.start, daemon=True).start()
+        else:
+            from app.bot import create_bot
+
+            bot_instance = create_bot(
+                token=app.config["TELEGRAM_BOT_TOKEN"],
+                app=app,
+                db=db,
+                reminder_time=app.config.get("BOT_REMINDER_TIME", "20:00"),
+                timezone=app.config.get("BOT_TIMEZONE", "UTC"),
+                reminders_enabled=app.config.get("BOT_REMINDERS_ENABLED", True),
+            )
 
-        # Start bot in a separate thread
-        bot_thread = threading.Thread(target=bot_instance.start_polling, daemon=True)
-        bot_thread.start()
+            if webhook_mode:
+                # Updates arrive at /telegram/webhook, this process only registers it and sends reminders
+                bot_instance.register_webhook()
+                bot_instance.start_scheduler()
+            else:
+                # Start bot in a separate thread
+                bot_thread = threading.Thread(target=bot_instance.start_polling, daemon=True)
+                bot_thread.start()
 
         logging.info("✅ Telegram bot started successfully")
         logging.info(
@@ -39,6 +61,8 @@ if (
         logging.error(f"❌ Failed to start Telegram bot: {e}")
 elif not app.config.get("TELEGRAM_BOT_TOKEN"):
     logging.warning("⚠️ TELEGRAM_BOT_TOKEN not configured - bot disabled")
+elif not bot_embedded:
+    logging.info("Bot is not embedded (BOT_EMBEDDED=false), run worker.py to start it")
 
 if __name__ == "__main__":
     app.run(
@@ -0,0 +1,225 @@
+"""
+Bot and background job worker.
+
+Runs the Telegram bot (polling or asyncio runtime), the reminder scheduler and
+periodic maintenance jobs in a process of its own, so the web tier can run any
+number of processes with BOT_EMBEDDED=false:
+
+    python worker.py
+
+Several workers may run at once: reminders, jobs and polling are guarded by
+database leases (app.lease), so exactly one instance runs each of them. Only the
+holder of the "polling" lease calls getUpdates (a second poller would get 409
+Conflict from Telegram), the others wait on standby and take over when it dies.
+A worker that cannot renew the polling lease before it expires stops, so that two
+instances never poll at once; run it under a supervisor that restarts it. In
+webhook mode updates are received by the web tier; the worker only runs the
+scheduler and the jobs.
+
+With METRICS_ENABLED on, scheduler, delivery and bot command metrics are served
+on http://<host>:WORKER_METRICS_PORT/metrics (app.metrics).
+"""
+import logging
+import signal
+import threading
+import time
+from typing import Callable
+
+from flask import Flask
+
+from app import create_worker_app, db
+from app.lease import Lease
+from config import Config
+
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger("worker")
+
+
+def run_periodic_job(app: Flask, name: str, interval: float, job: Callable[[], object],
+                     stop: threading.Event) -> None:
+    """
+    Run `job` every `interval` seconds while this instance holds the job's lease.
+
+    Args:
+        app: Worker application
+        name: Job name, also used as the lease name
+        interval: Seconds between runs
+        job: Callable executed inside an application context
+        stop: Event that ends the loop
+    """
+    # The lease outlives the interval, so the holder keeps it between runs
+    lease = Lease(name, ttl=interval + Config.SCHEDULER_LEASE_TTL)
+
+    while not stop.is_set():
+        try:
+            with app.app_context():
+                if lease.acquire():
+                    started_at = time.monotonic()
+                    result = job()
+                    logger.info(f"Job {name} finished in {time.monotonic() - started_at:.1f}s: {result}")
+        except Exception as e:
+            logger.error(f"Job {name} failed: {e}")
+        stop.wait(interval)
+
+    with app.app_context():
+        lease.release()
+
+
+def wait_for_lease(app: Flask, lease: Lease, stop: threading.Event) -> bool:
+    """
+    Block until this instance holds `lease`.
+
+    Returns:
+        False if `stop` was set first
+    """
+    while not stop.is_set():
+        with app.app_context():
+            if lease.acquire():
+                return True
+        stop.wait(lease.ttl / 3)
+    return False
+
+
+def keep_lease(app: Flask, lease: Lease, stop: threading.Event) -> None:
+    """
+    Renew a held `lease` until `stop` is set, then release it.
+
+    Sets `stop` when the lease would expire before the next renewal: another
+    instance may take it over then, and the work it guards must not run twice.
+    """
+    interval = lease.ttl / 3
+    renewed_at = time.monotonic()
+
+    while not stop.wait(interval):
+        with app.app_context():
+            if lease.acquire():
+                renewed_at = time.monotonic()
+                continue
+        if time.monotonic() + interval >= renewed_at + lease.ttl:
+            logger.error(f"Could not renew lease {lease.name}, stopping the worker")
+            stop.set()
+
+    with app.app_context():
+        lease.release()
+
+
+def main() -> None:
+    app = create_worker_app()
+    stop = threading.Event()
+
+    def handle_signal(signum, frame):
+        logger.info(f"Received signal {signum}, stopping")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    if Config.METRICS_ENABLED and Config.WORKER_METRICS_PORT:
+        from app.metrics import register_cache, start_metrics_server
+        from app.user_cache import user_cache_stats
+
+        register_cache("user_snapshot", user_cache_stats)
+        try:
+            start_metrics_server(Config.WORKER_METRICS_PORT, token=Config.METRICS_TOKEN)
+        except OSError as e:
+            # Another worker on this host took the port: keep running without metrics
+            logger.warning(f"Metrics server not started on port {Config.WORKER_METRICS_PORT}: {e}")
+
+    from app.archive import archive_completed_tasks
+    from app.outbox import prune_reminder_outbox
+
+    jobs = [
+        ("archive", Config.TASK_ARCHIVE_INTERVAL, archive_completed_tasks),
+        ("outbox-prune", Config.REMINDER_OUTBOX_PRUNE_INTERVAL, prune_reminder_outbox),
+    ]
+    job_threads = []
+    for name, interval, job in jobs:
+        thread = threading.Thread(
+            target=run_periodic_job,
+            args=(app, name, interval, job, stop),
+            name=f"job-{name}",
+            daemon=True
+        )
+        thread.start()
+        job_threads.append(thread)
+
+    try:
+        run_bot(app, stop)
+    finally:
+        # Let the job loops release their leases
+        stop.set()
+        for thread in job_threads:
+            thread.join(timeout=5)
+
+
+def run_bot(app: Flask, stop: threading.Event) -> None:
+    """Run the bot and the reminder scheduler until `stop` is set."""
+    token = app.config.get("TELEGRAM_BOT_TOKEN")
+    if not token:
+        logger.warning("TELEGRAM_BOT_TOKEN not configured - running background jobs only")
+        stop.wait()
+        return
+
+    mode = app.config.get("BOT_MODE")
+    reminders_enabled = app.config.get("BOT_REMINDERS_ENABLED", True)
+    polling_lease = Lease("polling")
+    lease_thread = threading.Thread(target=keep_lease, args=(app, polling_lease, stop), name="polling-lease",
+                                    daemon=True)
+
+    if mode == "async":
+        from app.bot_async import create_async_bot
+
+        # The asyncio runtime polls and schedules in one loop, a standby worker runs only the jobs
+        logger.info("Waiting for the polling lease")
+        if not wait_for_lease(app, polling_lease, stop):
+            return
+        lease_thread.start()
+
+        bot = create_async_bot(token=token, app=app, db=db, reminders_enabled=reminders_enabled)
+        bot_thread = threading.Thread(target=bot.start, name="bot", daemon=True)
+        bot_thread.start()
+        logger.info(f"Worker started (bot mode: {mode})")
+        stop.wait()
+        # Lets the bot release the reminder lease and close its HTTP session
+        bot.stop()
+        bot_thread.join(timeout=10)
+        lease_thread.join(timeout=5)
+        return
+
+    from app.bot import create_bot
+
+    bot = create_bot(
+        token=token,
+        app=app,
+        db=db,
+        reminder_time=app.config.get("BOT_REMINDER_TIME", "20:00"),
+        timezone=app.config.get("BOT_TIMEZONE", "UTC"),
+        reminders_enabled=reminders_enabled,
+    )
+
+    # Standby workers also claim and send reminder outbox batches
+    bot.start_scheduler()
+
+    if mode == "webhook":
+        # Updates go to the web tier's /telegram/webhook
+        bot.register_webhook()
+    else:
+        logger.info("Waiting for the polling lease")
+        if not wait_for_lease(app, polling_lease, stop):
+            bot.stop()
+            return
+        lease_thread.start()
+        threading.Thread(target=bot.start_polling, name="bot", daemon=True).start()
+
+    logger.info(f"Worker started (bot mode: {mode})")
+    stop.wait()
+    bot.stop()
+    if lease_thread.is_alive():
+        lease_thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()